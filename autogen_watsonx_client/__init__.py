@@ -1,4 +1,39 @@
+import importlib
+
 from autogen_watsonx_client.config import WatsonxClientConfiguration
-from autogen_watsonx_client.client import WatsonXChatCompletionClient
 
 __version = "0.0.9.dev1"
+
+# the client pulls in autogen_core, resolve it on first access so that importing the configuration stays cheap
+_LAZY_ATTRIBUTES = {
+    "WatsonXChatCompletionClient": "autogen_watsonx_client.client",
+    "InMemoryResponseCache": "autogen_watsonx_client.cache",
+    "SQLiteResponseCache": "autogen_watsonx_client.cache",
+    "MessageConversionCache": "autogen_watsonx_client.conversion",
+    "ContextPolicy": "autogen_watsonx_client.context",
+    "UsageTracker": "autogen_watsonx_client.usage",
+    "TokenBudgetExceededError": "autogen_watsonx_client.usage",
+    "usage_scope": "autogen_watsonx_client.usage",
+}
+
+__all__ = [
+    "WatsonxClientConfiguration",
+    "WatsonXChatCompletionClient",
+    "InMemoryResponseCache",
+    "SQLiteResponseCache",
+    "MessageConversionCache",
+    "ContextPolicy",
+    "UsageTracker",
+    "TokenBudgetExceededError",
+    "usage_scope",
+]
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
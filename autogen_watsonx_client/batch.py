@@ -0,0 +1,193 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, Sequence
+
+from autogen_core import CancellationToken
+from autogen_core.models import CreateResult, LLMMessage
+
+_END_OF_BATCH = object()
+
+
+@dataclass
+class BatchItem:
+    """
+    outcome of one conversation of a batch, `index` is its position in the input.
+    a call cancelled by something else than the batch has a CancelledError as its error
+    """
+    index: int
+    result: Optional[CreateResult] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchStats:
+    """
+    aggregate of a batch so far, times are in seconds
+    """
+    items: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    cached: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.items / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return (self.prompt_tokens + self.completion_tokens) / self.elapsed if self.elapsed else 0.0
+
+
+@dataclass
+class BatchResult:
+    """
+    outcomes of `create_many` in input order
+    """
+    items: list[BatchItem] = field(default_factory=list)
+    stats: BatchStats = field(default_factory=BatchStats)
+
+    @property
+    def results(self) -> list[Optional[CreateResult]]:
+        return [item.result for item in self.items]
+
+    @property
+    def errors(self) -> list[BatchItem]:
+        return [item for item in self.items if item.error is not None]
+
+
+class BatchIterator:
+    """
+    runs `create` over the conversations with at most `max_concurrency` calls in flight,
+    and yields a BatchItem per conversation as it completes.
+    conversations are pulled from the input as workers free up, so the input can be a lazy iterable.
+    errors of a conversation are captured in its item, `stats` is updated as items complete.
+    cancelling `cancellation_token` ends the batch without items for the cancelled calls.
+    the calls in flight are cancelled once the consumer leaves its `async for`, also by breaking out of it,
+    or an `async with` block around it.
+    """
+
+    def __init__(
+        self,
+        create: Callable[[Sequence[LLMMessage]], Awaitable[CreateResult]],
+        conversations: Iterable[Sequence[LLMMessage]],
+        max_concurrency: int = 16,
+        cancellation_token: Optional[CancellationToken] = None,
+    ):
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency of a batch needs to be positive")
+        self._create = create
+        self._conversations = enumerate(conversations)
+        self._max_concurrency = max_concurrency
+        self._cancellation_token = cancellation_token
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._supervisor: Optional[asyncio.Task] = None
+        self._start = 0.0
+        self._finished = False
+        self.stats = BatchStats()
+
+    def __aiter__(self) -> AsyncIterator[BatchItem]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[BatchItem]:
+        # a generator, which is closed when a consumer breaking out of its loop drops it
+        if self._queue is None and not self._finished:
+            self._begin()
+        try:
+            while not self._finished:
+                item = await self._queue.get()
+                if item is _END_OF_BATCH:
+                    self._finished = True
+                    break
+                yield item
+        finally:
+            await self.aclose()
+
+    async def __aenter__(self) -> "BatchIterator":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def _begin(self) -> None:
+        self._start = time.perf_counter()
+        # bounded, so workers stop pulling new conversations while the consumer falls behind
+        self._queue = asyncio.Queue(maxsize=self._max_concurrency)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self._max_concurrency)]
+        self._supervisor = asyncio.create_task(self._supervise())
+        if self._cancellation_token is not None:
+            # only the workers are linked, linking every call would keep all of them alive in the token
+            self._cancellation_token.add_callback(self._cancel_workers)
+
+    def _cancel_workers(self) -> None:
+        for task in self._workers:
+            if not task.done():
+                task.cancel()
+
+    async def _supervise(self) -> None:
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await self._queue.put(_END_OF_BATCH)
+
+    async def _work(self) -> None:
+        # the input iterator is shared by the workers, they all run on the same event loop
+        for index, messages in self._conversations:
+            if self.cancelled:
+                return
+            try:
+                item = BatchItem(index=index, result=await self._create(messages))
+            except asyncio.CancelledError as e:
+                # only the batch's cancellation and `aclose` cancel the workers, otherwise the call itself was cancelled
+                if self.cancelled or self._finished:
+                    return
+                item = BatchItem(index=index, error=e)
+            except Exception as e:
+                item = BatchItem(index=index, error=e)
+            self._record(item)
+            await self._queue.put(item)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancellation_token is not None and self._cancellation_token.is_cancelled()
+
+    def _record(self, item: BatchItem) -> None:
+        stats = self.stats
+        stats.items += 1
+        if item.result is not None:
+            stats.succeeded += 1
+            stats.cached += int(item.result.cached)
+            stats.prompt_tokens += item.result.usage.prompt_tokens
+            stats.completion_tokens += item.result.usage.completion_tokens
+        else:
+            stats.failed += 1
+        stats.elapsed = time.perf_counter() - self._start
+
+    async def aclose(self) -> None:
+        """
+        stops the batch, calls in flight are cancelled
+        """
+        self._finished = True
+        tasks = [task for task in (*self._workers, self._supervisor) if task is not None and not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_batch(iterator: BatchIterator) -> BatchResult:
+    items = []
+    try:
+        async for item in iterator:
+            items.append(item)
+    finally:
+        await iterator.aclose()
+    if iterator.cancelled:
+        raise asyncio.CancelledError()
+    items.sort(key=lambda item: item.index)
+    return BatchResult(items=items, stats=iterator.stats)
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Mapping, Optional
+
+from autogen_core.models import CreateResult
+
+from autogen_watsonx_client.serialization import dumps, loads
+
+
+def response_cache_key(model_id: str, params: Mapping[str, Any], wx_messages: list, tools_json: str) -> str:
+    """
+    canonical hash of a chat request, built from the already converted watsonx payload,
+    `tools_json` is the canonical json of the converted tools
+    """
+    payload = {
+        "model_id": model_id,
+        "params": params,
+        "messages": wx_messages,
+    }
+    # always the standard library, so keys stay the same with and without orjson
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    hasher = hashlib.sha256(encoded.encode("utf-8"))
+    hasher.update(tools_json.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class ResponseCache(ABC):
+    """
+    base class of the response caches, entries are stored as `CreateResult` dumps
+    and come back with `cached=True`. backends implement `_get`, `_set` and `clear`
+    """
+
+    def get(self, key: str) -> Optional[CreateResult]:
+        raw = self._get(key)
+        if raw is None:
+            return None
+        result = CreateResult.model_validate(raw)
+        result.cached = True
+        return result
+
+    def set(self, key: str, result: CreateResult) -> None:
+        self._set(key, result.model_dump(mode="json"))
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def _set(self, key: str, value: dict) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class InMemoryResponseCache(ResponseCache):
+    """
+    LRU cache with an optional time to live in seconds
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        if max_size <= 0:
+            raise ValueError("max_size of the response cache needs to be positive")
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self._ttl is not None and time.monotonic() - stored_at > self._ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    persistent cache in a sqlite file, survives process restarts and can be shared by processes
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+
+    def _get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, stored_at = row
+            if self._ttl is not None and time.time() - stored_at > self._ttl:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            return loads(value)
+
+    def _set(self, key: str, value: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, dumps(value).decode("utf-8"), time.time()),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,160 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Literal, Optional, Sequence
+
+from autogen_watsonx_client.serialization import loads
+
+EscalationTrigger = Literal["error", "invalid_tool_call", "length", "invalid_json", "low_confidence"]
+
+DEFAULT_ESCALATION_TRIGGERS = ("error", "invalid_tool_call", "length")
+_TRIGGERS = ("error", "invalid_tool_call", "length", "invalid_json", "low_confidence")
+
+
+@dataclass
+class CascadeTierStats:
+    """
+    counters of one model of the cascade, `mean_latency` is in seconds
+    """
+    model_id: str
+    calls: int = 0
+    accepted: int = 0
+    escalations: dict[str, int] = field(default_factory=dict)
+    mean_latency: Optional[float] = None
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        return self.accepted / self.calls if self.calls else None
+
+
+@dataclass
+class CascadeStats:
+    """
+    per tier counters, cheapest model first and the client's `model_id` last.
+    `estimated_time_saved` is the latency of the final model that accepted answers of earlier tiers did not wait for,
+    minus the latency the escalated calls spent in earlier tiers, in seconds
+    """
+    tiers: list[CascadeTierStats]
+    estimated_time_saved: Optional[float]
+
+
+class _TierCounters:
+    __slots__ = ("calls", "accepted", "escalations", "total_latency", "accepted_latency", "escalated_latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.accepted = 0
+        self.escalations: dict[str, int] = {}
+        self.total_latency = 0.0
+        self.accepted_latency = 0.0
+        self.escalated_latency = 0.0
+
+
+def _mean_logprob(choice: dict) -> Optional[float]:
+    logprobs = (choice.get("logprobs") or {}).get("content") or []
+    if not logprobs:
+        return None
+    return sum(token["logprob"] for token in logprobs) / len(logprobs)
+
+
+def _valid_tool_call(tool_call: dict, tool_names: set[str]) -> bool:
+    function = tool_call.get("function") or {}
+    if function.get("name") not in tool_names:
+        return False
+    try:
+        return isinstance(loads(function.get("arguments") or "{}"), dict)
+    except ValueError:
+        return False
+
+
+class ModelCascade:
+    """
+    models tried before the client's own model, cheapest first.
+    the answer of a tier is taken unless one of the `escalate_on` triggers fires, then the next tier is asked.
+    """
+
+    def __init__(
+        self,
+        model_ids: Sequence[str],
+        final_model_id: str,
+        escalate_on: Sequence[EscalationTrigger] = DEFAULT_ESCALATION_TRIGGERS,
+        min_logprob: float = -1.0,
+    ):
+        unknown = set(escalate_on) - set(_TRIGGERS)
+        if unknown:
+            raise ValueError(f"unknown cascade escalation triggers {sorted(unknown)}, expected some of {_TRIGGERS}")
+        if final_model_id in model_ids:
+            raise ValueError(f"{final_model_id} is the model of the client, it cannot be a cascade tier as well")
+        self.model_ids = list(model_ids)
+        self._final_model_id = final_model_id
+        self._escalate_on = frozenset(escalate_on)
+        self._min_logprob = min_logprob
+        self._counters = {model_id: _TierCounters() for model_id in [*self.model_ids, final_model_id]}
+        self._lock = threading.Lock()
+
+    @property
+    def needs_logprobs(self) -> bool:
+        return "low_confidence" in self._escalate_on
+
+    @property
+    def escalates_on_error(self) -> bool:
+        return "error" in self._escalate_on
+
+    def escalation_reason(self, wx_response: dict, tool_names: set[str]) -> Optional[EscalationTrigger]:
+        """
+        the trigger firing for a response, None when the response is accepted
+        """
+        choice = wx_response["choices"][0]
+        message = choice["message"]
+        escalate_on = self._escalate_on
+        if "length" in escalate_on and choice["finish_reason"] == "length":
+            return "length"
+        tool_calls = message.get("tool_calls")
+        if "invalid_tool_call" in escalate_on and tool_calls:
+            if not all(_valid_tool_call(tool_call, tool_names) for tool_call in tool_calls):
+                return "invalid_tool_call"
+        content = message.get("content")
+        if "invalid_json" in escalate_on and content is not None and not tool_calls:
+            try:
+                loads(content)
+            except ValueError:
+                return "invalid_json"
+        if "low_confidence" in escalate_on:
+            mean_logprob = _mean_logprob(choice)
+            if mean_logprob is not None and mean_logprob < self._min_logprob:
+                return "low_confidence"
+        return None
+
+    def record(self, model_id: str, latency: float, reason: Optional[str]) -> None:
+        with self._lock:
+            counters = self._counters[model_id]
+            counters.calls += 1
+            counters.total_latency += latency
+            if reason is None:
+                counters.accepted += 1
+                counters.accepted_latency += latency
+            else:
+                counters.escalations[reason] = counters.escalations.get(reason, 0) + 1
+                counters.escalated_latency += latency
+
+    def stats(self) -> CascadeStats:
+        with self._lock:
+            tiers = [
+                CascadeTierStats(
+                    model_id=model_id,
+                    calls=counters.calls,
+                    accepted=counters.accepted,
+                    escalations=dict(counters.escalations),
+                    mean_latency=counters.total_latency / counters.calls if counters.calls else None,
+                )
+                for model_id, counters in self._counters.items()
+            ]
+            final = self._counters[self._final_model_id]
+            estimated_time_saved = None
+            if final.calls:
+                final_latency = final.total_latency / final.calls
+                estimated_time_saved = sum(
+                    counters.accepted * final_latency - counters.accepted_latency - counters.escalated_latency
+                    for model_id, counters in self._counters.items()
+                    if model_id != self._final_model_id
+                )
+        return CascadeStats(tiers=tiers, estimated_time_saved=estimated_time_saved)
@@ -1,20 +1,46 @@
 import asyncio
-from typing import Mapping, Optional, Sequence, Any, Union, AsyncGenerator
-from dataclasses import asdict
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Mapping, Optional, Sequence, Any, Union, AsyncGenerator, AsyncIterator, Callable, Iterable
 
 from autogen_core import CancellationToken
-from autogen_core import FunctionCall, Image
+from autogen_core import FunctionCall
 from autogen_core.tools import Tool, ToolSchema
 from typing_extensions import Unpack
 
 from autogen_core.models import (
-    ChatCompletionClient, RequestUsage, LLMMessage, CreateResult, SystemMessage, AssistantMessage, UserMessage,
-    FunctionExecutionResultMessage, ModelCapabilities, ModelInfo
+    ChatCompletionClient, RequestUsage, LLMMessage, CreateResult, ModelCapabilities, ModelInfo
 )
-from ibm_watsonx_ai import Credentials
-from ibm_watsonx_ai.foundation_models import ModelInference
 
-from autogen_watsonx_client.config import WatsonxClientConfiguration
+from autogen_watsonx_client.batch import BatchIterator, BatchResult, run_batch
+from autogen_watsonx_client.cache import ResponseCache, response_cache_key
+from autogen_watsonx_client.cascade import DEFAULT_ESCALATION_TRIGGERS, CascadeStats, ModelCascade
+from autogen_watsonx_client.config import WatsonxClientConfiguration, WatsonxEndpoint
+from autogen_watsonx_client.context import ContextPolicy, ContextStats, ContextStatsCounter, ContextTrimStats
+from autogen_watsonx_client.conversion import (
+    MessageConversionCache, ToolRegistry, _autogen_messages_to_watsonx_messages
+)
+from autogen_watsonx_client.hedging import Hedger, HedgingStats
+from autogen_watsonx_client.instrumentation import NOOP_TRACE, CallTrace, Instrumentation
+from autogen_watsonx_client.metrics import StreamStatsAggregator, StreamStatsSummary, StreamTimer, WatsonxCreateResult
+from autogen_watsonx_client.model_specs import ModelLimits, get_model_spec_cache
+from autogen_watsonx_client.pool import (
+    ModelInferenceLease, ModelInferenceRegistry, get_model_inference_registry, running_loop
+)
+from autogen_watsonx_client.rate_limit import AdmissionController, AdmissionStats
+from autogen_watsonx_client.retry import (
+    DEFAULT_MAX_RETRIES, DEFAULT_RETRY_STATUS_CODES, Retrier, RetryPolicy, RetryStats
+)
+from autogen_watsonx_client.routing import EndpointStats, Router
+from autogen_watsonx_client.serialization import dumps, orjson
+from autogen_watsonx_client.streaming import (
+    TIMED_OUT, ChunkCoalescer, StreamReader, ToolCallAccumulator, ToolCallReadyEvent, _PrependedStream
+)
+from autogen_watsonx_client.tokens import TokenCounter, _approximate_token_count
+from autogen_watsonx_client.usage import BudgetStats, UsageCounter, UsageStats, UsageTracker, current_usage_source
 
 
 def _add_usage(usage1: RequestUsage, usage2: RequestUsage) -> RequestUsage:
@@ -24,106 +50,57 @@ def _add_usage(usage1: RequestUsage, usage2: RequestUsage) -> RequestUsage:
     )
 
 
-def _autogen_message_to_watsonx_message(message: LLMMessage):
-    if isinstance(message, SystemMessage):
-        return {
-            "role": "system",
-            "content": message.content
-        }
-    elif isinstance(message, AssistantMessage):
-        converted_msg = {
-            "role": "assistant",
-        }
-        if isinstance(message.content, str):
-            converted_msg["content"] = message.content
-            return converted_msg
-        elif isinstance(message.content, list) and len(message.content) > 0 :
-            if isinstance(message.content[0], FunctionCall):
-                func_calls = [
-                    {
-                        "id": func_call.id,
-                        "type": "function",
-                        "function": {
-                            "name": func_call.name,
-                            "arguments": func_call. arguments,
-                        }
-                    }
-                    for func_call in message.content
-                ]
-                converted_msg["tool_calls"] = func_calls
-                return converted_msg
-
-    elif isinstance(message, UserMessage):
-        converted_msg = {
-            "role": "user",
-        }
-        if isinstance(message.content, str):
-            converted_msg["content"] = [
-                {
-                    "type": "text",
-                    "text": message.content,
-                }
-            ]
-            return converted_msg
-        elif isinstance(message.content, list) and len(message.content) > 0:
-            if isinstance(message.content[0], str):
-                converted_msg["content"] = [
-                    {
-                        "type": "text",
-                        "text": msg_content,
-                    } for msg_content in message.content
-                ]
-                return converted_msg
-            elif isinstance(message.content[0], Image):
-                converted_msg["content"] = [
-                    {
-                        "type": "image_url",
-                        "image_url": msg_content.data_uri,
-                    } for msg_content in message.content
-                ]
-                return converted_msg
-
-    elif isinstance(message, FunctionExecutionResultMessage):
-        # for wx.ai, tool message is for only 1 tool call, see https://github.com/IBM/watsonx-ai-node-sdk/blob/d02db1884476331be576bf48d77ceb846e88a6c6/watsonx-ai-ml/vml_v1.ts#L6456-L6463
-        return [
-            {
-                "role": "tool",
-                "content": content.content,
-                "tool_call_id": content.call_id
-            }
-            for content in message.content
-        ]
-    raise ValueError(
-        f"error converting autogen message {asdict(message)}"
+def _response_usage(wx_response: dict) -> RequestUsage:
+    return RequestUsage(
+        prompt_tokens=wx_response["usage"]["prompt_tokens"],
+        completion_tokens=wx_response["usage"]["completion_tokens"],
     )
 
 
-def _autogen_tool_schema_to_watsonx_tool(tool: ToolSchema):
-    ret = {
-        "type": "function",
-        "function": {
-            "name": tool["name"],
-        }
-    }
-    if "description" in tool:
-        ret["function"]["description"] = tool["description"]
+def _with_added_usage(wx_response: dict, usage: RequestUsage) -> dict:
+    # the response with the usage of earlier requests made for the same call added
+    if not usage.prompt_tokens and not usage.completion_tokens:
+        return wx_response
+    wx_usage = wx_response["usage"]
+    return dict(
+        wx_response,
+        usage=dict(
+            wx_usage,
+            prompt_tokens=wx_usage["prompt_tokens"] + usage.prompt_tokens,
+            completion_tokens=wx_usage["completion_tokens"] + usage.completion_tokens,
+        ),
+    )
 
-    if "parameters" in tool:
-        params = tool["parameters"]
-        ret["function"]["parameters"] = {
-            "type": params["type"],
-            "properties": params["properties"]
-        }
-        if "required" in params:
-            ret["function"]["parameters"]["required"] = params["required"]
-    return ret
 
+def _estimate_token_count(wx_messages: list, tools_json: str) -> int:
+    # rough estimation of ~4 characters per token, good enough for admission control
+    return (len(dumps(wx_messages)) + len(tools_json)) // 4
 
-def _autogen_tool_to_watsonx_tool(tool: Tool | ToolSchema):
-    if isinstance(tool, dict): # typeddict does not support type check
-        return _autogen_tool_schema_to_watsonx_tool(tool)
-    elif isinstance(tool, Tool):
-        return _autogen_tool_schema_to_watsonx_tool(tool.schema)
+
+def _approximate_completion_tokens(content: Union[str, list[FunctionCall]]) -> int:
+    if isinstance(content, str):
+        return _approximate_token_count(content)
+    return sum(_approximate_token_count(func_call.name + func_call.arguments) for func_call in content)
+
+
+def _endpoint_connection(
+    endpoint: WatsonxEndpoint,
+    url: str,
+    api_key: Optional[str],
+    token: Optional[str],
+    space_id: Optional[str],
+    project_id: Optional[str],
+) -> dict:
+    # an endpoint naming a space or a project does not inherit the other one
+    if "space_id" in endpoint or "project_id" in endpoint:
+        space_id, project_id = endpoint.get("space_id"), endpoint.get("project_id")
+    return dict(
+        url=endpoint.get("url", url),
+        api_key=endpoint.get("api_key", api_key),
+        token=endpoint.get("token", token),
+        space_id=space_id,
+        project_id=project_id,
+    )
 
 
 class WatsonXChatCompletionClient(ChatCompletionClient):
@@ -141,29 +118,174 @@ class WatsonXChatCompletionClient(ChatCompletionClient):
         # one of space_id or project_id should be provided
         space_id = kwargs.pop("space_id", None)
         project_id = kwargs.pop("project_id", None)
-        if space_id is None and project_id is None:
-            raise ValueError("At least one of space_id and project_id needs to be provided for watsonx client")
+        # several endpoints to route requests over, values missing in an endpoint are taken from the ones above
+        endpoints = [
+            _endpoint_connection(endpoint, url, api_key, token, space_id, project_id)
+            for endpoint in kwargs.pop("endpoints", None) or []
+        ]
+        for endpoint in endpoints or [dict(space_id=space_id, project_id=project_id)]:
+            if endpoint["space_id"] is None and endpoint["project_id"] is None:
+                raise ValueError("At least one of space_id and project_id needs to be provided for watsonx client")
+        if endpoints:
+            url, api_key, token, space_id, project_id = (
+                endpoints[0][key] for key in ("url", "api_key", "token", "space_id", "project_id")
+            )
         # model id
         model_id = kwargs.pop("model_id")
+        # thread pool for the blocking fallback of sdk calls, created on first use
+        self._executor_max_workers = kwargs.pop("executor_max_workers", None)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # admission control
+        self._admission = AdmissionController(
+            max_concurrent_requests=kwargs.pop("max_concurrent_requests", None),
+            requests_per_second=kwargs.pop("requests_per_second", None),
+            tokens_per_minute=kwargs.pop("tokens_per_minute", None),
+        )
+        # response cache
+        self._response_cache: Optional[ResponseCache] = kwargs.pop("response_cache", None)
+        # conversion cache, a shared instance takes precedence over a private one of `conversion_cache_size`
+        self._conversion_cache: Optional[MessageConversionCache] = kwargs.pop("conversion_cache", None)
+        conversion_cache_size = kwargs.pop("conversion_cache_size", 1024)
+        if self._conversion_cache is None and conversion_cache_size:
+            self._conversion_cache = MessageConversionCache(max_size=conversion_cache_size)
+        # tools are converted once and reused for the lifetime of the client
+        self._tool_registry = ToolRegistry()
+        # token counting through the tokenize endpoint or a local approximation
+        self._token_counter = TokenCounter(
+            tokenize=self._tokenize,
+            mode=kwargs.pop("token_count_mode", "service"),
+        )
+        # opt-in trimming of the converted history before it is sent
+        self._context_policy: Optional[ContextPolicy] = kwargs.pop("context_policy", None)
+        self._context_stats = ContextStatsCounter()
+        # model limits given here take precedence over the ones fetched from the model specs
+        self._limits_override = ModelLimits(
+            max_sequence_length=kwargs.pop("max_sequence_length", None),
+            max_output_tokens=kwargs.pop("max_output_tokens", None),
+        )
+        self._url = url
+        # connection sharing and http pool limits
+        share_connections = kwargs.pop("share_connections", True)
+        # build the sdk objects on first use instead of here
+        lazy_init = kwargs.pop("lazy_init", False)
+        max_connections = kwargs.pop("max_connections", None)
+        max_keepalive_connections = kwargs.pop("max_keepalive_connections", None)
+        # tls verification, e.g. the path of the CA bundle of a cluster with its own certificates
+        verify = kwargs.pop("verify", None)
+        # encoding of the request bodies and decoding of the responses
+        fast_json = kwargs.pop("fast_json", False)
+        if fast_json and orjson is None:
+            raise ImportError("fast_json needs the orjson package, install it with `pip install orjson`")
+        compress_requests = kwargs.pop("compress_requests", False)
+        compress_min_size = kwargs.pop("compress_min_size", 1024)
+
+        # coalescing of streamed content deltas, off unless one of the options is set
+        self._coalesce_args = dict(
+            min_chars=kwargs.pop("stream_coalesce_chars", None),
+            max_delay=kwargs.pop("stream_coalesce_interval", None),
+            boundary=kwargs.pop("stream_coalesce_boundary", None),
+        )
+        ChunkCoalescer(**self._coalesce_args)  # validates the options
+        # yield a ToolCallReadyEvent as soon as the arguments of a streamed tool call are complete
+        self._stream_tool_call_events = kwargs.pop("stream_tool_call_events", False)
+        # chunks the stream reader can read ahead of a slow consumer
+        self._stream_buffer_size = kwargs.pop("stream_buffer_size", 256)
+        # latency metrics of the latest streams
+        self._stream_stats = StreamStatsAggregator()
+
+        # per call hooks and tracing spans, nothing is recorded unless one of them is set
+        instrumentation_hooks = kwargs.pop("instrumentation_hooks", None)
+        tracing = kwargs.pop("tracing", False)
+        self._instrumentation: Optional[Instrumentation] = None
+        if instrumentation_hooks or tracing:
+            self._instrumentation = Instrumentation(instrumentation_hooks or (), tracing=tracing)
+
+        # usage breakdown by source and model and token budgets, a shared tracker takes precedence
+        self._usage_source = kwargs.pop("usage_source", None)
+        usage_window = kwargs.pop("usage_window", 3600.0)
+        token_budgets = kwargs.pop("token_budgets", None) or ()
+        self._usage_tracker: UsageTracker = (
+            kwargs.pop("usage_tracker", None) or UsageTracker(usage_window, token_budgets)
+        )
+
+        # retries of transient failures
+        self._retrier = Retrier(RetryPolicy(
+            max_retries=kwargs.pop("max_retries", DEFAULT_MAX_RETRIES),
+            base_delay=kwargs.pop("retry_base_delay", 0.5),
+            max_delay=kwargs.pop("retry_max_delay", 30.0),
+            retry_status_codes=frozenset(kwargs.pop("retry_status_codes", DEFAULT_RETRY_STATUS_CODES)),
+            respect_retry_after=kwargs.pop("respect_retry_after", True),
+            deadline=kwargs.pop("request_deadline", None),
+        ))
+
+        # duplicate slow create requests, optionally to a second endpoint
+        hedge_requests = kwargs.pop("hedge_requests", False)
+        hedger = Hedger(
+            percentile=kwargs.pop("hedge_percentile", 95),
+            max_ratio=kwargs.pop("hedge_max_ratio", 0.05),
+            min_delay=kwargs.pop("hedge_min_delay", 0.0),
+        )
+        self._hedger: Optional[Hedger] = hedger if hedge_requests else None
+        hedge_url = kwargs.pop("hedge_url", None)
+
+        cascade_model_ids = kwargs.pop("cascade_model_ids", None)
+        cascade_escalate_on = kwargs.pop("cascade_escalate_on", DEFAULT_ESCALATION_TRIGGERS)
+        cascade_min_logprob = kwargs.pop("cascade_min_logprob", -1.0)
+        routing_policy = kwargs.pop("routing_policy", "round_robin")
+        circuit_failure_threshold = kwargs.pop("circuit_failure_threshold", 5)
+        circuit_reset_timeout = kwargs.pop("circuit_reset_timeout", 30.0)
 
         # decoding params
         wx_params = dict(kwargs).copy()
+        self._max_tokens = wx_params.get("max_tokens") or 0
+        self._model_id = model_id
+        self._wx_params = wx_params
 
-        # api_key or token can be used
-        credentials = Credentials(url=url, api_key=api_key, token=token)
-
-        # client
-        self._client = ModelInference(
+        # client, shared with other clients of the same connection and model unless opted out
+        self._registry = get_model_inference_registry() if share_connections else ModelInferenceRegistry()
+        self._connection_args = dict(
             model_id=model_id,
-            credentials=credentials,
+            params=wx_params,
+            url=url,
+            api_key=api_key,
+            token=token,
             space_id=space_id,
             project_id=project_id,
-            params=wx_params,
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            verify=verify,
+            fast_json=fast_json,
+            compress_min_size=compress_min_size if compress_requests else None,
         )
+        # requests go through the router when several endpoints are configured,
+        # the first endpoint serves token counting and model specs
+        self._router: Optional[Router] = None
+        if len(endpoints) > 1:
+            self._router = Router(
+                [dict(self._connection_args, **endpoint) for endpoint in endpoints],
+                acquire=self._registry.acquire,
+                is_failure=self._retrier.is_retryable,
+                policy=routing_policy,
+                failure_threshold=circuit_failure_threshold,
+                reset_timeout=circuit_reset_timeout,
+            )
+        # cheaper models asked first, the tiers use the first endpoint
+        self._cascade: Optional[ModelCascade] = None
+        if cascade_model_ids:
+            self._cascade = ModelCascade(
+                cascade_model_ids, model_id, escalate_on=cascade_escalate_on, min_logprob=cascade_min_logprob
+            )
+        self._cascade_leases: dict[str, ModelInferenceLease] = {}
+        self._lease: Optional[ModelInferenceLease] = None
+        self._hedge_connection_args = None if hedge_url is None else dict(self._connection_args, url=hedge_url)
+        self._hedge_lease: Optional[ModelInferenceLease] = None
+        self._connect_lock = threading.Lock()
+        if not lazy_init:
+            self._connect(running_loop())
 
-        # usage
-        self._total_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
-        self._actual_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        # usage, `total` includes the responses served from the cache
+        self._total_usage = UsageCounter()
+        self._actual_usage = UsageCounter()
 
     async def create(
         self,
@@ -172,6 +294,27 @@ class WatsonXChatCompletionClient(ChatCompletionClient):
         json_output: Optional[bool] = None,
         extra_create_args: Mapping[str, Any] = {},
         cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        if self._instrumentation is None:
+            return await self._create(messages, tools, json_output, extra_create_args, cancellation_token, NOOP_TRACE)
+        trace = self._instrumentation.start("create", self._model_id, len(messages), len(tools))
+        try:
+            with trace.activate():
+                result = await self._create(messages, tools, json_output, extra_create_args, cancellation_token, trace)
+        except BaseException as e:
+            trace.finish(error=e)
+            raise
+        trace.finish(result)
+        return result
+
+    async def _create(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema],
+        json_output: Optional[bool],
+        extra_create_args: Mapping[str, Any],
+        cancellation_token: Optional[CancellationToken],
+        trace: CallTrace,
     ) -> CreateResult:
         # TODO: support extra_create_args
         if extra_create_args:
@@ -180,28 +323,72 @@ class WatsonXChatCompletionClient(ChatCompletionClient):
             raise ValueError("Watsonx client only supports json format output, do not provide `json_output`")
 
         # convert messages
-        wx_messages = []
-        for m in messages:
-            converted_msg = _autogen_message_to_watsonx_message(m)
-            if isinstance(converted_msg, list):
-                wx_messages.extend(converted_msg)
-            else:
-                wx_messages.append(converted_msg)
+        wx_messages = self._convert_messages(messages)
         # convert tools
-        converted_tools = [_autogen_tool_to_watsonx_tool(tool) for tool in tools]
+        converted_tools = self._tool_registry.convert(tools)
+        trace.mark("conversion")
+        wx_messages, context_trim = await self._apply_context_policy(wx_messages)
+        trace.mark("context")
 
-        # TODO: update to async version when available
-        # TODO: handle cancellation_token
-        wx_response = self._client.chat(
-            messages=wx_messages,
-            tools=converted_tools
-        )
+        source = self._call_usage_source()
+        cache_key = self._response_cache_key(wx_messages, converted_tools.json)
+        if cache_key is not None:
+            cached_result = self._response_cache.get(cache_key)
+            if cached_result is not None:
+                self._record_usage(cached_result.usage, source, self._model_id, cached=True)
+                trace.mark("cache")
+                return cached_result
+        trace.mark("cache")
 
-        usage = RequestUsage(
-            prompt_tokens=wx_response["usage"]["prompt_tokens"],
-            completion_tokens=wx_response["usage"]["completion_tokens"],
-        )
+        estimated_tokens = self._estimate_request_tokens(wx_messages, converted_tools.json)
+        cascade_usage = None
+        if self._cascade is not None:
+            attempt = asyncio.ensure_future(
+                self._cascade_tiers(trace, source, estimated_tokens, messages=wx_messages, tools=converted_tools.tools)
+            )
+            if cancellation_token is not None:
+                cancellation_token.link_future(attempt)
+            accepted, cascade_usage = await attempt
+            trace.mark("request")
+            if accepted is not None:
+                response = self._create_result(accepted, _response_usage(accepted), context_trim)
+                trace.mark("post_processing")
+                if cache_key is not None:
+                    self._response_cache.set(cache_key, response)
+                return response
+
+        async with self._usage_tracker.reserve(estimated_tokens, source, self._model_id):
+            trace.mark("budget")
+            await self._aconnect()
+            trace.mark("connect")
+            async with self._admission.admit(estimated_tokens) as admission:
+                trace.mark("admission")
+                start = time.perf_counter()
+                # cancelling the token cancels the request, which closes its http connection
+                request = asyncio.ensure_future(self._chat(trace, messages=wx_messages, tools=converted_tools.tools))
+                if cancellation_token is not None:
+                    cancellation_token.link_future(request)
+                wx_response = await request
+                trace.mark("request")
+
+                usage = _response_usage(wx_response)
+                admission.actual_tokens = usage.prompt_tokens + usage.completion_tokens
+            self._record_usage(usage, source, self._model_id)
 
+        if cascade_usage is not None:
+            self._cascade.record(self._model_id, time.perf_counter() - start, None)
+            usage = _add_usage(usage, cascade_usage)
+        response = self._create_result(wx_response, usage, context_trim)
+        trace.mark("post_processing")
+
+        if cache_key is not None:
+            self._response_cache.set(cache_key, response)
+
+        return response
+
+    def _create_result(
+        self, wx_response: dict, usage: RequestUsage, context_trim: Optional[ContextTrimStats] = None
+    ) -> CreateResult:
         # Limited to a single choice currently.
         choice = wx_response["choices"][0]
 
@@ -219,28 +406,64 @@ class WatsonXChatCompletionClient(ChatCompletionClient):
             )
         content = text_content if text_content is not None else tool_calls_content
 
-        response = CreateResult(
+        return WatsonxCreateResult(
             finish_reason=WatsonXChatCompletionClient.convert_finish_reason(choice["finish_reason"]),
             content=content,
             usage=usage,
             cached=False,
+            context_trim=context_trim,
             # TODO: enable logprobs by default to feed them here
         )
 
-        _add_usage(self._actual_usage, usage)
-        _add_usage(self._total_usage, usage)
-
-        return response
-
-    async def create_stream(
+    def create_stream(
         self,
         messages: Sequence[LLMMessage],
         tools: Sequence[Tool | ToolSchema] = [],
         json_output: Optional[bool] = None,
         extra_create_args: Mapping[str, Any] = {},
         cancellation_token: Optional[CancellationToken] = None,
-    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+    ) -> AsyncGenerator[Union[str, ToolCallReadyEvent, CreateResult], None]:
+        if self._instrumentation is None:
+            return self._create_stream(messages, tools, json_output, extra_create_args, cancellation_token, NOOP_TRACE)
+        trace = self._instrumentation.start("create_stream", self._model_id, len(messages), len(tools))
+        return self._traced_stream(
+            trace, self._create_stream(messages, tools, json_output, extra_create_args, cancellation_token, trace)
+        )
+
+    @staticmethod
+    async def _traced_stream(
+        trace: CallTrace, stream: AsyncGenerator[Union[str, ToolCallReadyEvent, CreateResult], None]
+    ) -> AsyncGenerator[Union[str, ToolCallReadyEvent, CreateResult], None]:
+        result = None
+        error = None
+        try:
+            while True:
+                # the span is current while the stream runs, not while the consumer handles an item
+                with trace.activate():
+                    try:
+                        item = await stream.__anext__()
+                    except StopAsyncIteration:
+                        break
+                if isinstance(item, CreateResult):
+                    result = item
+                yield item
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with trace.activate():
+                await stream.aclose()
+            trace.finish(result, error)
 
+    async def _create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema],
+        json_output: Optional[bool],
+        extra_create_args: Mapping[str, Any],
+        cancellation_token: Optional[CancellationToken],
+        trace: CallTrace,
+    ) -> AsyncGenerator[Union[str, ToolCallReadyEvent, CreateResult], None]:
         # TODO: support extra_create_args
         if extra_create_args:
             raise ValueError("extra_create_args is not supported for Watsonx client")
@@ -248,113 +471,554 @@ class WatsonXChatCompletionClient(ChatCompletionClient):
             raise ValueError("Watsonx client only supports json format output, do not provide `json_output`")
 
         # convert messages
-        wx_messages = []
-        for m in messages:
-            converted_msg = _autogen_message_to_watsonx_message(m)
-            if isinstance(converted_msg, list):
-                wx_messages.extend(converted_msg)
-            else:
-                wx_messages.append(converted_msg)
+        wx_messages = self._convert_messages(messages)
         # convert tools
-        converted_tools = [_autogen_tool_to_watsonx_tool(tool) for tool in tools]
-        # TODO: handle cancellation_token
+        converted_tools = self._tool_registry.convert(tools)
+        trace.mark("conversion")
+        wx_messages, context_trim = await self._apply_context_policy(wx_messages)
+        trace.mark("context")
+
+        source = self._call_usage_source()
+        cache_key = self._response_cache_key(wx_messages, converted_tools.json)
+        if cache_key is not None:
+            cached_result = self._response_cache.get(cache_key)
+            if cached_result is not None:
+                trace.mark("cache")
+                # replay the cached response as a single chunk
+                if isinstance(cached_result.content, str) and len(cached_result.content) > 0:
+                    yield cached_result.content
+                self._record_usage(cached_result.usage, source, self._model_id, cached=True)
+                yield cached_result
+                return
+        trace.mark("cache")
+
+        estimated_tokens = self._estimate_request_tokens(wx_messages, converted_tools.json)
+        # the cheaper models of the cascade answer without streaming,
+        # an accepted answer is replayed as a single chunk
+        cascade_usage = None
+        if self._cascade is not None:
+            attempt = asyncio.ensure_future(
+                self._cascade_tiers(trace, source, estimated_tokens, messages=wx_messages, tools=converted_tools.tools)
+            )
+            if cancellation_token is not None:
+                cancellation_token.link_future(attempt)
+            accepted, cascade_usage = await attempt
+            trace.mark("request")
+            if accepted is not None:
+                result = self._create_result(accepted, _response_usage(accepted), context_trim)
+                trace.mark("post_processing")
+                if isinstance(result.content, str) and len(result.content) > 0:
+                    yield result.content
+                elif self._stream_tool_call_events and isinstance(result.content, list):
+                    for index, call in enumerate(result.content):
+                        yield ToolCallReadyEvent(index=index, call=call)
+                if cache_key is not None:
+                    self._response_cache.set(cache_key, result)
+                yield result
+                return
+
+        async with self._usage_tracker.reserve(estimated_tokens, source, self._model_id):
+            trace.mark("budget")
+            await self._aconnect()
+            trace.mark("connect")
+
+            async with self._admission.admit(estimated_tokens) as admission:
+                trace.mark("admission")
+                timer = StreamTimer()
+                coalescer = ChunkCoalescer(**self._coalesce_args)
+                # nothing has reached the consumer before the first chunk, so up to there the stream can be retried
+                stream_future = asyncio.ensure_future(
+                    self._retrier.call(
+                        partial(self._open_stream, messages=wx_messages, tools=converted_tools.tools), trace.on_retry
+                    )
+                )
+                if cancellation_token is not None:
+                    cancellation_token.link_future(stream_future)
+                stream = await stream_future
+                trace.mark("request")
+                # a single reader task keeps reading the http stream while chunks are processed and yielded,
+                # cancelling the token cancels the reader, which closes the http stream
+                reader = StreamReader(stream, max_buffered=self._stream_buffer_size)
+                if cancellation_token is not None:
+                    cancellation_token.link_future(reader.task)
+
+                # keep track of results from the chunks for the final CreateResult to yield
+                contents = []
+                tool_call_accumulator = ToolCallAccumulator()
+                wx_usage = None
+
+                try:
+                    while True:
+                        # with a coalescing delay, wait for the next chunk only until the buffered text is due
+                        try:
+                            chunk = await reader.next(coalescer.time_until_flush())
+                        except StopAsyncIteration:
+                            break
+                        if chunk is TIMED_OUT:
+                            pending = coalescer.poll()
+                            if pending:
+                                yield pending
+                            continue
+
+                        # usage, if reported at all, comes with the last chunk
+                        usage_chunk = chunk.get("usage")
+                        if usage_chunk:
+                            wx_usage = usage_chunk
+
+                        #  Avoid KeyError, go to next iteration
+                        choices = chunk.get("choices")
+                        if not choices:
+                            continue
 
-        stream_future = asyncio.ensure_future(
-            self._client.achat_stream(
-            messages=wx_messages,
-            tools=converted_tools
+                        choice = choices[0]
+                        delta = choice["delta"]
+
+                        # First try to get content (content could be empty string, especially the first delta)
+                        content = delta.get("content")
+                        if content:
+                            timer.on_chunk()
+                            contents.append(content)
+                            if coalescer.enabled:
+                                content = coalescer.push(content)
+                                if content is None:
+                                    continue
+                            yield content
+                            continue
+
+                        # Otherwise, get tool calls
+                        tool_calls = delta.get("tool_calls")
+                        if tool_calls is not None:
+                            timer.on_chunk()
+                            # when does tool_calls contain more than 1 item? it seems even when there are 2 func calls in one turn, they get generated sequentially
+                            for tool_call_chunk in tool_calls:
+                                tool_call_ready = tool_call_accumulator.add(tool_call_chunk)
+                                if tool_call_ready is not None and self._stream_tool_call_events:
+                                    yield tool_call_ready
+                        # TODO: handle logprobs
+                except asyncio.CancelledError:
+                    # account for what was generated before the cancellation
+                    partial_content = "".join(contents) if contents else tool_call_accumulator.function_calls()
+                    usage = self._stream_usage(wx_usage, wx_messages, converted_tools.json, partial_content)
+                    admission.actual_tokens = usage.prompt_tokens + usage.completion_tokens
+                    self._record_usage(usage, source, self._model_id)
+                    raise
+                finally:
+                    await reader.aclose()
+                trace.mark("stream")
+
+                pending = coalescer.flush()
+                if pending:
+                    yield pending
+                if self._stream_tool_call_events:
+                    for tool_call_ready in tool_call_accumulator.pending_events():
+                        yield tool_call_ready
+
+                content: Union[str, list[FunctionCall]]
+                if len(contents) > 0:
+                    content = "".join(contents)
+                else:
+                    content = tool_call_accumulator.function_calls()
+
+                usage = self._stream_usage(wx_usage, wx_messages, converted_tools.json, content)
+                admission.actual_tokens = usage.prompt_tokens + usage.completion_tokens
+
+            stream_stats = timer.finish(usage_estimated=wx_usage is None)
+            self._stream_stats.add(stream_stats)
+            self._record_usage(usage, source, self._model_id)
+            if cascade_usage is not None:
+                self._cascade.record(self._model_id, stream_stats.duration, None)
+                usage = _add_usage(usage, cascade_usage)
+
+            result = WatsonxCreateResult(
+                finish_reason=WatsonXChatCompletionClient.convert_finish_reason(choice["finish_reason"]),
+                content=content,
+                usage=usage,
+                cached=False,
+                stream_stats=stream_stats,
+                context_trim=context_trim,
+                # TODO: logprobs and thought
             )
+            trace.mark("post_processing")
+
+        if cache_key is not None:
+            self._response_cache.set(cache_key, result)
+
+        yield result
+
+    async def create_many(
+        self,
+        conversations: Iterable[Sequence[LLMMessage]],
+        tools: Sequence[Tool | ToolSchema] = [],
+        max_concurrency: int = 16,
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> BatchResult:
+        """
+        `create` for many independent conversations with at most `max_concurrency` calls in flight,
+        the admission limits of the client apply on top.
+        results come back in input order, errors are captured per conversation.
+        """
+        return await run_batch(self.create_many_as_completed(conversations, tools, max_concurrency, cancellation_token))
+
+    def create_many_as_completed(
+        self,
+        conversations: Iterable[Sequence[LLMMessage]],
+        tools: Sequence[Tool | ToolSchema] = [],
+        max_concurrency: int = 16,
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> BatchIterator:
+        """
+        like `create_many`, but yields a BatchItem per conversation as soon as it completes,
+        `.stats` of the iterator reports throughput and usage so far
+        """
+        return BatchIterator(
+            partial(self.create, tools=tools),
+            conversations,
+            max_concurrency=max_concurrency,
+            cancellation_token=cancellation_token,
         )
 
-        stream = await stream_future
-
-        # keep track of results from the chunks for the final CreateResult to yield
-        contents = []
-        full_tool_calls: dict[int, FunctionCall] = {}
-
-        while True:
-            try:
-                chunk_future = asyncio.ensure_future(anext(stream))
-                chunk = await chunk_future
-
-                #  Avoid KeyError, go to next iteration
-                if not chunk.get("choices"):
-                    continue
-
-                choice = chunk["choices"][0]
-
-                # First try to get content (content could be empty string, especially the first delta)
-                if "content" in choice["delta"]:
-                    content = choice["delta"]["content"]
-                    if len(content) > 0:
-                        contents.append(content)
-                        yield content
-                    continue
-
-                # Otherwise, get tool calls
-                if "tool_calls" in choice["delta"]:
-                    tool_calls = choice["delta"]["tool_calls"]
-                    # when does tool_calls contain more than 1 item? it seems even when there are 2 func calls in one turn, they get generated sequentially
-                    for tool_call_chunk in tool_calls:
-                        idx = tool_call_chunk["index"]
-                        if idx not in full_tool_calls:
-                            full_tool_calls[idx] = FunctionCall(id="", arguments="", name="")
-
-                        if "id" in tool_call_chunk:
-                            full_tool_calls[idx].id += tool_call_chunk["id"]
-
-                        if "function" in tool_call_chunk:
-                            function = tool_call_chunk["function"]
-                            if "name" in function:
-                                full_tool_calls[idx].name += function["name"]
-                            if "arguments" in function:
-                                full_tool_calls[idx].arguments += function["arguments"]
-                # TODO: handle logprobs
-
-            except StopAsyncIteration:
-                break
-
-        content: Union[str, list[FunctionCall]]
-        if len(contents) > 0:
-            content = "".join(contents)
-        else:
-            content = list(full_tool_calls.values())
+    @property
+    def _client(self):
+        if self._lease is None:
+            self._connect(running_loop())
+        return self._lease.model
+
+    def _connect(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        with self._connect_lock:
+            if self._lease is None:
+                self._lease = self._registry.acquire(**self._connection_args, loop=loop)
+
+    async def _aconnect(self) -> None:
+        loop = asyncio.get_running_loop()
+        lease = self._lease
+        if lease is not None and not lease.bind(loop):
+            # its async http pools belong to another event loop
+            self._lease = None
+            await lease.release()
+        # constructing the sdk objects does blocking network and auth work, keep it off the event loop
+        if self._lease is None:
+            await self._run_in_executor(self._connect, loop)
+
+    async def warmup(self) -> None:
+        """
+        build the sdk objects and authenticate ahead of the first request, only useful with `lazy_init`
+        """
+        await self._aconnect()
+
+    async def _open_stream(self, **chat_kwargs) -> AsyncIterator:
+        """
+        opens the stream and waits for its first chunk, so that failures up to the first chunk can be retried
+        """
+        if self._router is None:
+            return await self._open_stream_on(self._client, **chat_kwargs)
+        # the stream counts as in flight on its endpoint until it is closed, its latency is the time to the first chunk
+        route = self._router.route()
+        try:
+            model = await self._router.model(route.endpoint, self._run_in_executor)
+            stream = await self._open_stream_on(model, on_close=route.release, **chat_kwargs)
+        except BaseException as e:
+            route.record(e)
+            route.release()
+            raise
+        route.record()
+        return stream
 
-        # TODO: achat_stream endpoint doesn't seem to return usage at all...
-        usage = RequestUsage(
-            prompt_tokens=0,
-            completion_tokens=0,
+    async def _open_stream_on(self, model, on_close: Optional[Callable[[], None]] = None, **chat_kwargs) -> AsyncIterator:
+        stream = await model.achat_stream(**chat_kwargs)
+        try:
+            first_chunk = await anext(stream)
+        except StopAsyncIteration:
+            if on_close is not None:
+                on_close()
+            return stream
+        except BaseException:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            raise
+        return _PrependedStream(first_chunk, stream, on_close)
+
+    @staticmethod
+    def _stream_usage(
+        wx_usage: Optional[dict], wx_messages: list, tools_json: str, content: Union[str, list[FunctionCall]]
+    ) -> RequestUsage:
+        if wx_usage is not None:
+            return RequestUsage(
+                prompt_tokens=wx_usage["prompt_tokens"],
+                completion_tokens=wx_usage["completion_tokens"],
+            )
+        # achat_stream does not always report usage, estimate it locally
+        return RequestUsage(
+            prompt_tokens=_estimate_token_count(wx_messages, tools_json),
+            completion_tokens=_approximate_completion_tokens(content),
         )
 
-        result = CreateResult(
-            finish_reason=WatsonXChatCompletionClient.convert_finish_reason(choice["finish_reason"]),
-            content=content,
-            usage=usage,
-            cached=False,
-            # TODO: logprobs and thought
+    def stream_stats(self) -> StreamStatsSummary:
+        """
+        time to first token, inter-chunk latency and duration percentiles of the latest `create_stream` calls
+        """
+        return self._stream_stats.summary()
+
+    def context_stats(self) -> ContextStats:
+        """
+        calls trimmed by the context policy, and the messages and tokens they did not send
+        """
+        return self._context_stats.stats()
+
+    def retry_stats(self) -> RetryStats:
+        """
+        number of calls, retries and time spent in backoff, and calls that failed after their retries or deadline
+        """
+        return self._retrier.stats()
+
+    def hedging_stats(self) -> Optional[HedgingStats]:
+        """
+        hedges fired and won by `create` and the current hedge delay, None unless `hedge_requests` is enabled
+        """
+        if self._hedger is None:
+            return None
+        return self._hedger.stats()
+
+    def cascade_stats(self) -> Optional[CascadeStats]:
+        """
+        calls, hit rate, escalations and latency per model of the cascade, None unless `cascade_model_ids` is set
+        """
+        if self._cascade is None:
+            return None
+        return self._cascade.stats()
+
+    def routing_stats(self) -> list[EndpointStats]:
+        """
+        requests, failures, in-flight requests, latency average and circuit state per endpoint,
+        empty unless several `endpoints` are configured
+        """
+        if self._router is None:
+            return []
+        return self._router.stats()
+
+    def admission_stats(self) -> AdmissionStats:
+        """
+        in-flight requests, queue depth and time spent waiting for admission, useful for sizing the limits
+        """
+        return self._admission.stats()
+
+    def _convert_messages(self, messages: Sequence[LLMMessage]) -> list:
+        if self._conversion_cache is None:
+            return _autogen_messages_to_watsonx_messages(messages)
+        return self._conversion_cache.convert(messages)
+
+    async def _apply_context_policy(self, wx_messages: list) -> tuple[list, Optional[ContextTrimStats]]:
+        if self._context_policy is None:
+            return wx_messages, None
+        if self._token_counter.mode == "service":
+            # counting may call the tokenize endpoint
+            wx_messages, context_trim = await self._run_in_executor(
+                self._context_policy.apply, wx_messages, self._token_counter.count_each
+            )
+        else:
+            wx_messages, context_trim = self._context_policy.apply(wx_messages, self._token_counter.count_each)
+        self._context_stats.add(context_trim)
+        return wx_messages, context_trim
+
+    def _response_cache_key(self, wx_messages: list, tools_json: str) -> Optional[str]:
+        if self._response_cache is None:
+            return None
+        return response_cache_key(self._model_id, self._wx_params, wx_messages, tools_json)
+
+    def _estimate_request_tokens(self, wx_messages: list, tools_json: str) -> int:
+        if not self._admission.enabled and not self._usage_tracker.has_budgets:
+            return 0
+        return _estimate_token_count(wx_messages, tools_json) + self._max_tokens
+
+    async def _achat(self, model=None, **chat_kwargs) -> dict:
+        """
+        non-blocking chat request, uses the sdk's `achat` when available,
+        otherwise runs the blocking `chat` in the client's thread pool
+        """
+        if model is None and self._router is not None:
+            return await self._routed_achat(**chat_kwargs)
+        model = model or self._client
+        if hasattr(model, "achat"):
+            return await model.achat(**chat_kwargs)
+        return await self._run_in_executor(model.chat, **chat_kwargs)
+
+    async def _routed_achat(self, **chat_kwargs) -> dict:
+        route = self._router.route()
+        try:
+            model = await self._router.model(route.endpoint, self._run_in_executor)
+            result = await self._achat(model, **chat_kwargs)
+        except BaseException as e:
+            route.record(e)
+            raise
+        finally:
+            route.release()
+        route.record()
+        return result
+
+    async def _chat(self, trace: CallTrace, **chat_kwargs) -> dict:
+        return await self._retrier.call(partial(self._hedged_achat, **chat_kwargs), trace.on_retry)
+
+    async def _cascade_tiers(
+        self, trace: CallTrace, source: Optional[str], estimated_tokens: int, **chat_kwargs
+    ) -> tuple[Optional[dict], RequestUsage]:
+        """
+        asks the cheaper models of the cascade in turn, returns the first accepted response and the usage of all tiers asked,
+        the usage of the escalated tiers is added to the usage of the accepted response.
+        each tier is admitted, held against the budgets and charged with its usage as a call of its own model
+        """
+        tool_names = {tool["function"]["name"] for tool in chat_kwargs.get("tools") or []}
+        cascade_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        for model_id in self._cascade.model_ids:
+            async with self._usage_tracker.reserve(estimated_tokens, source, model_id):
+                model = await self._cascade_model(model_id)
+                async with self._admission.admit(estimated_tokens) as admission:
+                    start = time.perf_counter()
+                    try:
+                        wx_response = await self._retrier.call(
+                            partial(self._achat, model, **chat_kwargs), trace.on_retry
+                        )
+                    except Exception:
+                        if not self._cascade.escalates_on_error:
+                            raise
+                        self._cascade.record(model_id, time.perf_counter() - start, "error")
+                        continue
+                    tier_usage = _response_usage(wx_response)
+                    admission.actual_tokens = tier_usage.prompt_tokens + tier_usage.completion_tokens
+                self._record_usage(tier_usage, source, model_id)
+            reason = self._cascade.escalation_reason(wx_response, tool_names)
+            self._cascade.record(model_id, time.perf_counter() - start, reason)
+            if reason is None:
+                return _with_added_usage(wx_response, cascade_usage), _add_usage(cascade_usage, tier_usage)
+            cascade_usage = _add_usage(cascade_usage, tier_usage)
+        return None, cascade_usage
+
+    async def _cascade_model(self, model_id: str):
+        loop = asyncio.get_running_loop()
+        lease = self._cascade_leases.get(model_id)
+        if lease is not None and not lease.bind(loop):
+            del self._cascade_leases[model_id]
+            await lease.release()
+        if model_id not in self._cascade_leases:
+            await self._run_in_executor(self._connect_cascade, model_id, loop)
+        return self._cascade_leases[model_id].model
+
+    def _connect_cascade(self, model_id: str, loop: asyncio.AbstractEventLoop) -> None:
+        with self._connect_lock:
+            if model_id not in self._cascade_leases:
+                params = self._wx_params
+                if self._cascade.needs_logprobs:
+                    params = dict(params, logprobs=True)
+                self._cascade_leases[model_id] = self._registry.acquire(
+                    **dict(self._connection_args, model_id=model_id, params=params), loop=loop
+                )
+
+    async def _hedged_achat(self, **chat_kwargs) -> dict:
+        if self._hedger is None:
+            return await self._achat(**chat_kwargs)
+        return await self._hedger.call(
+            partial(self._achat, **chat_kwargs),
+            partial(self._achat_hedge, **chat_kwargs),
         )
 
-        self._total_usage = _add_usage(self._total_usage, usage)
-        self._actual_usage = _add_usage(self._actual_usage, usage)
+    async def _achat_hedge(self, **chat_kwargs) -> dict:
+        if self._hedge_connection_args is None:
+            return await self._achat(**chat_kwargs)
+        loop = asyncio.get_running_loop()
+        lease = self._hedge_lease
+        if lease is not None and not lease.bind(loop):
+            self._hedge_lease = None
+            await lease.release()
+        if self._hedge_lease is None:
+            await self._run_in_executor(self._connect_hedge, loop)
+        return await self._achat(self._hedge_lease.model, **chat_kwargs)
 
-        yield result
+    def _connect_hedge(self, loop: asyncio.AbstractEventLoop) -> None:
+        with self._connect_lock:
+            if self._hedge_lease is None:
+                self._hedge_lease = self._registry.acquire(**self._hedge_connection_args, loop=loop)
+
+    async def _run_in_executor(self, func, *args, **kwargs):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._executor_max_workers,
+                thread_name_prefix="watsonx-client",
+            )
+        loop = asyncio.get_running_loop()
+        # as asyncio.to_thread, spans the sdk starts in the thread nest under the span of the call
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, partial(context.run, func, *args, **kwargs))
+
+    def _call_usage_source(self) -> Optional[str]:
+        source = current_usage_source()
+        return self._usage_source if source is None else source
+
+    def _record_usage(self, usage: RequestUsage, source: Optional[str], model_id: str, cached: bool = False) -> None:
+        # charged to the model that served the call, a cascade tier or `model_id`
+        self._total_usage.add(usage)
+        if not cached:
+            self._actual_usage.add(usage)
+        self._usage_tracker.record(usage, source, model_id, cached=cached)
 
     def actual_usage(self) -> RequestUsage:
-        return self._actual_usage
+        return self._actual_usage.usage()
 
     def total_usage(self) -> RequestUsage:
-        return self._total_usage
+        return self._total_usage.usage()
+
+    def usage_stats(self) -> list[UsageStats]:
+        """
+        usage per source and model, of all clients sharing the usage tracker
+        """
+        return self._usage_tracker.stats()
+
+    def budget_stats(self) -> list[BudgetStats]:
+        return self._usage_tracker.budget_stats()
 
     def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
-        # TODO: proper calculation by calling self._client.tokenize
-        return 0
+        wx_messages = self._convert_messages(messages)
+        converted_tools = self._tool_registry.convert(tools)
+        return self._token_counter.count(wx_messages, converted_tools.json)
+
+    def _tokenize(self, text: str) -> int:
+        response = self._retrier.call_blocking(partial(self._client.tokenize, prompt=text))
+        return response["result"]["token_count"]
 
     def remaining_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool | ToolSchema] = []) -> int:
-        # TODO: any watsonx api to support this?
-        return 1
+        max_sequence_length = self.model_limits().max_sequence_length
+        if max_sequence_length is None:
+            raise ValueError(
+                f"max sequence length of {self._model_id} is unknown, provide `max_sequence_length` for watsonx client"
+            )
+        return max_sequence_length - self.count_tokens(messages, tools)
+
+    def model_limits(self) -> ModelLimits:
+        """
+        context window and output limits of the model, from the configuration or the cached model specs
+        """
+        override = self._limits_override
+        if override.max_sequence_length is not None and override.max_output_tokens is not None:
+            return override
+        fetched = get_model_spec_cache().get(
+            self._url, self._model_id, partial(self._retrier.call_blocking, self._client.get_details)
+        )
+        return ModelLimits(
+            max_sequence_length=override.max_sequence_length or fetched.max_sequence_length,
+            max_output_tokens=override.max_output_tokens or fetched.max_output_tokens,
+        )
 
     async def close(self) -> None:
-        await self._client._inference._async_http_client.aclose()
+        # the http pools are closed once the last client sharing them is closed
+        if self._lease is not None:
+            await self._lease.release()
+        if self._hedge_lease is not None:
+            await self._hedge_lease.release()
+        if self._router is not None:
+            await self._router.close()
+        for lease in self._cascade_leases.values():
+            await lease.release()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
 
     @property
     def capabilities(self) -> ModelCapabilities:
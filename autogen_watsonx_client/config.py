@@ -1,7 +1,15 @@
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, Literal, Optional, Union
 
 from typing_extensions import TypedDict
 
+if TYPE_CHECKING:
+    # kept out of the runtime imports so that the configuration stays cheap to import
+    from autogen_watsonx_client.cache import ResponseCache
+    from autogen_watsonx_client.context import ContextPolicy
+    from autogen_watsonx_client.conversion import MessageConversionCache
+    from autogen_watsonx_client.instrumentation import CallRecord
+    from autogen_watsonx_client.usage import UsageTracker
+
 
 """
 see https://ibm.github.io/watsonx-ai-python-sdk/fm_model_inference.html
@@ -24,6 +32,31 @@ class WatsonxCreateArguments(TypedDict, total=False):
     top_p: Optional[float]
 
 
+class WatsonxEndpoint(TypedDict, total=False):
+    """
+    a deployment to route requests to, missing values are taken from the client configuration
+    """
+    url: str
+    api_key: Optional[str]
+    token: Optional[str]
+    space_id: Optional[str]
+    project_id: Optional[str]
+
+
+class TokenBudget(TypedDict, total=False):
+    """
+    tokens the calls of a source and/or model may use, overall or per rolling window
+    """
+    tokens: int
+    # seconds, without a window the budget covers the lifetime of the client
+    window: Optional[float]
+    # the budget applies to the calls of this source and/or model only, to all calls when neither is set
+    source: Optional[str]
+    model_id: Optional[str]
+    # "reject" (default) raises TokenBudgetExceededError, "wait" queues calls until the window frees tokens
+    on_exceeded: Literal["reject", "wait"]
+
+
 class WatsonxClientConfiguration(WatsonxCreateArguments, total=False):
     model_id: str
     api_key: Optional[str]
@@ -31,3 +64,87 @@ class WatsonxClientConfiguration(WatsonxCreateArguments, total=False):
     space_id: Optional[str]
     project_id: Optional[str]
     token: Optional[str]
+    # size of the thread pool used to run blocking sdk calls when no async variant is available
+    executor_max_workers: Optional[int]
+    # client side admission limits, requests over the limits are queued rather than rejected
+    max_concurrent_requests: Optional[int]
+    requests_per_second: Optional[float]
+    tokens_per_minute: Optional[int]
+    # opt-in cache of responses, e.g. InMemoryResponseCache or SQLiteResponseCache, can be shared by clients
+    response_cache: Optional["ResponseCache"]
+    # cache of converted messages, 0 disables it, pass a shared instance to reuse conversions across clients
+    conversion_cache_size: Optional[int]
+    conversion_cache: Optional["MessageConversionCache"]
+    # trimming of the converted history before it is sent, e.g. ContextPolicy(max_tokens=8000)
+    context_policy: Optional["ContextPolicy"]
+    # clients of the same url, credentials and space/project share the sdk client and its http pools, default True
+    share_connections: Optional[bool]
+    max_connections: Optional[int]
+    max_keepalive_connections: Optional[int]
+    # tls verification of the service: False, or the path of a CA bundle, e.g. of a CPD cluster with its own certificates
+    verify: Optional[Union[bool, str]]
+    # json request bodies and responses through orjson, needs `pip install autogen_watsonx_client[fast]`, default False
+    fast_json: Optional[bool]
+    # gzip request bodies of at least `compress_min_size` bytes (default 1024), only for endpoints accepting
+    # `Content-Encoding: gzip`, default False
+    compress_requests: Optional[bool]
+    compress_min_size: Optional[int]
+    # defer building the sdk objects (network and auth) to the first request or `warmup()`, default False
+    lazy_init: Optional[bool]
+    # "service" counts tokens with the watsonx tokenize endpoint (default), "approximate" estimates them locally
+    token_count_mode: Optional[Literal["service", "approximate"]]
+    # model limits, fetched from the model specs when not provided
+    max_sequence_length: Optional[int]
+    max_output_tokens: Optional[int]
+    # coalescing of create_stream content deltas: flush every n characters, every n seconds, and/or on boundaries
+    stream_coalesce_chars: Optional[int]
+    stream_coalesce_interval: Optional[float]
+    stream_coalesce_boundary: Optional[Literal["word", "line"]]
+    # yield a ToolCallReadyEvent from create_stream as soon as a tool call is complete, default False
+    stream_tool_call_events: Optional[bool]
+    # number of chunks read ahead of a slow create_stream consumer, default 256
+    stream_buffer_size: Optional[int]
+    # retries of 429, 5xx and connection errors with exponential backoff and full jitter, default 10, 0 turns them off
+    max_retries: Optional[int]
+    retry_base_delay: Optional[float]
+    retry_max_delay: Optional[float]
+    # status codes to retry, default 429, 500, 502, 503, 504 and 520
+    retry_status_codes: Optional[list[int]]
+    # wait for the Retry-After header of a failed response instead of the backoff, default True
+    respect_retry_after: Optional[bool]
+    # seconds a request may take including all retries, for streams until the first chunk arrives
+    request_deadline: Optional[float]
+    # send a duplicate of a create request slower than the `hedge_percentile` latency (default 95) of recent ones,
+    # at most `hedge_max_ratio` (default 0.05) of the requests are hedged, default False
+    hedge_requests: Optional[bool]
+    hedge_percentile: Optional[float]
+    hedge_max_ratio: Optional[float]
+    hedge_min_delay: Optional[float]
+    # send the duplicates to this url instead, with the same credentials and space/project
+    hedge_url: Optional[str]
+    # route requests over several endpoints, e.g. regions or projects with separate quotas
+    endpoints: Optional[list[WatsonxEndpoint]]
+    # "round_robin" (default), "least_in_flight" or "ewma_latency"
+    routing_policy: Optional[Literal["round_robin", "least_in_flight", "ewma_latency"]]
+    # an endpoint is skipped for `circuit_reset_timeout` seconds (default 30) after this many consecutive failures (default 5)
+    circuit_failure_threshold: Optional[int]
+    circuit_reset_timeout: Optional[float]
+    # cheaper models asked before `model_id`, cheapest first, escalating to the next one when a trigger fires
+    cascade_model_ids: Optional[list[str]]
+    # any of "error", "invalid_tool_call", "length", "invalid_json" and "low_confidence",
+    # default "error", "invalid_tool_call" and "length"
+    cascade_escalate_on: Optional[list[Literal["error", "invalid_tool_call", "length", "invalid_json", "low_confidence"]]]
+    # mean token logprob below which an answer is of low confidence, default -1.0
+    cascade_min_logprob: Optional[float]
+    # called with a CallRecord after every create and create_stream call
+    instrumentation_hooks: Optional[list[Callable[["CallRecord"], None]]]
+    # an OpenTelemetry span per call with a child span per phase, needs opentelemetry-api, default False
+    tracing: Optional[bool]
+    # source the usage of the calls is attributed to, e.g. the name of the agent, unless set by `usage_scope`
+    usage_source: Optional[str]
+    # seconds of the rolling window of the usage breakdown, default 3600
+    usage_window: Optional[float]
+    # budgets checked before each request
+    token_budgets: Optional[list[TokenBudget]]
+    # a UsageTracker shared by several clients, takes precedence over `usage_window` and `token_budgets`
+    usage_tracker: Optional["UsageTracker"]
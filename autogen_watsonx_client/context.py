@@ -0,0 +1,218 @@
+import json
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+# content of a tool result dropped by `tool_result_max_age`
+TOOL_RESULT_PLACEHOLDER = "[tool result omitted]"
+# characters of a tool result kept when its call is collapsed
+_COLLAPSED_RESULT_CHARS = 200
+
+
+@dataclass
+class ContextTrimStats:
+    """
+    size of the converted history of one call before and after the context policy,
+    the tokens are only counted when the policy changed the history and are 0 otherwise
+    """
+    messages_before: int
+    messages_after: int
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+@dataclass
+class ContextStats:
+    """
+    context policy counters of a client
+    """
+    calls: int
+    trimmed_calls: int
+    messages_removed: int
+    tokens_saved: int
+
+
+class _Unit:
+    # messages that are kept or dropped together: a system message, an assistant message with tool calls
+    # followed by their tool results, or any other single message
+    __slots__ = ("messages", "system", "tool_call", "orphan_tool_result")
+
+    def __init__(self, messages: list, system: bool = False, tool_call: bool = False, orphan_tool_result: bool = False):
+        self.messages = messages
+        self.system = system
+        self.tool_call = tool_call
+        self.orphan_tool_result = orphan_tool_result
+
+
+def _units(wx_messages: list) -> list[_Unit]:
+    units: list[_Unit] = []
+    pending_call_ids: set = set()
+    for wx_message in wx_messages:
+        role = wx_message["role"]
+        if role == "tool":
+            if wx_message.get("tool_call_id") in pending_call_ids:
+                units[-1].messages.append(wx_message)
+                continue
+            units.append(_Unit([wx_message], orphan_tool_result=True))
+        elif role == "assistant" and wx_message.get("tool_calls"):
+            units.append(_Unit([wx_message], tool_call=True))
+            pending_call_ids = {tool_call["id"] for tool_call in wx_message["tool_calls"]}
+            continue
+        else:
+            units.append(_Unit([wx_message], system=role == "system"))
+        pending_call_ids = set()
+    return units
+
+
+def _collapse(unit: _Unit) -> _Unit:
+    # the calls and their results as a single assistant text message
+    results = {wx_message["tool_call_id"]: wx_message.get("content") or "" for wx_message in unit.messages[1:]}
+    lines = []
+    for tool_call in unit.messages[0]["tool_calls"]:
+        function = tool_call["function"]
+        result = results.get(tool_call["id"])
+        line = f"called {function['name']}({function.get('arguments') or ''})"
+        if result is not None:
+            if not isinstance(result, str):
+                result = json.dumps(result)
+            if len(result) > _COLLAPSED_RESULT_CHARS:
+                result = result[:_COLLAPSED_RESULT_CHARS] + "..."
+            line += f" -> {result}"
+        lines.append(line)
+    return _Unit([{"role": "assistant", "content": "\n".join(lines)}])
+
+
+def _drop_tool_results(unit: _Unit) -> _Unit:
+    return _Unit(
+        [unit.messages[0]] + [dict(wx_message, content=TOOL_RESULT_PLACEHOLDER) for wx_message in unit.messages[1:]],
+        tool_call=True,
+    )
+
+
+class ContextPolicy:
+    """
+    trims the converted watsonx history before it is sent, every rule is optional:
+    - `collapse_tool_calls_after`: tool calls with at least this many messages after them are collapsed,
+      together with their results, into one assistant message naming the calls and the start of their results
+    - `tool_result_max_age`: results of tool calls with at least this many messages after them are replaced
+      by a placeholder, the calls themselves are kept
+    - `max_messages`: only the latest messages up to this number are kept besides the system messages
+    - `max_tokens`: only the latest messages fitting in this many tokens, system messages included, are kept
+    system messages are always kept, as is the latest message. an assistant message with tool calls is only ever
+    dropped together with its tool results, and the kept history never starts with a tool result,
+    so every tool message still follows the call it answers.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        tool_result_max_age: Optional[int] = None,
+        collapse_tool_calls_after: Optional[int] = None,
+    ):
+        for name, value in (
+            ("max_tokens", max_tokens),
+            ("max_messages", max_messages),
+            ("tool_result_max_age", tool_result_max_age),
+            ("collapse_tool_calls_after", collapse_tool_calls_after),
+        ):
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} of a context policy needs to be positive")
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+        self.tool_result_max_age = tool_result_max_age
+        self.collapse_tool_calls_after = collapse_tool_calls_after
+
+    def apply(self, wx_messages: list, count_each: Callable[[list], list[int]]) -> tuple[list, ContextTrimStats]:
+        """
+        the trimmed messages and the stats of the trimming, `count_each` returns the token count of each message
+        """
+        units = self._rewrite(_units(wx_messages))
+        if self.max_messages is not None:
+            # system messages do not count against `max_messages`
+            sizes = [0 if unit.system else len(unit.messages) for unit in units]
+            units = self._keep_latest(units, sizes, self.max_messages)
+        if self.max_tokens is not None:
+            counts = count_each([wx_message for unit in units for wx_message in unit.messages])
+            unit_counts = []
+            position = 0
+            for unit in units:
+                unit_counts.append(sum(counts[position:position + len(unit.messages)]))
+                position += len(unit.messages)
+            units = self._keep_latest(units, unit_counts, self.max_tokens)
+
+        trimmed = [wx_message for unit in units for wx_message in unit.messages]
+        if len(trimmed) == len(wx_messages) and all(a is b for a, b in zip(trimmed, wx_messages)):
+            return wx_messages, ContextTrimStats(len(wx_messages), len(wx_messages), 0, 0)
+        # the counts of the original messages are cached by the token counter, so counting both is cheap
+        tokens_before = sum(count_each(wx_messages))
+        tokens_after = sum(count_each(trimmed))
+        return trimmed, ContextTrimStats(len(wx_messages), len(trimmed), tokens_before, tokens_after)
+
+    def _rewrite(self, units: list[_Unit]) -> list[_Unit]:
+        if self.collapse_tool_calls_after is None and self.tool_result_max_age is None:
+            return units
+        rewritten = []
+        # messages after the current unit
+        age = sum(len(unit.messages) for unit in units)
+        for unit in units:
+            age -= len(unit.messages)
+            if unit.tool_call:
+                if self.collapse_tool_calls_after is not None and age >= self.collapse_tool_calls_after:
+                    unit = _collapse(unit)
+                elif self.tool_result_max_age is not None and age >= self.tool_result_max_age:
+                    if len(unit.messages) > 1:
+                        unit = _drop_tool_results(unit)
+            rewritten.append(unit)
+        return rewritten
+
+    @staticmethod
+    def _keep_latest(units: list[_Unit], sizes: list[int], limit: int) -> list[_Unit]:
+        # system units and the latest other units within `limit`, the latest unit is kept regardless
+        remaining = limit - sum(size for unit, size in zip(units, sizes) if unit.system)
+        keep = [unit.system for unit in units]
+        for i in range(len(units) - 1, -1, -1):
+            if units[i].system:
+                continue
+            if sizes[i] > remaining and i != len(units) - 1:
+                break
+            keep[i] = True
+            remaining -= sizes[i]
+        # drop tool results whose call is gone from the front of the kept history
+        for i, unit in enumerate(units):
+            if unit.system or not keep[i]:
+                continue
+            if not unit.orphan_tool_result or i == len(units) - 1:
+                break
+            keep[i] = False
+        return [unit for unit, kept in zip(units, keep) if kept]
+
+
+class ContextStatsCounter:
+    def __init__(self):
+        self._calls = 0
+        self._trimmed_calls = 0
+        self._messages_removed = 0
+        self._tokens_saved = 0
+        self._lock = threading.Lock()
+
+    def add(self, stats: ContextTrimStats) -> None:
+        with self._lock:
+            self._calls += 1
+            if stats.messages_after != stats.messages_before or stats.tokens_saved:
+                self._trimmed_calls += 1
+            self._messages_removed += stats.messages_before - stats.messages_after
+            self._tokens_saved += stats.tokens_saved
+
+    def stats(self) -> ContextStats:
+        with self._lock:
+            return ContextStats(
+                calls=self._calls,
+                trimmed_calls=self._trimmed_calls,
+                messages_removed=self._messages_removed,
+                tokens_saved=self._tokens_saved,
+            )
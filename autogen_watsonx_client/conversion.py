@@ -0,0 +1,288 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, NamedTuple, Optional, Sequence
+
+from autogen_core import FunctionCall, Image
+from autogen_core.tools import Tool, ToolSchema
+from autogen_core.models import (
+    LLMMessage, SystemMessage, AssistantMessage, UserMessage, FunctionExecutionResultMessage
+)
+
+
+def _autogen_message_to_watsonx_message(message: LLMMessage):
+    if isinstance(message, SystemMessage):
+        return {
+            "role": "system",
+            "content": message.content
+        }
+    elif isinstance(message, AssistantMessage):
+        converted_msg = {
+            "role": "assistant",
+        }
+        if isinstance(message.content, str):
+            converted_msg["content"] = message.content
+            return converted_msg
+        elif isinstance(message.content, list) and len(message.content) > 0 :
+            if isinstance(message.content[0], FunctionCall):
+                func_calls = [
+                    {
+                        "id": func_call.id,
+                        "type": "function",
+                        "function": {
+                            "name": func_call.name,
+                            "arguments": func_call. arguments,
+                        }
+                    }
+                    for func_call in message.content
+                ]
+                converted_msg["tool_calls"] = func_calls
+                return converted_msg
+
+    elif isinstance(message, UserMessage):
+        converted_msg = {
+            "role": "user",
+        }
+        if isinstance(message.content, str):
+            converted_msg["content"] = [
+                {
+                    "type": "text",
+                    "text": message.content,
+                }
+            ]
+            return converted_msg
+        elif isinstance(message.content, list) and len(message.content) > 0:
+            if isinstance(message.content[0], str):
+                converted_msg["content"] = [
+                    {
+                        "type": "text",
+                        "text": msg_content,
+                    } for msg_content in message.content
+                ]
+                return converted_msg
+            elif isinstance(message.content[0], Image):
+                converted_msg["content"] = [
+                    {
+                        "type": "image_url",
+                        "image_url": msg_content.data_uri,
+                    } for msg_content in message.content
+                ]
+                return converted_msg
+
+    elif isinstance(message, FunctionExecutionResultMessage):
+        # for wx.ai, tool message is for only 1 tool call, see https://github.com/IBM/watsonx-ai-node-sdk/blob/d02db1884476331be576bf48d77ceb846e88a6c6/watsonx-ai-ml/vml_v1.ts#L6456-L6463
+        return [
+            {
+                "role": "tool",
+                "content": content.content,
+                "tool_call_id": content.call_id
+            }
+            for content in message.content
+        ]
+    raise ValueError(
+        f"error converting autogen message {asdict(message)}"
+    )
+
+
+def _autogen_tool_schema_to_watsonx_tool(tool: ToolSchema):
+    ret = {
+        "type": "function",
+        "function": {
+            "name": tool["name"],
+        }
+    }
+    if "description" in tool:
+        ret["function"]["description"] = tool["description"]
+
+    if "parameters" in tool:
+        params = tool["parameters"]
+        ret["function"]["parameters"] = {
+            "type": params["type"],
+            "properties": params["properties"]
+        }
+        if "required" in params:
+            ret["function"]["parameters"]["required"] = params["required"]
+    return ret
+
+
+def _autogen_tool_to_watsonx_tool(tool: Tool | ToolSchema):
+    if isinstance(tool, dict): # typeddict does not support type check
+        return _autogen_tool_schema_to_watsonx_tool(tool)
+    elif isinstance(tool, Tool):
+        return _autogen_tool_schema_to_watsonx_tool(tool.schema)
+
+
+def _as_message_list(converted) -> list:
+    # a FunctionExecutionResultMessage converts into several tool messages
+    return converted if isinstance(converted, list) else [converted]
+
+
+def _autogen_messages_to_watsonx_messages(messages: Sequence[LLMMessage]) -> list:
+    wx_messages = []
+    for m in messages:
+        wx_messages.extend(_as_message_list(_autogen_message_to_watsonx_message(m)))
+    return wx_messages
+
+
+class MessageConversionCache:
+    """
+    bounded cache of converted watsonx messages, looked up by message identity first and by content hash second,
+    so only the new tail of a growing conversation gets converted.
+    messages are treated as immutable once they have been converted.
+    sharing one instance between clients (the `conversion_cache` option) lets agents on a common transcript
+    reuse each other's conversions.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        if max_size <= 0:
+            raise ValueError("max_size of the conversion cache needs to be positive")
+        self._max_size = max_size
+        # id(message) -> (message, converted), the message is kept alive so that its id is not reused
+        self._by_identity: OrderedDict[int, tuple[LLMMessage, list]] = OrderedDict()
+        self._by_content: OrderedDict[str, list] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _content_key(message: LLMMessage) -> str:
+        return hashlib.sha256(message.model_dump_json().encode("utf-8")).hexdigest()
+
+    def convert_message(self, message: LLMMessage) -> list:
+        """
+        converted watsonx messages of a single autogen message, the returned list must not be modified
+        """
+        with self._lock:
+            entry = self._by_identity.get(id(message))
+            if entry is not None and entry[0] is message:
+                self._by_identity.move_to_end(id(message))
+                self.hits += 1
+                return entry[1]
+
+        content_key = self._content_key(message)
+        with self._lock:
+            converted = self._by_content.get(content_key)
+            if converted is not None:
+                self._by_content.move_to_end(content_key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if converted is None:
+            converted = _as_message_list(_autogen_message_to_watsonx_message(message))
+
+        with self._lock:
+            self._by_content[content_key] = converted
+            self._by_identity[id(message)] = (message, converted)
+            while len(self._by_content) > self._max_size:
+                self._by_content.popitem(last=False)
+            while len(self._by_identity) > self._max_size:
+                self._by_identity.popitem(last=False)
+        return converted
+
+    def convert(self, messages: Sequence[LLMMessage]) -> list:
+        """
+        converted watsonx messages of a whole conversation, a new list on every call
+        """
+        wx_messages = []
+        for m in messages:
+            wx_messages.extend(self.convert_message(m))
+        return wx_messages
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_identity.clear()
+            self._by_content.clear()
+
+    def __len__(self) -> int:
+        return len(self._by_content)
+
+
+class ConvertedTools(NamedTuple):
+    # watsonx tool dicts, passed to the sdk
+    tools: list
+    # canonical json of `tools`, used for cache keys and size estimations without re-encoding
+    json: str
+
+
+class ToolRegistry:
+    """
+    converts every tool once and reuses the converted dicts and tool lists on later requests.
+    an entry is rebuilt when the schema of the tool changes, also for a `ToolSchema` dict changed in place.
+    """
+
+    def __init__(self, max_size: int = 256):
+        if max_size <= 0:
+            raise ValueError("max_size of the tool registry needs to be positive")
+        self._max_size = max_size
+        # id(tool) -> (tool, fingerprint, converted tool)
+        self._tools: OrderedDict[int, tuple[Any, str, dict]] = OrderedDict()
+        # ids of the converted tools -> converted tool list
+        self._tool_lists: OrderedDict[tuple[int, ...], ConvertedTools] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(tool: Tool | ToolSchema) -> str:
+        # a digest of the whole schema instead of a copy, the schema of a `Tool` includes its argument model
+        schema = tool if isinstance(tool, dict) else tool.schema
+        content = json.dumps(schema, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _lookup(self, tool: Tool | ToolSchema, fingerprint) -> Optional[dict]:
+        # to be called with the lock held
+        entry = self._tools.get(id(tool))
+        if entry is not None and entry[0] is tool and entry[1] == fingerprint:
+            self._tools.move_to_end(id(tool))
+            return entry[2]
+        return None
+
+    def _add(self, tool: Tool | ToolSchema, fingerprint) -> dict:
+        converted = _autogen_tool_to_watsonx_tool(tool)
+        with self._lock:
+            self._tools[id(tool)] = (tool, fingerprint, converted)
+            while len(self._tools) > self._max_size:
+                self._tools.popitem(last=False)
+        return converted
+
+    def convert_tool(self, tool: Tool | ToolSchema) -> dict:
+        """
+        converted watsonx tool, the returned dict must not be modified
+        """
+        fingerprint = self._fingerprint(tool)
+        with self._lock:
+            converted = self._lookup(tool, fingerprint)
+        if converted is None:
+            converted = self._add(tool, fingerprint)
+        return converted
+
+    def convert(self, tools: Sequence[Tool | ToolSchema]) -> ConvertedTools:
+        fingerprints = [self._fingerprint(tool) for tool in tools]
+        # one lock for the lookups of the whole list
+        with self._lock:
+            converted = [self._lookup(tool, fingerprint) for tool, fingerprint in zip(tools, fingerprints)]
+        for i, tool in enumerate(tools):
+            if converted[i] is None:
+                converted[i] = self._add(tool, fingerprints[i])
+        key = tuple(id(tool) for tool in converted)
+        with self._lock:
+            converted_tools = self._tool_lists.get(key)
+            # the converted dicts are kept alive by the entry, so equal ids mean the same dicts
+            if converted_tools is not None:
+                self._tool_lists.move_to_end(key)
+                return converted_tools
+
+        converted_tools = ConvertedTools(
+            tools=converted,
+            json=json.dumps(converted, sort_keys=True, separators=(",", ":"), ensure_ascii=False),
+        )
+        with self._lock:
+            self._tool_lists[key] = converted_tools
+            while len(self._tool_lists) > self._max_size:
+                self._tool_lists.popitem(last=False)
+        return converted_tools
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tools.clear()
+            self._tool_lists.clear()
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from autogen_watsonx_client.metrics import _percentile
+
+T = TypeVar("T")
+
+# latencies needed before the hedge delay is trusted, no request is hedged before that
+_MIN_SAMPLES = 20
+# latencies recorded between two computations of the hedge delay
+_RECOMPUTE_EVERY = 10
+
+
+@dataclass
+class HedgingStats:
+    """
+    hedging counters of a client, `delay` is the current hedge delay in seconds
+    """
+    calls: int = 0
+    hedges_fired: int = 0
+    # hedges that answered before the original request
+    hedges_won: int = 0
+    # hedges skipped because the budget of extra requests was used up
+    hedges_over_budget: int = 0
+    delay: Optional[float] = None
+
+
+class Hedger:
+    """
+    sends a duplicate of a request that has not answered after the `percentile` latency of the latest requests,
+    takes the first success and cancels the other one.
+    at most `max_ratio` of the calls are hedged.
+    """
+
+    def __init__(self, percentile: float = 95, max_ratio: float = 0.05, min_delay: float = 0.0, window: int = 1000):
+        if not 0 < percentile < 100:
+            raise ValueError("hedge percentile needs to be between 0 and 100")
+        if not 0 <= max_ratio <= 1:
+            raise ValueError("hedge max ratio needs to be between 0 and 1")
+        self._percentile = percentile
+        self._max_ratio = max_ratio
+        self._min_delay = min_delay
+        self._latencies: deque[float] = deque(maxlen=window)
+        # counted apart from the window, whose length stops growing once it is full
+        self._samples = 0
+        self._delay: Optional[float] = None
+        self._stats = HedgingStats()
+        self._lock = threading.Lock()
+
+    def _record_latency(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            self._samples += 1
+            # recomputed every few samples, sorting the window on every call is not worth it
+            if self._samples >= _MIN_SAMPLES and self._samples % _RECOMPUTE_EVERY == 0:
+                self._delay = max(self._min_delay, _percentile(sorted(self._latencies), self._percentile))
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self._stats.hedges_fired + 1 > self._max_ratio * self._stats.calls:
+                self._stats.hedges_over_budget += 1
+                return False
+            self._stats.hedges_fired += 1
+            return True
+
+    async def call(self, request: Callable[[], Awaitable[T]], hedge: Callable[[], Awaitable[T]]) -> T:
+        """
+        await `request()`, and `hedge()` as well once the request is slower than the hedge delay
+        """
+        with self._lock:
+            self._stats.calls += 1
+            delay = self._delay
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(request())
+        if delay is None:
+            result = await primary
+            self._record_latency(time.perf_counter() - start)
+            return result
+
+        secondary: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._take_hedge():
+                result = await primary
+                self._record_latency(time.perf_counter() - start)
+                return result
+
+            secondary = asyncio.ensure_future(hedge())
+            pending = {primary, secondary}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            with self._lock:
+                                self._stats.hedges_won += 1
+                        self._record_latency(time.perf_counter() - start)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            # the loser, or both requests when the caller is cancelled
+            for task in (primary, secondary):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def stats(self) -> HedgingStats:
+        with self._lock:
+            return HedgingStats(
+                calls=self._stats.calls,
+                hedges_fired=self._stats.hedges_fired,
+                hedges_won=self._stats.hedges_won,
+                hedges_over_budget=self._stats.hedges_over_budget,
+                delay=self._delay,
+            )
@@ -0,0 +1,189 @@
+import logging
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Sequence
+
+from autogen_core.models import CreateResult
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CallRecord:
+    """
+    one `create` or `create_stream` call, handed to the instrumentation hooks once the call is over.
+    `phases` holds the seconds spent in each phase the call went through, in order:
+    conversion, context, cache, budget, connect, admission, request, stream, post_processing.
+    `request` includes decoding the response json, which happens inside the sdk,
+    for streams it ends with the first chunk and `stream` covers the rest. `start_time` is a unix timestamp.
+    """
+    operation: str
+    model_id: str
+    message_count: int
+    tool_count: int
+    start_time: float
+    duration: float = 0.0
+    phases: dict[str, float] = field(default_factory=dict)
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    finish_reason: Optional[str] = None
+    retries: int = 0
+    cache_hit: bool = False
+    # tokens the context policy did not send
+    tokens_saved: Optional[int] = None
+    # the exception the call ended with, `GeneratorExit` when a stream was closed before its end
+    error: Optional[BaseException] = None
+
+
+class CallTrace:
+    """
+    collects the phases of one call, `mark` ends the current phase
+    """
+    __slots__ = ("_instrumentation", "record", "_start_ns", "_last_ns", "_marks", "_span")
+
+    def __init__(self, instrumentation: "Instrumentation", record: CallRecord):
+        self._instrumentation = instrumentation
+        self.record = record
+        self._start_ns = self._last_ns = time.time_ns()
+        self._marks: list[tuple[str, int, int]] = []
+        # the OpenTelemetry span of the call, open until `finish`
+        self._span = None
+
+    def activate(self):
+        """
+        context manager making the span of the call current, spans started inside nest under it
+        """
+        if self._span is None:
+            return nullcontext()
+        from opentelemetry import trace
+
+        # errors are recorded once, by `finish`
+        return trace.use_span(self._span, record_exception=False, set_status_on_exception=False)
+
+    def mark(self, phase: str) -> None:
+        now = time.time_ns()
+        self._marks.append((phase, self._last_ns, now))
+        self._last_ns = now
+
+    def on_retry(self) -> None:
+        self.record.retries += 1
+
+    def finish(self, result: Optional[CreateResult] = None, error: Optional[BaseException] = None) -> None:
+        end_ns = time.time_ns()
+        record = self.record
+        record.duration = (end_ns - self._start_ns) / 1e9
+        for phase, start_ns, phase_end_ns in self._marks:
+            record.phases[phase] = record.phases.get(phase, 0.0) + (phase_end_ns - start_ns) / 1e9
+        if result is not None:
+            record.prompt_tokens = result.usage.prompt_tokens
+            record.completion_tokens = result.usage.completion_tokens
+            record.finish_reason = result.finish_reason
+            record.cache_hit = result.cached
+            context_trim = getattr(result, "context_trim", None)
+            if context_trim is not None:
+                record.tokens_saved = context_trim.tokens_saved
+        record.error = error
+        self._instrumentation._finish(self, end_ns)
+
+
+class _NoopTrace(CallTrace):
+    __slots__ = ()
+
+    def __init__(self):
+        pass
+
+    def mark(self, phase: str) -> None:
+        pass
+
+    def activate(self):
+        return nullcontext()
+
+    def on_retry(self) -> None:
+        pass
+
+    def finish(self, result: Optional[CreateResult] = None, error: Optional[BaseException] = None) -> None:
+        pass
+
+
+# stands in for a trace when instrumentation is off
+NOOP_TRACE = _NoopTrace()
+
+
+class Instrumentation:
+    """
+    hands every finished call to the `hooks` and, with `tracing`, reports it as an OpenTelemetry span
+    with a child span per phase through the globally configured tracer provider.
+    the span of a call is started with the call, spans of the sdk and httpx made while it is active nest under it
+    """
+
+    def __init__(self, hooks: Sequence[Callable[[CallRecord], None]] = (), tracing: bool = False):
+        self._hooks = list(hooks)
+        self._tracer = None
+        if tracing:
+            try:
+                from opentelemetry import trace
+            except ImportError as e:
+                raise ImportError(
+                    "tracing needs the opentelemetry-api package, install it with `pip install opentelemetry-api`"
+                ) from e
+            self._tracer = trace.get_tracer(__name__)
+
+    def start(self, operation: str, model_id: str, message_count: int, tool_count: int) -> CallTrace:
+        call_trace = CallTrace(self, CallRecord(
+            operation=operation,
+            model_id=model_id,
+            message_count=message_count,
+            tool_count=tool_count,
+            start_time=time.time(),
+        ))
+        if self._tracer is not None:
+            call_trace._span = self._tracer.start_span(
+                f"watsonx.{operation}",
+                start_time=call_trace._start_ns,
+                attributes={
+                    "gen_ai.system": "ibm.watsonx.ai",
+                    "gen_ai.operation.name": "chat",
+                    "gen_ai.request.model": model_id,
+                    "watsonx.message_count": message_count,
+                    "watsonx.tool_count": tool_count,
+                },
+            )
+        return call_trace
+
+    def _finish(self, call_trace: CallTrace, end_ns: int) -> None:
+        if call_trace._span is not None:
+            self._end_span(call_trace, end_ns)
+        for hook in self._hooks:
+            try:
+                hook(call_trace.record)
+            except Exception:
+                logger.exception("instrumentation hook %r failed", hook)
+
+    def _end_span(self, call_trace: CallTrace, end_ns: int) -> None:
+        # the phases are only known once they are over, their spans are built with the recorded times
+        from opentelemetry import trace
+        from opentelemetry.trace import Status, StatusCode
+
+        record = call_trace.record
+        span = call_trace._span
+        attributes = {
+            "watsonx.retries": record.retries,
+            "watsonx.cache_hit": record.cache_hit,
+        }
+        if record.prompt_tokens is not None:
+            attributes["gen_ai.usage.input_tokens"] = record.prompt_tokens
+            attributes["gen_ai.usage.output_tokens"] = record.completion_tokens
+        if record.finish_reason is not None:
+            attributes["gen_ai.response.finish_reasons"] = [record.finish_reason]
+        if record.tokens_saved is not None:
+            attributes["watsonx.tokens_saved"] = record.tokens_saved
+        span.set_attributes(attributes)
+
+        context = trace.set_span_in_context(span)
+        for phase, start_ns, phase_end_ns in call_trace._marks:
+            self._tracer.start_span(f"watsonx.{phase}", context=context, start_time=start_ns).end(end_time=phase_end_ns)
+        if isinstance(record.error, Exception):
+            span.record_exception(record.error)
+            span.set_status(Status(StatusCode.ERROR, type(record.error).__name__))
+        span.end(end_time=end_ns)
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from autogen_core.models import CreateResult
+
+from autogen_watsonx_client.context import ContextTrimStats
+
+
+def _percentile(sorted_values: list[float], percentile: float) -> Optional[float]:
+    # nearest rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(percentile / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+@dataclass
+class StreamStats:
+    """
+    latency metrics of a single `create_stream` call, times are in seconds
+    """
+    time_to_first_token: Optional[float]
+    inter_chunk_p50: Optional[float]
+    inter_chunk_p90: Optional[float]
+    inter_chunk_p99: Optional[float]
+    duration: float
+    chunk_count: int
+    # whether the usage was reported by the service or estimated locally
+    usage_estimated: bool
+
+
+class WatsonxCreateResult(CreateResult):
+    """
+    `CreateResult` carrying the latency metrics of the stream that produced it,
+    and what the context policy trimmed from the history
+    """
+    stream_stats: Optional[StreamStats] = None
+    context_trim: Optional[ContextTrimStats] = None
+
+
+class StreamTimer:
+    """
+    records arrival times of the content and tool call chunks of one stream, timing starts when the request is sent
+    """
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._first_chunk_at: Optional[float] = None
+        self._last_chunk_at: Optional[float] = None
+        self._gaps: list[float] = []
+
+    def on_chunk(self) -> None:
+        now = time.perf_counter()
+        if self._first_chunk_at is None:
+            self._first_chunk_at = now
+        else:
+            self._gaps.append(now - self._last_chunk_at)
+        self._last_chunk_at = now
+
+    def finish(self, usage_estimated: bool) -> StreamStats:
+        gaps = sorted(self._gaps)
+        return StreamStats(
+            time_to_first_token=None if self._first_chunk_at is None else self._first_chunk_at - self._start,
+            inter_chunk_p50=_percentile(gaps, 50),
+            inter_chunk_p90=_percentile(gaps, 90),
+            inter_chunk_p99=_percentile(gaps, 99),
+            duration=time.perf_counter() - self._start,
+            chunk_count=0 if self._first_chunk_at is None else len(self._gaps) + 1,
+            usage_estimated=usage_estimated,
+        )
+
+
+@dataclass
+class StreamStatsSummary:
+    """
+    aggregate of the latest streams of a client, times are in seconds
+    """
+    streams: int
+    time_to_first_token_p50: Optional[float]
+    time_to_first_token_p99: Optional[float]
+    inter_chunk_p50: Optional[float]
+    inter_chunk_p99: Optional[float]
+    duration_p50: Optional[float]
+    duration_p99: Optional[float]
+    estimated_usage_streams: int
+
+
+class StreamStatsAggregator:
+    """
+    keeps the stats of the latest `window` streams
+    """
+
+    def __init__(self, window: int = 1000):
+        self._stats: deque[StreamStats] = deque(maxlen=window)
+        self._total_streams = 0
+        self._lock = threading.Lock()
+
+    def add(self, stats: StreamStats) -> None:
+        with self._lock:
+            self._stats.append(stats)
+            self._total_streams += 1
+
+    def summary(self) -> StreamStatsSummary:
+        with self._lock:
+            stats = list(self._stats)
+            total_streams = self._total_streams
+        ttfts = sorted(s.time_to_first_token for s in stats if s.time_to_first_token is not None)
+        # the raw gaps are not kept, aggregate the per stream percentiles instead
+        gaps_p50 = sorted(s.inter_chunk_p50 for s in stats if s.inter_chunk_p50 is not None)
+        gaps_p99 = sorted(s.inter_chunk_p99 for s in stats if s.inter_chunk_p99 is not None)
+        durations = sorted(s.duration for s in stats)
+        return StreamStatsSummary(
+            streams=total_streams,
+            time_to_first_token_p50=_percentile(ttfts, 50),
+            time_to_first_token_p99=_percentile(ttfts, 99),
+            inter_chunk_p50=_percentile(gaps_p50, 50),
+            inter_chunk_p99=_percentile(gaps_p99, 99),
+            duration_p50=_percentile(durations, 50),
+            duration_p99=_percentile(durations, 99),
+            estimated_usage_streams=sum(1 for s in stats if s.usage_estimated),
+        )
@@ -0,0 +1,54 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+# model specs rarely change, refresh them once an hour
+DEFAULT_MODEL_SPEC_TTL = 3600.0
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    max_sequence_length: Optional[int]
+    max_output_tokens: Optional[int]
+
+
+def _model_limits_from_details(details: dict) -> ModelLimits:
+    limits = details.get("model_limits", {})
+    return ModelLimits(
+        max_sequence_length=limits.get("max_sequence_length"),
+        max_output_tokens=limits.get("max_output_tokens"),
+    )
+
+
+class ModelSpecCache:
+    """
+    process wide cache of the model limits, fetched once per (url, model id) and kept for `ttl` seconds
+    """
+
+    def __init__(self, ttl: float = DEFAULT_MODEL_SPEC_TTL):
+        self._ttl = ttl
+        self._entries: dict[tuple[str, str], tuple[float, ModelLimits]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, model_id: str, fetch_details: Callable[[], dict]) -> ModelLimits:
+        key = (url, model_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self._ttl:
+                return entry[1]
+        limits = _model_limits_from_details(fetch_details())
+        with self._lock:
+            self._entries[key] = (time.monotonic(), limits)
+        return limits
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_model_spec_cache = ModelSpecCache()
+
+
+def get_model_spec_cache() -> ModelSpecCache:
+    return _model_spec_cache
@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import json
+import threading
+from typing import TYPE_CHECKING, Any, Mapping, Optional, Union
+
+from autogen_watsonx_client.serialization import install_http_codec
+
+if TYPE_CHECKING:
+    from ibm_watsonx_ai.foundation_models import ModelInference
+
+
+def _load_sdk():
+    # ibm_watsonx_ai and its dependency tree are slow to import, only pay for it when a client connects
+    from ibm_watsonx_ai import APIClient, Credentials
+    from ibm_watsonx_ai.foundation_models import ModelInference
+
+    return APIClient, Credentials, ModelInference
+
+
+def _http_client_config(max_connections: Optional[int], max_keepalive_connections: Optional[int]) -> dict:
+    # only pass the pool config when limits are set, keeping the sdk defaults (and older sdk signatures) otherwise
+    if max_connections is None and max_keepalive_connections is None:
+        return {}
+    import httpx
+    from ibm_watsonx_ai.utils.utils import HttpClientConfig
+
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections)
+    return {
+        "httpx_client": HttpClientConfig(limits=limits),
+        "async_httpx_client": HttpClientConfig(limits=limits),
+    }
+
+
+def _verify_args(verify: Union[bool, str, None]) -> dict:
+    # only passed when set, keeping the sdk default of verifying against the system certificates
+    return {} if verify is None else {"verify": verify}
+
+
+def _disable_status_retries(http_client: Any) -> None:
+    # the retry transports of the sdk retry some status codes on their own, below the model inference retries,
+    # the client retries with its own policy instead. their retries of dropped keep-alive connections are kept
+    transports = [getattr(http_client, "_transport", None), *getattr(http_client, "_mounts", {}).values()]
+    for transport in transports:
+        if transport is not None and hasattr(transport, "status_forcelist"):
+            transport.status_forcelist = ()
+
+
+def _install_http_codecs(api_client: Any, fast_json: bool, compress_min_size: Optional[int]) -> None:
+    # the sdk sends its json bodies and decodes the responses through the http clients of the api client
+    if not fast_json and compress_min_size is None:
+        return
+    if hasattr(api_client, "httpx_client"):
+        install_http_codec(api_client.httpx_client, fast_json, compress_min_size, is_async=False)
+    if hasattr(api_client, "async_httpx_client"):
+        install_http_codec(api_client.async_httpx_client, fast_json, compress_min_size, is_async=True)
+
+
+def running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+async def _close_http_clients(
+    api_client: Any, model_inference: Any, loop: Optional[asyncio.AbstractEventLoop]
+) -> None:
+    if hasattr(api_client, "async_httpx_client"):
+        api_client.httpx_client.close()
+        async_http_client = api_client.async_httpx_client
+    else:
+        # older sdk versions keep the async http client on the inference object
+        async_http_client = model_inference._inference._async_http_client
+    # the async pools belong to the loop of the lease, from another loop, e.g. after it closed, they can only be dropped
+    if loop is None or loop is running_loop():
+        await async_http_client.aclose()
+
+
+class ModelInferenceLease:
+    """
+    a reference to a shared `ModelInference`, released once with `release`.
+    `loop` is the event loop its async calls run on, None when it was connected outside of one
+    """
+
+    def __init__(
+        self,
+        registry: "ModelInferenceRegistry",
+        key: tuple,
+        model: "ModelInference",
+        loop: Optional[asyncio.AbstractEventLoop],
+    ):
+        self._registry = registry
+        self._key = key
+        self.model = model
+        self.loop = loop
+        self._released = False
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> bool:
+        """
+        whether the lease can serve async calls on `loop`, a lease connected outside of an event loop is bound to
+        `loop` when nothing else shares its objects. otherwise it is to be released and acquired again for `loop`
+        """
+        return self.loop is loop or self._registry._bind(self, loop)
+
+    async def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        await self._registry._release(self._key)
+
+
+class ModelInferenceRegistry:
+    """
+    process wide registry handing out reference counted `ModelInference` objects.
+    clients with the same url, credentials, space/project and pool limits share one `APIClient`,
+    i.e. one authentication and one set of http connection pools,
+    clients that also agree on model id and decoding params share the `ModelInference` itself.
+    the async http pools are bound to an event loop, so objects are only shared by leases of the same loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # connection key -> [api client, reference count], the event loop is the last part of the key
+        self._api_clients: dict[tuple, list] = {}
+        # (connection key, model key) -> [model inference, reference count]
+        self._models: dict[tuple, list] = {}
+        # held while the sdk objects of a key are built, which does network and auth work,
+        # so that other keys are built in parallel and a key is built only once
+        self._build_locks: dict[tuple, threading.Lock] = {}
+
+    def _build_lock(self, key: tuple) -> threading.Lock:
+        with self._lock:
+            return self._build_locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _connection_key(
+        url: str,
+        api_key: Optional[str],
+        token: Optional[str],
+        space_id: Optional[str],
+        project_id: Optional[str],
+        max_connections: Optional[int],
+        max_keepalive_connections: Optional[int],
+        verify: Union[bool, str, None],
+        fast_json: bool,
+        compress_min_size: Optional[int],
+    ) -> tuple:
+        # secrets are only kept as digests
+        credentials_digest = hashlib.sha256(f"{api_key}\x00{token}".encode("utf-8")).hexdigest()
+        return (
+            url, credentials_digest, space_id, project_id, max_connections, max_keepalive_connections, verify,
+            fast_json, compress_min_size,
+        )
+
+    def acquire(
+        self,
+        model_id: str,
+        params: Mapping[str, Any],
+        url: str,
+        api_key: Optional[str] = None,
+        token: Optional[str] = None,
+        space_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        verify: Union[bool, str, None] = None,
+        fast_json: bool = False,
+        compress_min_size: Optional[int] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> ModelInferenceLease:
+        """
+        `loop` is the event loop the async calls of the lease will run on, None outside of one
+        """
+        connection_key = self._connection_key(
+            url, api_key, token, space_id, project_id, max_connections, max_keepalive_connections, verify,
+            fast_json, compress_min_size,
+        ) + (loop,)
+        key = (connection_key, model_id, json.dumps(params, sort_keys=True))
+        with self._build_lock(key):
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    entry[1] += 1
+                    return ModelInferenceLease(self, key, entry[0], loop)
+
+            APIClient, Credentials, ModelInference = _load_sdk()
+            with self._build_lock(connection_key):
+                # counted before the model is built, so that releasing another model does not close it meanwhile
+                with self._lock:
+                    api_client_entry = self._api_clients.get(connection_key)
+                    if api_client_entry is not None:
+                        api_client_entry[1] += 1
+                if api_client_entry is None:
+                    api_client = APIClient(
+                        # api_key or token can be used
+                        credentials=Credentials(url=url, api_key=api_key, token=token, **_verify_args(verify)),
+                        **_http_client_config(max_connections, max_keepalive_connections),
+                    )
+                    _install_http_codecs(api_client, fast_json, compress_min_size)
+                    for http_client in ("httpx_client", "async_httpx_client"):
+                        if hasattr(api_client, http_client):
+                            _disable_status_retries(getattr(api_client, http_client))
+                    api_client_entry = [api_client, 1]
+                    with self._lock:
+                        self._api_clients[connection_key] = api_client_entry
+
+            try:
+                model = ModelInference(
+                    model_id=model_id,
+                    api_client=api_client_entry[0],
+                    space_id=space_id,
+                    project_id=project_id,
+                    params=dict(params),
+                    # the client retries with its own policy, see `Retrier`
+                    max_retries=0,
+                    retry_status_codes=[],
+                )
+            except BaseException:
+                # the api client stays for the next attempt
+                with self._lock:
+                    api_client_entry[1] -= 1
+                raise
+            with self._lock:
+                self._models[key] = [model, 1]
+            return ModelInferenceLease(self, key, model, loop)
+
+    def _bind(self, lease: ModelInferenceLease, loop: asyncio.AbstractEventLoop) -> bool:
+        with self._lock:
+            if lease.loop is not None or lease._released:
+                return lease.loop is loop
+            connection_key = lease._key[0]
+            entry = self._models[lease._key]
+            api_client_entry = self._api_clients[connection_key]
+            if entry[1] > 1 or api_client_entry[1] > 1:
+                return False
+            bound_connection_key = connection_key[:-1] + (loop,)
+            bound_key = (bound_connection_key, *lease._key[1:])
+            if bound_key in self._models or bound_connection_key in self._api_clients:
+                return False
+            # the only holder, the objects move over to the loop instead of connecting again
+            del self._models[lease._key]
+            del self._api_clients[connection_key]
+            self._models[bound_key] = entry
+            self._api_clients[bound_connection_key] = api_client_entry
+            lease._key = bound_key
+            lease.loop = loop
+            return True
+
+    async def _release(self, key: tuple) -> None:
+        with self._lock:
+            entry = self._models[key]
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._models[key]
+            connection_key = key[0]
+            api_client_entry = self._api_clients[connection_key]
+            api_client_entry[1] -= 1
+            if api_client_entry[1] > 0:
+                return
+            del self._api_clients[connection_key]
+        await _close_http_clients(api_client_entry[0], entry[0], connection_key[-1])
+
+
+_registry = ModelInferenceRegistry()
+
+
+def get_model_inference_registry() -> ModelInferenceRegistry:
+    return _registry
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+
+@dataclass
+class AdmissionStats:
+    """
+    snapshot of the client side admission layer, times are in seconds
+    """
+    in_flight: int
+    queue_depth: int
+    admitted: int
+    total_wait_time: float
+    max_wait_time: float
+
+    @property
+    def mean_wait_time(self) -> float:
+        return self.total_wait_time / self.admitted if self.admitted else 0.0
+
+
+class TokenBucket:
+    """
+    token bucket refilled continuously at `rate` units per second up to `capacity`,
+    callers queue in arrival order until enough units are available
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity of a token bucket need to be positive")
+        self._rate = rate
+        self._capacity = capacity
+        self._level = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(self._capacity, self._level + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        # an amount larger than the capacity is let through once the bucket is full,
+        # leaving the bucket in debt instead of blocking forever
+        needed = min(amount, self._capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._level >= needed:
+                    self._level -= amount
+                    return
+                await asyncio.sleep((needed - self._level) / self._rate)
+
+    def adjust(self, amount: float) -> None:
+        """
+        give back (positive) or take (negative) units without waiting,
+        used to reconcile an estimate with the actual usage
+        """
+        self._refill()
+        self._level = min(self._capacity, self._level + amount)
+
+
+class AdmissionController:
+    """
+    queues requests until they fit in the in-flight, requests per second and tokens per minute limits,
+    every limit is optional and a controller without limits admits immediately
+    """
+
+    def __init__(
+        self,
+        max_concurrent_requests: Optional[int] = None,
+        requests_per_second: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        self._semaphore = asyncio.Semaphore(max_concurrent_requests) if max_concurrent_requests else None
+        self._request_bucket = (
+            TokenBucket(rate=requests_per_second, capacity=max(1.0, requests_per_second))
+            if requests_per_second else None
+        )
+        self._token_bucket = (
+            TokenBucket(rate=tokens_per_minute / 60, capacity=tokens_per_minute)
+            if tokens_per_minute else None
+        )
+        self._in_flight = 0
+        self._queue_depth = 0
+        self._admitted = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return any(limit is not None for limit in (self._semaphore, self._request_bucket, self._token_bucket))
+
+    @asynccontextmanager
+    async def admit(self, estimated_tokens: int = 0) -> AsyncIterator["_Admission"]:
+        """
+        wait for a slot, the yielded admission can be told the actual token usage once known
+        """
+        start = time.monotonic()
+        self._queue_depth += 1
+        acquired_tokens = False
+        acquired_slot = False
+        try:
+            if self._request_bucket is not None:
+                await self._request_bucket.acquire(1)
+            if self._token_bucket is not None and estimated_tokens > 0:
+                await self._token_bucket.acquire(estimated_tokens)
+                acquired_tokens = True
+            if self._semaphore is not None:
+                await self._semaphore.acquire()
+                acquired_slot = True
+        except BaseException:
+            self._queue_depth -= 1
+            # only what was taken is given back
+            if acquired_tokens:
+                self._token_bucket.adjust(estimated_tokens)
+            raise
+        self._queue_depth -= 1
+
+        waited = time.monotonic() - start
+        self._admitted += 1
+        self._total_wait_time += waited
+        self._max_wait_time = max(self._max_wait_time, waited)
+
+        admission = _Admission(estimated_tokens)
+        self._in_flight += 1
+        try:
+            yield admission
+        finally:
+            self._in_flight -= 1
+            if acquired_slot:
+                self._semaphore.release()
+            if self._token_bucket is not None and admission.actual_tokens is not None:
+                self._token_bucket.adjust(estimated_tokens - admission.actual_tokens)
+
+    def stats(self) -> AdmissionStats:
+        return AdmissionStats(
+            in_flight=self._in_flight,
+            queue_depth=self._queue_depth,
+            admitted=self._admitted,
+            total_wait_time=self._total_wait_time,
+            max_wait_time=self._max_wait_time,
+        )
+
+
+class _Admission:
+    def __init__(self, estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.actual_tokens: Optional[int] = None
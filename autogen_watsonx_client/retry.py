@@ -0,0 +1,179 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504, 520})
+
+# as many retries as ibm-watsonx-ai makes on its own, its retries are turned off in favour of the policy
+DEFAULT_MAX_RETRIES = 10
+
+_STATUS_IN_MESSAGE = re.compile(r"Request failed with: .*\b(\d{3})\)\s*$", re.DOTALL)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    retries of transient failures with exponential backoff and full jitter,
+    `deadline` bounds the whole call including all attempts and backoff, in seconds
+    """
+    max_retries: int = DEFAULT_MAX_RETRIES
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    retry_status_codes: frozenset = DEFAULT_RETRY_STATUS_CODES
+    respect_retry_after: bool = True
+    deadline: Optional[float] = None
+
+    def backoff(self, retry: int) -> float:
+        # full jitter, see https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+
+@dataclass
+class RetryStats:
+    """
+    retry counters of a client, times are in seconds
+    """
+    calls: int = 0
+    retries: int = 0
+    backoff_time: float = 0.0
+    # calls that failed after using up their retries or their deadline
+    exhausted: int = 0
+    retries_by_status: dict[int, int] = field(default_factory=dict)
+
+
+def _status_code(exception: BaseException) -> Optional[int]:
+    # httpx errors and the ApiRequestFailure of the sdk carry the response
+    response = getattr(exception, "response", None)
+    status_code = getattr(response, "status_code", None)
+    if status_code is not None:
+        return status_code
+    # other WMLClientErrors only name the status at the end of the message, e.g. "Request failed with: (... 503)"
+    if type(exception).__module__.startswith("ibm_watsonx_ai"):
+        match = _STATUS_IN_MESSAGE.search(str(exception))
+        if match is not None:
+            return int(match.group(1))
+    return None
+
+
+def _retry_after(exception: BaseException) -> Optional[float]:
+    response = getattr(exception, "response", None)
+    headers = getattr(response, "headers", None)
+    value = headers.get("Retry-After") if headers is not None else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_transport_error(exception: BaseException) -> bool:
+    # connection resets, connect and read timeouts, ...
+    import httpx
+
+    return isinstance(exception, httpx.TransportError)
+
+
+class Retrier:
+    def __init__(self, policy: RetryPolicy):
+        self.policy = policy
+        self._stats = RetryStats()
+        self._lock = threading.Lock()
+
+    def is_retryable(self, exception: BaseException) -> bool:
+        status_code = _status_code(exception)
+        if status_code is not None:
+            return status_code in self.policy.retry_status_codes
+        return _is_transport_error(exception)
+
+    def _delay(self, exception: BaseException, retry: int) -> float:
+        if self.policy.respect_retry_after:
+            retry_after = _retry_after(exception)
+            if retry_after is not None:
+                return retry_after
+        return self.policy.backoff(retry)
+
+    async def call(self, attempt: Callable[[], Awaitable[T]], on_retry: Optional[Callable[[], None]] = None) -> T:
+        """
+        await `attempt()` until it succeeds, fails with a non retryable error, or retries or deadline are used up,
+        `on_retry` is called before each retry
+        """
+        deadline = self._start()
+        retry = 0
+        while True:
+            try:
+                if deadline is None:
+                    return await attempt()
+                return await asyncio.wait_for(attempt(), max(0.0, deadline - time.monotonic()))
+            except Exception as e:
+                delay = self._retry_delay(e, retry, deadline, on_retry)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            retry += 1
+
+    def call_blocking(self, attempt: Callable[[], T], on_retry: Optional[Callable[[], None]] = None) -> T:
+        """
+        `call` for the blocking sdk calls, e.g. tokenize, the deadline only bounds the backoff
+        """
+        deadline = self._start()
+        retry = 0
+        while True:
+            try:
+                return attempt()
+            except Exception as e:
+                delay = self._retry_delay(e, retry, deadline, on_retry)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            retry += 1
+
+    def _start(self) -> Optional[float]:
+        with self._lock:
+            self._stats.calls += 1
+        return time.monotonic() + self.policy.deadline if self.policy.deadline is not None else None
+
+    def _retry_delay(
+        self, e: Exception, retry: int, deadline: Optional[float], on_retry: Optional[Callable[[], None]]
+    ) -> Optional[float]:
+        # the delay before retrying after the failed attempt `retry`, None when `e` is not to be retried
+        if retry >= self.policy.max_retries or not self.is_retryable(e):
+            if retry > 0 or isinstance(e, asyncio.TimeoutError):
+                with self._lock:
+                    self._stats.exhausted += 1
+            return None
+        delay = self._delay(e, retry)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            with self._lock:
+                self._stats.exhausted += 1
+            return None
+        status_code = _status_code(e)
+        with self._lock:
+            self._stats.retries += 1
+            self._stats.backoff_time += delay
+            if status_code is not None:
+                self._stats.retries_by_status[status_code] = self._stats.retries_by_status.get(status_code, 0) + 1
+        if on_retry is not None:
+            on_retry()
+        return delay
+
+    def stats(self) -> RetryStats:
+        with self._lock:
+            return RetryStats(
+                calls=self._stats.calls,
+                retries=self._stats.retries,
+                backoff_time=self._stats.backoff_time,
+                exhausted=self._stats.exhausted,
+                retries_by_status=dict(self._stats.retries_by_status),
+            )
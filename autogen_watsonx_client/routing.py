@@ -0,0 +1,231 @@
+import asyncio
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Literal, Optional
+
+from autogen_watsonx_client.pool import ModelInferenceLease
+
+RoutingPolicy = Literal["round_robin", "least_in_flight", "ewma_latency"]
+
+# weight of the latest latency in the moving average
+_EWMA_ALPHA = 0.2
+
+
+class CircuitBreaker:
+    """
+    opens after `failure_threshold` consecutive transient failures, sending no requests for `reset_timeout` seconds,
+    then lets a single trial request through and closes again once it succeeds
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> Literal["closed", "open", "half_open"]:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self._reset_timeout:
+            return "open"
+        return "half_open"
+
+    @property
+    def opened_at(self) -> Optional[float]:
+        return self._opened_at
+
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._trial_in_flight)
+
+    def on_request(self) -> None:
+        if self.state == "half_open":
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_cancelled(self) -> None:
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._consecutive_failures += 1
+        if self._trial_in_flight or self._consecutive_failures >= self._failure_threshold:
+            self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+
+@dataclass
+class EndpointStats:
+    """
+    counters of one endpoint, `ewma_latency` is in seconds
+    """
+    url: str
+    space_id: Optional[str]
+    project_id: Optional[str]
+    in_flight: int
+    requests: int
+    failures: int
+    ewma_latency: Optional[float]
+    circuit: str
+
+
+class Endpoint:
+    def __init__(self, connection_args: dict, breaker: CircuitBreaker):
+        self.connection_args = connection_args
+        self.breaker = breaker
+        self.lease: Optional[ModelInferenceLease] = None
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.ewma_latency: Optional[float] = None
+
+    def stats(self) -> EndpointStats:
+        return EndpointStats(
+            url=self.connection_args["url"],
+            space_id=self.connection_args["space_id"],
+            project_id=self.connection_args["project_id"],
+            in_flight=self.in_flight,
+            requests=self.requests,
+            failures=self.failures,
+            ewma_latency=self.ewma_latency,
+            circuit=self.breaker.state,
+        )
+
+
+class Route:
+    """
+    a request on an endpoint, `record` reports its outcome to the endpoint's health and latency,
+    `release` ends it for the in-flight count. both are idempotent.
+    """
+
+    def __init__(self, router: "Router", endpoint: Endpoint):
+        self._router = router
+        self.endpoint = endpoint
+        self._start = time.perf_counter()
+        self._recorded = False
+        self._released = False
+
+    def record(self, error: Optional[BaseException] = None) -> None:
+        if self._recorded:
+            return
+        self._recorded = True
+        self._router._record(self.endpoint, time.perf_counter() - self._start, error)
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._router._release(self.endpoint)
+
+
+class Router:
+    """
+    picks an endpoint per request by `policy` among the endpoints whose circuit is not open.
+    when all circuits are open, the endpoint whose circuit opened first gets the request.
+    `is_failure` tells which errors count against an endpoint's health, e.g. not the 4xx caused by the request itself.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[dict],
+        acquire: Callable[..., ModelInferenceLease],
+        is_failure: Callable[[BaseException], bool],
+        policy: RoutingPolicy = "round_robin",
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        if not endpoints:
+            raise ValueError("at least one endpoint is needed for routing")
+        if policy not in ("round_robin", "least_in_flight", "ewma_latency"):
+            raise ValueError(
+                f"unknown routing policy {policy}, expected 'round_robin', 'least_in_flight' or 'ewma_latency'"
+            )
+        self._endpoints = [Endpoint(args, CircuitBreaker(failure_threshold, reset_timeout)) for args in endpoints]
+        self._acquire = acquire
+        self._is_failure = is_failure
+        self._policy = policy
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+        # connecting does network and auth work, kept apart from the lock taken on every request
+        self._connect_lock = threading.Lock()
+
+    def route(self) -> Route:
+        with self._lock:
+            endpoint = self._pick()
+            endpoint.breaker.on_request()
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+        return Route(self, endpoint)
+
+    def _pick(self) -> Endpoint:
+        candidates = [endpoint for endpoint in self._endpoints if endpoint.breaker.available()]
+        if not candidates:
+            return min(self._endpoints, key=lambda endpoint: endpoint.breaker.opened_at)
+        if len(candidates) == 1:
+            return candidates[0]
+        if self._policy == "least_in_flight":
+            return min(candidates, key=lambda endpoint: endpoint.in_flight)
+        if self._policy == "ewma_latency":
+            return min(candidates, key=self._ewma_cost)
+        return candidates[next(self._round_robin) % len(candidates)]
+
+    @staticmethod
+    def _ewma_cost(endpoint: Endpoint) -> tuple[int, float]:
+        # endpoints without a latency yet are tried first, the others by their latency weighted by their load
+        if endpoint.ewma_latency is None:
+            return 0, endpoint.in_flight
+        return 1, endpoint.ewma_latency * (endpoint.in_flight + 1)
+
+    def _record(self, endpoint: Endpoint, latency: float, error: Optional[BaseException]) -> None:
+        with self._lock:
+            if error is not None and not isinstance(error, Exception):
+                # cancelled, says nothing about the endpoint
+                endpoint.breaker.record_cancelled()
+                return
+            if error is not None and self._is_failure(error):
+                endpoint.failures += 1
+                endpoint.breaker.record_failure()
+                return
+            endpoint.breaker.record_success()
+            if error is None:
+                if endpoint.ewma_latency is None:
+                    endpoint.ewma_latency = latency
+                else:
+                    endpoint.ewma_latency += _EWMA_ALPHA * (latency - endpoint.ewma_latency)
+
+    def _release(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            endpoint.in_flight -= 1
+
+    async def model(self, endpoint: Endpoint, run_blocking: Callable[..., Awaitable]):
+        """
+        the `ModelInference` of an endpoint, connected on first use and again when used from another event loop
+        """
+        loop = asyncio.get_running_loop()
+        lease = endpoint.lease
+        if lease is not None and not lease.bind(loop):
+            endpoint.lease = None
+            await lease.release()
+        if endpoint.lease is None:
+            await run_blocking(self._connect, endpoint, loop)
+        return endpoint.lease.model
+
+    def _connect(self, endpoint: Endpoint, loop: asyncio.AbstractEventLoop) -> None:
+        with self._connect_lock:
+            if endpoint.lease is None:
+                endpoint.lease = self._acquire(**endpoint.connection_args, loop=loop)
+
+    def stats(self) -> list[EndpointStats]:
+        with self._lock:
+            return [endpoint.stats() for endpoint in self._endpoints]
+
+    async def close(self) -> None:
+        leases = [endpoint.lease for endpoint in self._endpoints if endpoint.lease is not None]
+        await asyncio.gather(*(lease.release() for lease in leases))
@@ -0,0 +1,104 @@
+import gzip
+import json
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    # optional, `pip install autogen_watsonx_client[fast]`
+    orjson = None
+
+# gzip level of compressed request bodies, json shrinks several times already at the cheapest level
+_GZIP_LEVEL = 1
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    compact json, through orjson when it is installed.
+    not for hashing: orjson and the standard library format some floats differently, e.g. 1e-7 and 1e-07
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # e.g. integers beyond 64 bit or keys that are not strings, left to the standard library
+            pass
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _httpx_json_body(obj: Any) -> bytes:
+    # the body httpx itself sends for `json=`
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+def _orjson_response_json(response):
+    # replaces `response.json` of a single response, keyword arguments are left to httpx
+    def response_json(**kwargs):
+        if kwargs:
+            return type(response).json(response, **kwargs)
+        return orjson.loads(response.content)
+
+    return response_json
+
+
+def _response_hook(response) -> None:
+    response.json = _orjson_response_json(response)
+
+
+async def _async_response_hook(response) -> None:
+    response.json = _orjson_response_json(response)
+
+
+def _json_content(kwargs: dict) -> dict:
+    # `json=` as orjson encoded `content=`, before the sdk or httpx encode it with the standard library
+    obj = kwargs.get("json")
+    if obj is None or kwargs.get("content") is not None:
+        return kwargs
+    import httpx
+
+    headers = httpx.Headers(kwargs.get("headers"))
+    headers["Content-Type"] = "application/json"
+    kwargs = dict(kwargs, content=dumps(obj), headers=headers)
+    del kwargs["json"]
+    return kwargs
+
+
+def install_http_codec(http_client, fast_json: bool, compress_min_size: Optional[int], is_async: bool) -> None:
+    """
+    with `fast_json` encode the json bodies of the requests of an httpx client and decode `response.json()`
+    with orjson, with `compress_min_size` gzip the request bodies of at least that many bytes
+    """
+    import httpx
+
+    if fast_json:
+        post, stream = http_client.post, http_client.stream
+        # the sdk binds `post` and `stream` when the model inference is built, so they are replaced on the instance
+        http_client.post = lambda *args, **kwargs: post(*args, **_json_content(kwargs))
+        http_client.stream = lambda *args, **kwargs: stream(*args, **_json_content(kwargs))
+        event_hooks = http_client.event_hooks
+        hook = _async_response_hook if is_async else _response_hook
+        http_client.event_hooks = {**event_hooks, "response": [*event_hooks["response"], hook]}
+
+    if compress_min_size is not None:
+        build_request = http_client.build_request
+
+        def build_compressed_request(method, url, *, content=None, json=None, headers=None, **kwargs):
+            if json is not None and content is None:
+                content = _httpx_json_body(json)
+                headers = httpx.Headers(headers)
+                headers["Content-Type"] = "application/json"
+            if isinstance(content, str):
+                content = content.encode("utf-8")
+            if isinstance(content, bytes) and len(content) >= compress_min_size:
+                content = gzip.compress(content, compresslevel=_GZIP_LEVEL)
+                headers = httpx.Headers(headers)
+                headers["Content-Encoding"] = "gzip"
+            return build_request(method, url, content=content, headers=headers, **kwargs)
+
+        http_client.build_request = build_compressed_request
@@ -0,0 +1,391 @@
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Literal, Optional
+
+from autogen_core import FunctionCall
+
+from autogen_watsonx_client.serialization import loads
+
+CoalesceBoundary = Literal["word", "line"]
+
+# buffered text is flushed regardless of boundaries once it gets this long
+_MAX_BUFFERED_CHARS = 4096
+
+
+class ChunkCoalescer:
+    """
+    buffers streamed content deltas and releases them in larger pieces:
+    once `min_chars` characters are buffered, once the oldest buffered delta is `max_delay` seconds old,
+    and/or only up to the last word or line boundary.
+    during a pause in the stream the consumer waits at most `time_until_flush()` for the next delta
+    and then takes the buffer with `poll()`.
+    """
+
+    def __init__(
+        self,
+        min_chars: Optional[int] = None,
+        max_delay: Optional[float] = None,
+        boundary: Optional[CoalesceBoundary] = None,
+    ):
+        if boundary not in (None, "word", "line"):
+            raise ValueError(f"unknown coalesce boundary {boundary}, expected 'word' or 'line'")
+        self._min_chars = min_chars
+        self._max_delay = max_delay
+        self._boundary = boundary
+        self._parts: list[str] = []
+        self._length = 0
+        self._first_buffered_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._min_chars or self._max_delay or self._boundary)
+
+    def push(self, delta: str) -> Optional[str]:
+        """
+        buffer a delta, returns the text to emit if a flush is due
+        """
+        if not self._parts:
+            self._first_buffered_at = time.monotonic()
+        self._parts.append(delta)
+        self._length += len(delta)
+
+        if self._length < _MAX_BUFFERED_CHARS and not self._flush_due():
+            return None
+        text = "".join(self._parts)
+        if self._boundary is not None and self._length < _MAX_BUFFERED_CHARS:
+            cut = self._last_boundary(text)
+            if cut <= 0:
+                self._parts = [text]
+                return None
+            text, rest = text[:cut], text[cut:]
+            self._parts = [rest] if rest else []
+            self._length = len(rest)
+            self._first_buffered_at = time.monotonic()
+            return text
+        self._parts = []
+        self._length = 0
+        return text
+
+    def time_until_flush(self) -> Optional[float]:
+        """
+        seconds until the buffered text is due by `max_delay`, None when nothing is buffered or there is no delay
+        """
+        if not self._max_delay or not self._parts:
+            return None
+        return max(0.0, self._first_buffered_at + self._max_delay - time.monotonic())
+
+    def poll(self) -> Optional[str]:
+        """
+        the buffered text once it is due by `max_delay`, boundaries aside, as no further delta arrived in time
+        """
+        if self.time_until_flush() != 0.0:
+            return None
+        return self.flush()
+
+    def flush(self) -> Optional[str]:
+        """
+        everything still buffered, called at the end of the stream
+        """
+        if not self._parts:
+            return None
+        text = "".join(self._parts)
+        self._parts = []
+        self._length = 0
+        return text
+
+    def _flush_due(self) -> bool:
+        if self._min_chars and self._length >= self._min_chars:
+            return True
+        if self._max_delay and time.monotonic() - self._first_buffered_at >= self._max_delay:
+            return True
+        # boundary only coalescing flushes at every boundary
+        return not self._min_chars and not self._max_delay
+
+    def _last_boundary(self, text: str) -> int:
+        # index right after the last boundary character, 0 if there is none
+        if self._boundary == "line":
+            return text.rfind("\n") + 1
+        return max(text.rfind(" "), text.rfind("\n"), text.rfind("\t")) + 1
+
+
+_END_OF_STREAM = object()
+# returned by `StreamReader.next` when no chunk arrived in time
+TIMED_OUT = object()
+
+
+class _StreamFailure:
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+class StreamReader:
+    """
+    reads an async stream in a single background task into a bounded queue.
+    the consumer can fall behind by up to `max_buffered` chunks without stalling the http stream,
+    beyond that the reader stops reading, which is the backpressure on the connection.
+    errors of the stream are raised to the consumer, and cancelling `task` raises `CancelledError` to the consumer.
+    `aclose` stops the reader and closes the stream.
+    """
+
+    def __init__(self, stream: AsyncIterator, max_buffered: int = 256):
+        if max_buffered <= 0:
+            raise ValueError("max_buffered of the stream reader needs to be positive")
+        self._stream = stream
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+        self._finished = False
+        # a get that timed out, kept for the next call instead of starting a task per chunk
+        self._pending_get: Optional[asyncio.Future] = None
+        self.task: asyncio.Task = asyncio.create_task(self._read())
+        self.task.add_done_callback(self._on_reader_done)
+
+    def __aiter__(self) -> "StreamReader":
+        return self
+
+    async def __anext__(self):
+        return await self.next()
+
+    async def next(self, timeout: Optional[float] = None):
+        """
+        the next chunk, or `TIMED_OUT` when none arrived within `timeout` seconds
+        """
+        if self._finished:
+            raise StopAsyncIteration
+        if self._pending_get is None:
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+            elif timeout is None:
+                item = await self._queue.get()
+            else:
+                self._pending_get = asyncio.ensure_future(self._queue.get())
+        if self._pending_get is not None:
+            # waiting does not cancel the get, so no chunk is lost when the wait times out or is cancelled
+            done, _ = await asyncio.wait((self._pending_get,), timeout=timeout)
+            if not done:
+                return TIMED_OUT
+            item = self._pending_get.result()
+            self._pending_get = None
+        if item is _END_OF_STREAM:
+            self._finished = True
+            raise StopAsyncIteration
+        if type(item) is _StreamFailure:
+            self._finished = True
+            raise item.exception
+        return item
+
+    async def _read(self) -> None:
+        put = self._queue.put
+        try:
+            async for chunk in self._stream:
+                await put(chunk)
+        except Exception as e:
+            await put(_StreamFailure(e))
+            return
+        await put(_END_OF_STREAM)
+
+    def _on_reader_done(self, task: asyncio.Task) -> None:
+        # the reader was cancelled from outside, e.g. through a linked CancellationToken,
+        # drop what is buffered and let the consumer know
+        if task.cancelled() and not self._finished:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(_StreamFailure(asyncio.CancelledError()))
+
+    async def aclose(self) -> None:
+        self._finished = True
+        if self._pending_get is not None:
+            self._pending_get.cancel()
+            self._pending_get = None
+        if not self.task.done():
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        aclose = getattr(self._stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+class _PrependedStream:
+    """
+    the stream with its already read first chunk put back in front.
+    `on_close` is called once, at the end of the stream or on `aclose`. `aclose` closes the stream also when
+    it was never iterated, unlike the `finally` of an async generator, which only runs once the generator has started
+    """
+
+    def __init__(self, first_chunk, stream: AsyncIterator, on_close: Optional[Callable[[], None]] = None):
+        self._first_chunk = first_chunk
+        self._first_pending = True
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    def __aiter__(self) -> "_PrependedStream":
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+        if self._first_pending:
+            self._first_pending = False
+            first_chunk, self._first_chunk = self._first_chunk, None
+            return first_chunk
+        try:
+            return await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._release()
+            raise
+
+    def _release(self) -> None:
+        on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close()
+
+    async def aclose(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._first_chunk = None
+        self._release()
+        aclose = getattr(self._stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+# characters that matter for finding the end of a json document
+_JSON_STRUCTURAL = re.compile(r'[\\"{}\[\]]')
+
+
+class _JsonCompletionScanner:
+    """
+    incremental scanner telling when the fragments fed so far form a complete json object or array,
+    only the structural characters are looked at so every fragment is scanned once
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escaped = False
+        self.complete = False
+
+    def feed(self, fragment: str) -> bool:
+        if self.complete or not fragment:
+            return self.complete
+        # position up to which characters are skipped because they are escaped
+        skip_to = 0
+        if self._escaped:
+            self._escaped = False
+            skip_to = 1
+        for match in _JSON_STRUCTURAL.finditer(fragment):
+            i = match.start()
+            if i < skip_to:
+                continue
+            char = fragment[i]
+            if self._in_string:
+                if char == "\\":
+                    if i + 1 < len(fragment):
+                        skip_to = i + 2
+                    else:
+                        self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                self._started = True
+            elif char in "}]":
+                self._depth -= 1
+                if self._started and self._depth == 0:
+                    self.complete = True
+                    break
+        return self.complete
+
+
+class _ToolCallParts:
+    __slots__ = ("index", "id_parts", "name_parts", "argument_parts", "scanner", "emitted")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.id_parts: list[str] = []
+        self.name_parts: list[str] = []
+        self.argument_parts: list[str] = []
+        self.scanner = _JsonCompletionScanner()
+        self.emitted = False
+
+    def to_function_call(self) -> FunctionCall:
+        return FunctionCall(
+            id="".join(self.id_parts),
+            arguments="".join(self.argument_parts),
+            name="".join(self.name_parts),
+        )
+
+
+@dataclass
+class ToolCallReadyEvent:
+    """
+    yielded by `create_stream` with `stream_tool_call_events` as soon as the arguments of a tool call are complete,
+    while the model may still be generating further tool calls
+    """
+    index: int
+    call: FunctionCall
+
+
+class ToolCallAccumulator:
+    """
+    assembles streamed tool call deltas from part lists instead of repeated string concatenation,
+    and tells as soon as the arguments of a call form a complete json document
+    """
+
+    def __init__(self):
+        self._calls: dict[int, _ToolCallParts] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._calls)
+
+    def add(self, tool_call_chunk: dict) -> Optional[ToolCallReadyEvent]:
+        """
+        add a tool call delta, returns an event when this delta completes the arguments of its call
+        """
+        idx = tool_call_chunk["index"]
+        parts = self._calls.get(idx)
+        if parts is None:
+            parts = self._calls[idx] = _ToolCallParts(idx)
+
+        if "id" in tool_call_chunk:
+            parts.id_parts.append(tool_call_chunk["id"])
+        function = tool_call_chunk.get("function")
+        if function is not None:
+            if "name" in function:
+                parts.name_parts.append(function["name"])
+            if "arguments" in function:
+                arguments = function["arguments"]
+                parts.argument_parts.append(arguments)
+                if not parts.emitted and parts.scanner.feed(arguments):
+                    return self._ready(parts)
+        return None
+
+    def _ready(self, parts: _ToolCallParts) -> Optional[ToolCallReadyEvent]:
+        call = parts.to_function_call()
+        if not call.id or not call.name:
+            return None
+        try:
+            loads(call.arguments)
+        except ValueError:
+            return None
+        parts.emitted = True
+        return ToolCallReadyEvent(index=parts.index, call=call)
+
+    def pending_events(self) -> list[ToolCallReadyEvent]:
+        """
+        events of the calls that were not reported ready yet, e.g. calls without arguments, at the end of the stream
+        """
+        events = []
+        for parts in self._calls.values():
+            if not parts.emitted:
+                parts.emitted = True
+                events.append(ToolCallReadyEvent(index=parts.index, call=parts.to_function_call()))
+        return events
+
+    def function_calls(self) -> list[FunctionCall]:
+        return [parts.to_function_call() for parts in self._calls.values()]
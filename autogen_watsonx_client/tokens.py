@@ -0,0 +1,135 @@
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+from typing import Callable, Literal, Optional
+
+TokenCountMode = Literal["service", "approximate"]
+
+# rough number of characters per token for the approximate mode
+_CHARS_PER_TOKEN = 4
+
+
+def _watsonx_message_text(wx_message: dict) -> str:
+    """
+    text of a converted watsonx message as seen by the tokenizer, image data is left out
+    """
+    parts = [wx_message["role"]]
+    content = wx_message.get("content")
+    if isinstance(content, str):
+        parts.append(content)
+    elif isinstance(content, list):
+        parts.extend(item["text"] for item in content if item.get("type") == "text")
+    if "tool_calls" in wx_message:
+        parts.append(json.dumps(wx_message["tool_calls"]))
+    return "\n".join(parts)
+
+
+def _approximate_token_count(text: str) -> int:
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+
+def _apportion(total: int, weights: list[int]) -> list[int]:
+    """
+    split `total` proportionally to `weights` into integers summing up to `total`
+    """
+    weight_sum = sum(weights) or 1
+    shares = [total * weight / weight_sum for weight in weights]
+    counts = [int(share) for share in shares]
+    by_remainder = sorted(range(len(shares)), key=lambda i: shares[i] - counts[i], reverse=True)
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+class TokenCounter:
+    """
+    counts tokens of converted watsonx messages and tools, per message counts are cached by content hash.
+    in "service" mode all uncached texts of a request are tokenized by the watsonx tokenize endpoint in one call,
+    the total of a call is split between its texts proportionally to their length.
+    the "approximate" mode counts ~4 characters per token locally without any request.
+    """
+
+    def __init__(
+        self,
+        tokenize: Callable[[str], int],
+        mode: TokenCountMode = "service",
+        max_size: int = 4096,
+    ):
+        if mode not in ("service", "approximate"):
+            raise ValueError(f"unknown token count mode {mode}, expected 'service' or 'approximate'")
+        self._tokenize = tokenize
+        self._mode = mode
+        self._max_size = max_size
+        # id(converted message) -> (converted message, count), converted messages are reused by the conversion cache
+        self._by_identity: OrderedDict[int, tuple[dict, int]] = OrderedDict()
+        self._by_content: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def mode(self) -> TokenCountMode:
+        return self._mode
+
+    def count(self, wx_messages: list, tools_json: str = "") -> int:
+        return sum(self._counts(wx_messages, tools_json))
+
+    def count_each(self, wx_messages: list) -> list[int]:
+        """
+        the token count of every message
+        """
+        return self._counts(wx_messages, "")
+
+    def _counts(self, wx_messages: list, tools_json: str) -> list[int]:
+        # per message counts, followed by the count of the tools when there are any
+        counts: list[Optional[int]] = []
+        missing: list[tuple[int, Optional[dict], str, str]] = []
+        with self._lock:
+            for wx_message in wx_messages:
+                entry = self._by_identity.get(id(wx_message))
+                if entry is not None and entry[0] is wx_message:
+                    counts.append(entry[1])
+                    continue
+                text = _watsonx_message_text(wx_message)
+                key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+                count = self._by_content.get(key)
+                if count is not None:
+                    self._remember(wx_message, key, count)
+                counts.append(count)
+                if count is None:
+                    missing.append((len(counts) - 1, wx_message, key, text))
+            if tools_json and tools_json != "[]":
+                key = hashlib.sha256(tools_json.encode("utf-8")).hexdigest()
+                count = self._by_content.get(key)
+                counts.append(count)
+                if count is None:
+                    missing.append((len(counts) - 1, None, key, tools_json))
+
+        if missing:
+            texts = [text for _, _, _, text in missing]
+            if self._mode == "approximate":
+                missing_counts = [_approximate_token_count(text) for text in texts]
+            else:
+                missing_counts = _apportion(self._tokenize("\n".join(texts)), [len(text) for text in texts])
+            with self._lock:
+                for (position, wx_message, key, _), count in zip(missing, missing_counts):
+                    counts[position] = count
+                    self._remember(wx_message, key, count)
+
+        return counts
+
+    def _remember(self, wx_message: Optional[dict], key: str, count: int) -> None:
+        self._by_content[key] = count
+        self._by_content.move_to_end(key)
+        while len(self._by_content) > self._max_size:
+            self._by_content.popitem(last=False)
+        if wx_message is not None:
+            self._by_identity[id(wx_message)] = (wx_message, count)
+            self._by_identity.move_to_end(id(wx_message))
+            while len(self._by_identity) > self._max_size:
+                self._by_identity.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_identity.clear()
+            self._by_content.clear()
@@ -0,0 +1,295 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator, Optional, Sequence
+
+from autogen_core.models import RequestUsage
+
+from autogen_watsonx_client.config import TokenBudget
+
+# how often a call waiting for a budget checks again when only requests in flight hold the budget, in seconds
+_BUDGET_POLL_INTERVAL = 0.05
+
+_usage_source: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("watsonx_usage_source", default=None)
+
+
+@contextmanager
+def usage_scope(source: str) -> Iterator[None]:
+    """
+    attribute the usage of the calls made inside the block, and tasks started from it, to `source`,
+    e.g. the name of the agent making them. takes precedence over the `usage_source` of the client
+    """
+    token = _usage_source.set(source)
+    try:
+        yield
+    finally:
+        _usage_source.reset(token)
+
+
+def current_usage_source() -> Optional[str]:
+    return _usage_source.get()
+
+
+class TokenBudgetExceededError(Exception):
+    """
+    raised before a request is sent when a token budget with `on_exceeded="reject"` is used up
+    """
+
+    def __init__(self, budget: TokenBudget, used: int):
+        self.budget = budget
+        self.used = used
+        scope = "".join(
+            f" of {key} {budget[key]}" for key in ("source", "model_id") if budget.get(key) is not None
+        )
+        window = f" per {budget['window']} seconds" if budget.get("window") else ""
+        super().__init__(f"token budget{scope} of {budget['tokens']} tokens{window} is used up, {used} tokens used")
+
+
+class UsageCounter:
+    """
+    prompt and completion tokens added up under a lock, safe to update from several tasks and threads
+    """
+
+    def __init__(self):
+        self._prompt_tokens = 0
+        self._completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, usage: RequestUsage) -> None:
+        with self._lock:
+            self._prompt_tokens += usage.prompt_tokens
+            self._completion_tokens += usage.completion_tokens
+
+    def usage(self) -> RequestUsage:
+        with self._lock:
+            return RequestUsage(prompt_tokens=self._prompt_tokens, completion_tokens=self._completion_tokens)
+
+
+@dataclass
+class UsageStats:
+    """
+    usage of one source and model, the `window_*` counters cover the rolling window of the tracker.
+    cached responses are counted in `cached_requests` only, they use no tokens.
+    """
+    source: Optional[str]
+    model_id: str
+    requests: int
+    cached_requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    window_requests: int
+    window_prompt_tokens: int
+    window_completion_tokens: int
+
+
+@dataclass
+class BudgetStats:
+    """
+    state of a token budget, `used` counts the tokens of the current window, or all of them without a window,
+    `reserved` the estimated tokens of the requests in flight
+    """
+    tokens: int
+    window: Optional[float]
+    source: Optional[str]
+    model_id: Optional[str]
+    used: int
+    reserved: int
+    rejected: int
+    waited: int
+
+
+class _Entries:
+    # timestamped values kept for a rolling window
+    __slots__ = ("entries",)
+
+    def __init__(self):
+        self.entries: deque = deque()
+
+    def prune(self, cutoff: float) -> None:
+        entries = self.entries
+        while entries and entries[0][0] < cutoff:
+            entries.popleft()
+
+
+class _SourceUsage:
+    __slots__ = ("requests", "cached_requests", "prompt_tokens", "completion_tokens", "window")
+
+    def __init__(self):
+        self.requests = 0
+        self.cached_requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        # (time, prompt tokens, completion tokens)
+        self.window = _Entries()
+
+
+class _Budget:
+    __slots__ = ("config", "used", "reserved", "window", "rejected", "waited")
+
+    def __init__(self, config: TokenBudget):
+        self.config = config
+        # tokens used overall, only kept for budgets without a window
+        self.used = 0
+        self.reserved = 0
+        # (time, tokens)
+        self.window = _Entries()
+        self.rejected = 0
+        self.waited = 0
+
+    def matches(self, source: Optional[str], model_id: str) -> bool:
+        config = self.config
+        return (
+            (config.get("source") is None or config["source"] == source)
+            and (config.get("model_id") is None or config["model_id"] == model_id)
+        )
+
+    def used_tokens(self, now: float) -> int:
+        window = self.config.get("window")
+        if not window:
+            return self.used
+        self.window.prune(now - window)
+        return sum(tokens for _, tokens in self.window.entries)
+
+    def add(self, now: float, tokens: int) -> None:
+        if self.config.get("window"):
+            self.window.entries.append((now, tokens))
+        else:
+            self.used += tokens
+
+    def wait_time(self, now: float) -> float:
+        # until the oldest tokens of the window expire, or a poll interval when requests in flight hold the budget
+        entries = self.window.entries
+        if self.reserved or not entries:
+            return _BUDGET_POLL_INTERVAL
+        return max(0.0, entries[0][0] + self.config["window"] - now)
+
+
+class UsageTracker:
+    """
+    usage broken down by source, e.g. the agent making the calls, and model, over the whole lifetime and a rolling
+    `window` in seconds, and the token `budgets` checked before requests are sent.
+    a budget is used up once its used and in flight tokens reach `tokens`, calls are then rejected with
+    `TokenBudgetExceededError` or, with `on_exceeded="wait"`, wait until enough tokens leave the budget's window.
+    the estimate of a request is reserved while it is in flight, so concurrent requests count against the budget.
+    one tracker can be shared by several clients, its state is guarded by a lock.
+    """
+
+    def __init__(self, window: float = 3600.0, budgets: Sequence[TokenBudget] = ()):
+        if window <= 0:
+            raise ValueError("the usage window needs to be positive")
+        for budget in budgets:
+            if budget.get("tokens", 0) <= 0:
+                raise ValueError("the tokens of a budget need to be positive")
+            on_exceeded = budget.get("on_exceeded", "reject")
+            if on_exceeded not in ("reject", "wait"):
+                raise ValueError(f"unknown on_exceeded {on_exceeded} of a budget, expected 'reject' or 'wait'")
+            if on_exceeded == "wait" and not budget.get("window"):
+                raise ValueError("only a budget with a window can wait, its tokens are never given back otherwise")
+        self._window = window
+        self._usage: dict[tuple[Optional[str], str], _SourceUsage] = {}
+        self._budgets = [_Budget(budget) for budget in budgets]
+        self._lock = threading.Lock()
+
+    @property
+    def has_budgets(self) -> bool:
+        return bool(self._budgets)
+
+    def record(self, usage: RequestUsage, source: Optional[str], model_id: str, cached: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            source_usage = self._usage.get((source, model_id))
+            if source_usage is None:
+                source_usage = self._usage[(source, model_id)] = _SourceUsage()
+            if cached:
+                source_usage.cached_requests += 1
+                return
+            source_usage.requests += 1
+            source_usage.prompt_tokens += usage.prompt_tokens
+            source_usage.completion_tokens += usage.completion_tokens
+            source_usage.window.entries.append((now, usage.prompt_tokens, usage.completion_tokens))
+            source_usage.window.prune(now - self._window)
+            tokens = usage.prompt_tokens + usage.completion_tokens
+            for budget in self._budgets:
+                if budget.matches(source, model_id):
+                    budget.add(now, tokens)
+
+    @asynccontextmanager
+    async def reserve(self, estimated_tokens: int, source: Optional[str], model_id: str) -> AsyncIterator[None]:
+        """
+        wait for or reject on the used up budgets of the call, then hold `estimated_tokens` of them while the call
+        is in flight. the actual usage is to be recorded before leaving the block
+        """
+        budgets = [budget for budget in self._budgets if budget.matches(source, model_id)]
+        if not budgets:
+            yield
+            return
+        counted_wait = False
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                exceeded = next(
+                    (
+                        budget for budget in budgets
+                        if budget.used_tokens(now) + budget.reserved >= budget.config["tokens"]
+                    ),
+                    None,
+                )
+                if exceeded is None:
+                    for budget in budgets:
+                        budget.reserved += estimated_tokens
+                    break
+                if exceeded.config.get("on_exceeded", "reject") == "reject":
+                    exceeded.rejected += 1
+                    raise TokenBudgetExceededError(exceeded.config, exceeded.used_tokens(now))
+                if not counted_wait:
+                    exceeded.waited += 1
+                    counted_wait = True
+                delay = exceeded.wait_time(now)
+            await asyncio.sleep(delay)
+        try:
+            yield
+        finally:
+            with self._lock:
+                for budget in budgets:
+                    budget.reserved -= estimated_tokens
+
+    def stats(self) -> list[UsageStats]:
+        now = time.monotonic()
+        with self._lock:
+            stats = []
+            for (source, model_id), source_usage in self._usage.items():
+                source_usage.window.prune(now - self._window)
+                entries = source_usage.window.entries
+                stats.append(UsageStats(
+                    source=source,
+                    model_id=model_id,
+                    requests=source_usage.requests,
+                    cached_requests=source_usage.cached_requests,
+                    prompt_tokens=source_usage.prompt_tokens,
+                    completion_tokens=source_usage.completion_tokens,
+                    window_requests=len(entries),
+                    window_prompt_tokens=sum(entry[1] for entry in entries),
+                    window_completion_tokens=sum(entry[2] for entry in entries),
+                ))
+            return stats
+
+    def budget_stats(self) -> list[BudgetStats]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                BudgetStats(
+                    tokens=budget.config["tokens"],
+                    window=budget.config.get("window"),
+                    source=budget.config.get("source"),
+                    model_id=budget.config.get("model_id"),
+                    used=budget.used_tokens(now),
+                    reserved=budget.reserved,
+                    rejected=budget.rejected,
+                    waited=budget.waited,
+                )
+                for budget in self._budgets
+            ]
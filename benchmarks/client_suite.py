@@ -0,0 +1,415 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Intro
+#
+# Offline benchmark suite of `WatsonXChatCompletionClient` against the local mock server of `mock_watsonx.py`,
+# which runs in its own process so that the measured CPU time is the client's.
+# Scenarios:
+# - `create`, `stream`: independent requests at a given concurrency
+# - `conversion`: converting a growing conversation with tools, without and with the client's caches (no server)
+# - `count_tokens`: counting the tokens of a growing conversation with tools through the tokenization endpoint
+# - `round_robin`, `selector`, `swarm`: request patterns of the multi-agent teams of `doc/`, without autogen-agentchat:
+#   agents taking turns on a shared history, a selector call before every turn, and handoffs through tool calls
+# - `payload`: requests with a long history and many tools, with the standard library json and with `fast_json`,
+#   each without and with `compress_requests`
+#
+# Reports throughput, p50/p99 latency, time to first token, client CPU per request
+# and, for the payload scenario, the bytes the server received per request.
+# `--output` saves the results as json, `--baseline` compares with saved results and fails on regressions.
+#
+# ### prerequisites
+#
+# - the `openssl` command line tool, used for the certificate of the mock server
+# - usage: `python benchmarks/client_suite.py --requests 500 --concurrency 32 --latency 0.05 --tokens-per-second 500`
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Optional
+
+from autogen_core import FunctionCall
+from autogen_core.models import (
+    AssistantMessage, FunctionExecutionResult, FunctionExecutionResultMessage, SystemMessage, UserMessage
+)
+from autogen_core.tools import FunctionTool
+
+from autogen_watsonx_client.client import WatsonXChatCompletionClient
+from autogen_watsonx_client.conversion import ToolRegistry, _autogen_messages_to_watsonx_messages
+from mock_watsonx import MOCK_TOKEN, MockConfig, MockWatsonxProcess
+
+AGENTS = ["planner", "coder", "reviewer"]
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    errors: int
+    elapsed: float
+    latency_p50: Optional[float]
+    latency_p99: Optional[float]
+    ttft_p50: Optional[float]
+    ttft_p99: Optional[float]
+    cpu_per_request: float
+    bytes_per_request: Optional[float] = None
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+
+def _percentile(values: list[float], percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(percentile / 100 * len(values)) - 1))]
+
+
+async def _run(
+    name: str,
+    n_units: int,
+    concurrency: int,
+    unit: Callable[[int], Awaitable[tuple[int, list[float], list[float]]]],
+) -> ScenarioResult:
+    """
+    runs `unit(i)` for i < n_units with `concurrency` units in flight,
+    a unit returns its number of requests and the latencies and times to first token it measured
+    """
+    latencies: list[float] = []
+    ttfts: list[float] = []
+    requests = errors = 0
+    next_unit = iter(range(n_units))
+
+    async def worker():
+        nonlocal requests, errors
+        for i in next_unit:
+            try:
+                n_requests, unit_latencies, unit_ttfts = await unit(i)
+            except Exception:
+                errors += 1
+                continue
+            requests += n_requests
+            latencies.extend(unit_latencies)
+            ttfts.extend(unit_ttfts)
+
+    cpu_start, start = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    return ScenarioResult(
+        name=name,
+        requests=requests,
+        errors=errors,
+        elapsed=elapsed,
+        latency_p50=_percentile(latencies, 50),
+        latency_p99=_percentile(latencies, 99),
+        ttft_p50=_percentile(ttfts, 50),
+        ttft_p99=_percentile(ttfts, 99),
+        cpu_per_request=cpu / max(requests, 1),
+    )
+
+
+def _tools(n_tools: int) -> list[FunctionTool]:
+    def make(i: int):
+        def lookup(query: str, limit: int = 10) -> str:
+            return f"result {i} for {query}"
+
+        lookup.__name__ = f"lookup_{i}"
+        return FunctionTool(lookup, description=f"looks up things in source {i}")
+
+    return [make(i) for i in range(n_tools)]
+
+
+def _handoff_tools() -> dict[str, list[FunctionTool]]:
+    def make(target: str) -> FunctionTool:
+        def transfer() -> str:
+            return f"transferred to {target}"
+
+        transfer.__name__ = f"transfer_to_{target}"
+        return FunctionTool(transfer, description=f"hand the task over to {target}")
+
+    return {agent: [make(other) for other in AGENTS if other != agent] for agent in AGENTS}
+
+
+def _history(n_messages: int, tools: list[FunctionTool]) -> list:
+    # a conversation with text turns and tool calls with their results
+    messages = [SystemMessage(content="You are a helpful assistant. " * 20), UserMessage(content="task", source="user")]
+    i = 0
+    while len(messages) < n_messages:
+        if i % 3 == 2 and tools:
+            call = FunctionCall(id=f"call-{i}", name=tools[i % len(tools)].name, arguments='{"query": "x"}')
+            messages.append(AssistantMessage(content=[call], source="assistant"))
+            messages.append(FunctionExecutionResultMessage(
+                content=[FunctionExecutionResult(call_id=call.id, content="tool output " * 30, name=call.name, is_error=False)]
+            ))
+        else:
+            messages.append(AssistantMessage(content=f"step {i} " * 40, source=AGENTS[i % len(AGENTS)]))
+        i += 1
+    return messages
+
+
+async def _create(client: WatsonXChatCompletionClient, n: int, concurrency: int) -> ScenarioResult:
+    async def unit(i):
+        start = time.perf_counter()
+        await client.create([SystemMessage(content="You are a helpful assistant."), UserMessage(content=f"question {i}", source="user")])
+        return 1, [time.perf_counter() - start], []
+
+    return await _run("create", n, concurrency, unit)
+
+
+async def _stream(client: WatsonXChatCompletionClient, n: int, concurrency: int) -> ScenarioResult:
+    async def unit(i):
+        start = time.perf_counter()
+        result = None
+        async for result in client.create_stream(
+            [SystemMessage(content="You are a helpful assistant."), UserMessage(content=f"question {i}", source="user")]
+        ):
+            pass
+        ttft = result.stream_stats.time_to_first_token
+        return 1, [time.perf_counter() - start], [] if ttft is None else [ttft]
+
+    return await _run("stream", n, concurrency, unit)
+
+
+def _conversion(client: WatsonXChatCompletionClient, n_messages: int, n_tools: int) -> list[ScenarioResult]:
+    tools = _tools(n_tools)
+    history = _history(n_messages, tools)
+    results = []
+    for label, convert in (
+        ("conversion uncached", lambda messages: (
+            _autogen_messages_to_watsonx_messages(messages), ToolRegistry().convert(tools)
+        )),
+        ("conversion cached", lambda messages: (
+            client._convert_messages(messages), client._tool_registry.convert(tools)
+        )),
+    ):
+        # a growing conversation converted on every turn, as an agent does
+        cpu_start, start = time.process_time(), time.perf_counter()
+        for end in range(2, len(history) + 1):
+            convert(history[:end])
+        elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+        turns = len(history) - 1
+        results.append(ScenarioResult(label, turns, 0, elapsed, None, None, None, None, cpu / turns))
+    return results
+
+
+def _count_tokens(client: WatsonXChatCompletionClient, n_messages: int, n_tools: int) -> ScenarioResult:
+    tools = _tools(n_tools)
+    history = _history(n_messages, tools)
+    latencies = []
+    # a growing conversation counted on every turn, only the new messages are sent to the server
+    cpu_start, start = time.process_time(), time.perf_counter()
+    for end in range(2, len(history) + 1):
+        call_start = time.perf_counter()
+        client.count_tokens(history[:end], tools=tools)
+        latencies.append(time.perf_counter() - call_start)
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    turns = len(history) - 1
+    return ScenarioResult(
+        "count_tokens", turns, 0, elapsed, _percentile(latencies, 50), _percentile(latencies, 99), None, None, cpu / turns
+    )
+
+
+async def _payload(
+    server: MockWatsonxProcess, args: argparse.Namespace, fast_json: bool, compress_requests: bool
+) -> ScenarioResult:
+    # a client of its own, the json and compression options apply to its http clients
+    client = WatsonXChatCompletionClient(
+        model_id="mock-model",
+        url=server.url,
+        verify=server.certificate,
+        token=MOCK_TOKEN,
+        project_id="benchmark",
+        share_connections=False,
+        fast_json=fast_json,
+        compress_requests=compress_requests,
+    )
+    tools = _tools(args.tools)
+    history = _history(args.history, tools)
+    await client.create(history, tools=tools)
+
+    async def unit(i):
+        start = time.perf_counter()
+        await client.create(history + [UserMessage(content=f"question {i}", source="user")], tools=tools)
+        return 1, [time.perf_counter() - start], []
+
+    label = f"payload {'orjson' if fast_json else 'json'}{' gzip' if compress_requests else ''}"
+    stats = server.stats()
+    result = await _run(label, args.requests, args.concurrency, unit)
+    result.bytes_per_request = (server.stats()["bytes_received"] - stats["bytes_received"]) / max(result.requests, 1)
+    await client.close()
+    return result
+
+
+async def _round_robin(client: WatsonXChatCompletionClient, n_conversations: int, turns: int, concurrency: int) -> ScenarioResult:
+    async def unit(i):
+        history = [UserMessage(content=f"task {i}", source="user")]
+        latencies = []
+        for turn in range(turns):
+            agent = AGENTS[turn % len(AGENTS)]
+            start = time.perf_counter()
+            result = await client.create([SystemMessage(content=f"You are the {agent}.")] + history)
+            latencies.append(time.perf_counter() - start)
+            history.append(AssistantMessage(content=result.content, source=agent))
+        return turns, latencies, []
+
+    return await _run("round_robin", n_conversations, concurrency, unit)
+
+
+async def _selector(client: WatsonXChatCompletionClient, n_conversations: int, turns: int, concurrency: int) -> ScenarioResult:
+    async def unit(i):
+        history = [UserMessage(content=f"task {i}", source="user")]
+        latencies = []
+        for turn in range(turns):
+            start = time.perf_counter()
+            # the selector sees the roles and the history and names the next speaker
+            await client.create(
+                [SystemMessage(content=f"Select the next speaker among {', '.join(AGENTS)}.")] + history
+            )
+            agent = AGENTS[turn % len(AGENTS)]
+            result = await client.create([SystemMessage(content=f"You are the {agent}.")] + history)
+            latencies.append(time.perf_counter() - start)
+            history.append(AssistantMessage(content=result.content, source=agent))
+        return 2 * turns, latencies, []
+
+    return await _run("selector", n_conversations, concurrency, unit)
+
+
+async def _swarm(client: WatsonXChatCompletionClient, n_conversations: int, turns: int, concurrency: int) -> ScenarioResult:
+    handoffs = _handoff_tools()
+
+    async def unit(i):
+        history = [UserMessage(content=f"task {i}", source="user")]
+        latencies = []
+        agent = AGENTS[0]
+        n_requests = 0
+        for _ in range(turns):
+            start = time.perf_counter()
+            result = await client.create([SystemMessage(content=f"You are the {agent}.")] + history, tools=handoffs[agent])
+            n_requests += 1
+            if isinstance(result.content, list):
+                # hand off, the next agent answers the tool result
+                call = result.content[0]
+                history.append(AssistantMessage(content=result.content, source=agent))
+                history.append(FunctionExecutionResultMessage(
+                    content=[FunctionExecutionResult(call_id=call.id, content="transferred", name=call.name, is_error=False)]
+                ))
+                agent = call.name.removeprefix("transfer_to_")
+                result = await client.create([SystemMessage(content=f"You are the {agent}.")] + history, tools=handoffs[agent])
+                n_requests += 1
+            latencies.append(time.perf_counter() - start)
+            history.append(AssistantMessage(content=str(result.content), source=agent))
+        return n_requests, latencies, []
+
+    return await _run("swarm", n_conversations, concurrency, unit)
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:8.1f}"
+
+
+def _print(results: list[ScenarioResult]) -> None:
+    print(
+        f"{'scenario':<20} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'ttft p50':>8} {'ttft p99':>8} {'cpu/req ms':>10} {'bytes/req':>10}"
+    )
+    for r in results:
+        bytes_per_request = "-" if r.bytes_per_request is None else f"{r.bytes_per_request:.0f}"
+        print(
+            f"{r.name:<20} {r.requests:>8} {r.errors:>6} {r.throughput:>8.1f} {_ms(r.latency_p50):>8} {_ms(r.latency_p99):>8} "
+            f"{_ms(r.ttft_p50):>8} {_ms(r.ttft_p99):>8} {r.cpu_per_request * 1000:>10.3f} {bytes_per_request:>10}"
+        )
+
+
+def _compare(results: list[ScenarioResult], baseline_path: str, max_regression: float) -> bool:
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)}
+    ok = True
+    print(f"\ncompared with {baseline_path}")
+    for r in results:
+        base = baseline.get(r.name)
+        if base is None:
+            continue
+        for metric in ("cpu_per_request", "latency_p50", "bytes_per_request"):
+            new, old = getattr(r, metric), base.get(metric)
+            if not new or not old:
+                continue
+            change = new / old - 1
+            regressed = change > max_regression
+            ok = ok and not regressed
+            print(f"  {r.name:<20} {metric:<16} {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default="create,stream,conversion,count_tokens,round_robin,selector,swarm,payload")
+    parser.add_argument("--requests", type=int, default=500, help="requests of the create and stream scenarios")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--conversations", type=int, default=32, help="conversations of the multi-agent scenarios")
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--history", type=int, default=60, help="messages of the conversion, count_tokens and payload scenarios")
+    parser.add_argument("--tools", type=int, default=20, help="tools of the conversion, count_tokens and payload scenarios")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    parser.add_argument("--completion-tokens", type=int, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-retries", type=int, default=0)
+    parser.add_argument("--output", help="save the results as json")
+    parser.add_argument("--baseline", help="json results to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="tolerated relative increase of cpu and p50")
+    args = parser.parse_args()
+    scenarios = args.scenarios.split(",")
+
+    mock_config = MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+    )
+    results: list[ScenarioResult] = []
+    with MockWatsonxProcess(mock_config) as server:
+        client = WatsonXChatCompletionClient(
+            model_id="mock-model",
+            url=server.url,
+            verify=server.certificate,
+            token=MOCK_TOKEN,
+            project_id="benchmark",
+            max_retries=args.max_retries,
+            retry_base_delay=0.01,
+        )
+        # one request to warm up connections before measuring
+        await client.create([UserMessage(content="warmup", source="user")])
+        if "create" in scenarios:
+            results.append(await _create(client, args.requests, args.concurrency))
+        if "stream" in scenarios:
+            results.append(await _stream(client, args.requests, args.concurrency))
+        if "conversion" in scenarios:
+            results.extend(_conversion(client, args.history, args.tools))
+        if "count_tokens" in scenarios:
+            results.append(_count_tokens(client, args.history, args.tools))
+        if "round_robin" in scenarios:
+            results.append(await _round_robin(client, args.conversations, args.turns, args.concurrency))
+        if "selector" in scenarios:
+            results.append(await _selector(client, args.conversations, args.turns, args.concurrency))
+        if "swarm" in scenarios:
+            results.append(await _swarm(client, args.conversations, args.turns, args.concurrency))
+        await client.close()
+        if "payload" in scenarios:
+            for fast_json in (False, True):
+                for compress_requests in (False, True):
+                    results.append(await _payload(server, args, fast_json, compress_requests))
+
+    _print(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+    if args.baseline and not _compare(results, args.baseline, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
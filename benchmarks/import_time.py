@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Intro
+#
+# Measures the import time of the package with `python -X importtime` in fresh interpreters,
+# and checks that `ibm_watsonx_ai` is not imported until a client connects.
+#
+# - usage: `python benchmarks/import_time.py --runs 5 --max-ms 100`, exits with 1 when the median is over `--max-ms`
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = {
+    "package": "import autogen_watsonx_client",
+    "configuration": "from autogen_watsonx_client import WatsonxClientConfiguration",
+    "client class": "from autogen_watsonx_client import WatsonXChatCompletionClient",
+}
+
+SDK_CHECK = "import sys; {statement}; print('ibm_watsonx_ai' in sys.modules)"
+
+
+def _import_time_us(statement: str) -> int:
+    """
+    total self time of every module imported by `statement`, i.e. what the statement adds on top of the interpreter startup
+    """
+    baseline = _self_times("pass")
+    return sum(us for module, us in _self_times(statement).items() if module not in baseline)
+
+
+def _self_times(statement: str) -> dict[str, int]:
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True, text=True, check=True,
+    ).stderr
+    # lines look like `import time: self [us] | cumulative | imported package`
+    times = {}
+    for line in output.splitlines():
+        if line.startswith("import time:") and not line.endswith("imported package"):
+            self_us, _, module = line[len("import time:"):].split("|")
+            times[module.strip()] = int(self_us)
+    return times
+
+
+def _sdk_imported(statement: str) -> bool:
+    output = subprocess.run(
+        [sys.executable, "-c", SDK_CHECK.format(statement=statement)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return output.strip() == "True"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if importing the package takes longer")
+    args = parser.parse_args()
+
+    package_median_ms = 0.0
+    for label, statement in STATEMENTS.items():
+        samples = [_import_time_us(statement) / 1000 for _ in range(args.runs)]
+        median_ms = statistics.median(samples)
+        if label == "package":
+            package_median_ms = median_ms
+        print(
+            f"{label:<16} median {median_ms:8.1f} ms   max {max(samples):8.1f} ms   "
+            f"ibm_watsonx_ai imported: {_sdk_imported(statement)}"
+        )
+
+    if args.max_ms is not None and package_median_ms > args.max_ms:
+        print(f"package import takes {package_median_ms:.1f} ms, over the budget of {args.max_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Intro
+#
+# Local stand-in for the watsonx.ai endpoints used by `WatsonXChatCompletionClient`, for benchmarks without an account:
+# - the version endpoint the sdk probes for non IBM Cloud urls, so the sdk treats the server as a CPD 5.1 cluster
+# - `/ml/v1/text/chat` and `/ml/v1/text/chat_stream` answering with generated text, or with a tool call when tools are sent
+# - `/ml/v1/text/tokenization` and the model specs of `MODEL_IDS`
+# - `/mock/stats` with the number of requests and the bytes of their request lines and bodies received so far,
+#   gzip compressed bodies are counted as sent and decompressed before they are handled, and the open streams
+#
+# Latency, token rate, tool calls and errors are configurable, see `MockConfig`.
+# The sdk only talks https, the server uses a self-signed certificate made with the `openssl` command line tool.
+# Clients connect with `url=server.url`, `verify=server.certificate`, `token=MOCK_TOKEN` and any `project_id`.
+#
+# - usage: `python benchmarks/mock_watsonx.py --port 8443 --latency 0.05 --tokens-per-second 200`
+
+import argparse
+import asyncio
+import base64
+import gzip
+import json
+import multiprocessing
+import os
+import random
+import ssl
+import subprocess
+import tempfile
+import time
+import urllib.request
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+# models the mock serves, they all answer alike, the second one stands in for a cheaper model of a cascade
+MODEL_IDS = ("mock-model", "mock-small")
+
+# unsigned jwt with an expiry far in the future, the sdk only decodes it
+MOCK_TOKEN = ".".join(
+    base64.urlsafe_b64encode(json.dumps(part).encode()).decode().rstrip("=")
+    for part in ({"alg": "none", "typ": "JWT"}, {"sub": "benchmark", "exp": 4102444800, "iat": 1700000000})
+) + ".signature"
+
+WORDS = "the quick brown fox jumps over the lazy dog while the model keeps generating tokens".split(" ")
+
+
+@dataclass
+class MockConfig:
+    # seconds before the response, or before the first chunk of a stream
+    latency: float = 0.05
+    # generation speed of streams, 0 streams all tokens at once
+    tokens_per_second: float = 0.0
+    # generated tokens (words) per answer
+    completion_tokens: int = 50
+    # share of requests with tools that are answered with a tool call
+    tool_call_rate: float = 1.0
+    # share of requests failing with `error_status`
+    error_rate: float = 0.0
+    error_status: int = 503
+    # Retry-After header of the injected errors, in seconds
+    retry_after: Optional[float] = None
+    # report usage in the last chunk of a stream
+    stream_usage: bool = True
+    # drop the connection of a stream after this many events, an error in the middle of the stream
+    stream_drop_after: Optional[int] = None
+    seed: int = 0
+
+
+def _prompt_tokens(payload: dict) -> int:
+    return len(json.dumps(payload.get("messages", []))) // 4
+
+
+def _chat_response(payload: dict, message: dict, finish_reason: str, completion_tokens: int) -> dict:
+    return {
+        "id": "chat-mock",
+        "model_id": payload.get("model_id"),
+        "created": int(time.time()),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+        "usage": {
+            "prompt_tokens": _prompt_tokens(payload),
+            "completion_tokens": completion_tokens,
+            "total_tokens": _prompt_tokens(payload) + completion_tokens,
+        },
+    }
+
+
+def self_signed_certificate(directory: str) -> tuple[str, str]:
+    certificate, key = os.path.join(directory, "mock.crt"), os.path.join(directory, "mock.key")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-keyout", key, "-out", certificate,
+            "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1,DNS:localhost",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return certificate, key
+
+
+class MockWatsonxServer:
+    def __init__(self, config: MockConfig, host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self._host = host
+        self._port = port
+        self._directory = tempfile.TemporaryDirectory()
+        self.certificate, key = self_signed_certificate(self._directory.name)
+        self._ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        self._ssl_context.load_cert_chain(self.certificate, key)
+        self._random = random.Random(config.seed)
+        self._server: Optional[asyncio.base_events.Server] = None
+        self.requests = 0
+        self.bytes_received = 0
+        # streams still being sent, a stream closed by the client ends at its next event
+        self.open_streams = 0
+
+    @property
+    def url(self) -> str:
+        return f"https://{self._host}:{self._port}"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._handle_connection, self._host, self._port, ssl=self._ssl_context
+        )
+        self._port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        self._directory.cleanup()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        print(f"mock watsonx listening on {self.url}, certificate {self.certificate}", flush=True)
+        await self._server.serve_forever()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                path = target.split("?", 1)[0]
+                if path == "/mock/stats":
+                    await self._send_json(writer, {
+                        "requests": self.requests,
+                        "bytes_received": self.bytes_received,
+                        "open_streams": self.open_streams,
+                    })
+                    continue
+                self.requests += 1
+                self.bytes_received += len(request_line) + len(body)
+                if headers.get("content-encoding") == "gzip":
+                    body = gzip.decompress(body)
+                await self._route(method, path, body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        if path == "/ml/wml_services/v2/version":
+            return await self._send_json(writer, {"version": "5.1.0"})
+        if path == "/ml/v1/foundation_model_specs":
+            return await self._send_json(writer, {"resources": [self._model_spec(model_id) for model_id in MODEL_IDS]})
+        if path == "/ml/v1/text/tokenization" and method == "POST":
+            payload = json.loads(body)
+            return await self._send_json(writer, {"result": {"token_count": len(payload.get("input", "")) // 4}})
+        if path in ("/ml/v1/text/chat", "/ml/v1/text/chat_stream") and method == "POST":
+            if self._random.random() < self.config.error_rate:
+                return await self._send_error(writer)
+            payload = json.loads(body)
+            await asyncio.sleep(self.config.latency)
+            if path == "/ml/v1/text/chat":
+                return await self._send_json(writer, self._chat(payload))
+            return await self._send_chat_stream(writer, payload)
+        if path.startswith("/v2/projects/"):
+            # scope validation of the project
+            return await self._send_json(writer, {"entity": {"storage": {"type": "assetfiles"}}})
+        if path.startswith("/v2/spaces/"):
+            return await self._send_json(writer, {"entity": {"storage": {"type": "bmcos_object_storage"}}})
+        # unknown endpoints fail loudly, so a client calling a path the mock does not serve is noticed
+        error = {"errors": [{"code": "not_found", "message": f"{method} {path} is not served by the mock"}]}
+        return await self._send_json(writer, error, status=404)
+
+    def _model_spec(self, model_id: str) -> dict:
+        return {
+            "model_id": model_id,
+            "model_limits": {"max_sequence_length": 131072, "max_output_tokens": 8192},
+        }
+
+    def _wants_tool_call(self, payload: dict) -> bool:
+        if not payload.get("tools"):
+            return False
+        # answer the tool result of a previous call with text
+        if payload.get("messages") and payload["messages"][-1].get("role") == "tool":
+            return False
+        return self._random.random() < self.config.tool_call_rate
+
+    def _tool_call(self, payload: dict) -> dict:
+        function = self._random.choice(payload["tools"])["function"]
+        arguments = {name: "value" for name in function.get("parameters", {}).get("properties", {})}
+        return {
+            "id": f"call-{self._random.randrange(10 ** 9)}",
+            "type": "function",
+            "function": {"name": function["name"], "arguments": json.dumps(arguments)},
+        }
+
+    def _text(self) -> list[str]:
+        n = self.config.completion_tokens
+        return [(" " if i else "") + WORDS[i % len(WORDS)] for i in range(n)]
+
+    def _chat(self, payload: dict) -> dict:
+        if self._wants_tool_call(payload):
+            message = {"role": "assistant", "tool_calls": [self._tool_call(payload)]}
+            return _chat_response(payload, message, "tool_calls", 20)
+        text = self._text()
+        return _chat_response(payload, {"role": "assistant", "content": "".join(text)}, "stop", len(text))
+
+    async def _send_chat_stream(self, writer: asyncio.StreamWriter, payload: dict) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n"
+        )
+        events = [{"choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]}]
+        if self._wants_tool_call(payload):
+            tool_call = self._tool_call(payload)
+            arguments = tool_call["function"]["arguments"]
+            events.append({"choices": [{"index": 0, "delta": {"tool_calls": [{
+                "index": 0, "id": tool_call["id"], "type": "function",
+                "function": {"name": tool_call["function"]["name"], "arguments": ""},
+            }]}, "finish_reason": None}]})
+            for i in range(0, len(arguments), 8):
+                events.append({"choices": [{"index": 0, "delta": {"tool_calls": [{
+                    "index": 0, "function": {"arguments": arguments[i:i + 8]},
+                }]}, "finish_reason": None}]})
+            finish_reason, completion_tokens = "tool_calls", len(events) - 1
+        else:
+            for word in self._text():
+                events.append({"choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]})
+            finish_reason, completion_tokens = "stop", len(events) - 1
+        last = {"choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]}
+        if self.config.stream_usage:
+            last["usage"] = {
+                "prompt_tokens": _prompt_tokens(payload),
+                "completion_tokens": completion_tokens,
+                "total_tokens": _prompt_tokens(payload) + completion_tokens,
+            }
+        events.append(last)
+
+        interval = 1 / self.config.tokens_per_second if self.config.tokens_per_second else 0.0
+        start = time.perf_counter()
+        self.open_streams += 1
+        try:
+            for i, event in enumerate(events):
+                if i == self.config.stream_drop_after:
+                    writer.transport.abort()
+                    raise ConnectionResetError("stream dropped")
+                if interval:
+                    # pace against the start instead of sleeping per token, asyncio.sleep is too coarse for that
+                    delay = start + i * interval - time.perf_counter()
+                    if delay > 0.001:
+                        await asyncio.sleep(delay)
+                data = f"id: {i + 1}\nevent: message\ndata: {json.dumps(event)}\n\n".encode()
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            self.open_streams -= 1
+
+    async def _send_error(self, writer: asyncio.StreamWriter) -> None:
+        status = self.config.error_status
+        headers = {}
+        if self.config.retry_after is not None:
+            headers["Retry-After"] = str(self.config.retry_after)
+        error = {"errors": [{"code": "mock_error", "message": "injected error"}], "status_code": status}
+        await self._send_json(writer, error, status=status, headers=headers)
+
+    async def _send_json(
+        self, writer: asyncio.StreamWriter, payload: dict, status: int = 200, headers: Optional[dict] = None
+    ) -> None:
+        body = json.dumps(payload).encode()
+        head = f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\nContent-Type: application/json\r\n"
+        for name, value in (headers or {}).items():
+            head += f"{name}: {value}\r\n"
+        head += f"Content-Length: {len(body)}\r\n\r\n"
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+
+def _serve(config: dict, port: int, ready) -> None:
+    server = MockWatsonxServer(MockConfig(**config), port=port)
+
+    async def main():
+        await server.start()
+        ready.send((server.url, server.certificate))
+        await server._server.serve_forever()
+
+    asyncio.run(main())
+
+
+class MockWatsonxProcess:
+    """
+    runs the server in a separate process, so that its cpu time does not count against the client
+    """
+
+    def __init__(self, config: MockConfig, port: int = 0):
+        self._config = config
+        self._port = port
+        self._process: Optional[multiprocessing.Process] = None
+        self.url: Optional[str] = None
+        self.certificate: Optional[str] = None
+
+    def __enter__(self) -> "MockWatsonxProcess":
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self._process = multiprocessing.Process(
+            target=_serve, args=(asdict(self._config), self._port, sender), daemon=True
+        )
+        self._process.start()
+        self.url, self.certificate = receiver.recv()
+        return self
+
+    def stats(self) -> dict:
+        """
+        requests and bytes received by the server so far
+        """
+        context = ssl.create_default_context(cafile=self.certificate)
+        with urllib.request.urlopen(f"{self.url}/mock/stats", context=context) as response:
+            return json.loads(response.read())
+
+    def __exit__(self, *exc_info) -> None:
+        self._process.terminate()
+        self._process.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--completion-tokens", type=int, default=50)
+    parser.add_argument("--tool-call-rate", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=float, default=None)
+    args = parser.parse_args()
+    config = MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        tool_call_rate=args.tool_call_rate,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+    )
+    asyncio.run(MockWatsonxServer(config, port=args.port).serve_forever())
+
+
+if __name__ == "__main__":
+    main()
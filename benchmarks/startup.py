@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Intro
+#
+# Measures how long it takes to construct many `WatsonXChatCompletionClient`s, e.g. one per agent in a worker,
+# with eager construction, lazy construction, and lazy construction followed by `warmup()`.
+#
+# ### prerequisites
+#
+# - access to a watsonx.ai instance, setting up environment variables `WATSONX_API_KEY`, one of `WATSONX_SPACE_ID` or `WATSONX_PROJECT_ID`, optionally `WATSONX_URL`
+# - usage: `python benchmarks/startup.py --clients 20`
+
+import argparse
+import asyncio
+import os
+import time
+
+from autogen_watsonx_client.config import WatsonxClientConfiguration
+from autogen_watsonx_client.client import WatsonXChatCompletionClient
+
+
+def _config(**overrides) -> WatsonxClientConfiguration:
+    return WatsonxClientConfiguration(
+        model_id=os.environ.get("WATSONX_MODEL_ID", "meta-llama/llama-3-3-70b-instruct"),
+        api_key=os.environ.get("WATSONX_API_KEY"),
+        url=os.environ.get("WATSONX_URL", "https://us-south.ml.cloud.ibm.com"),
+        space_id=os.environ.get("WATSONX_SPACE_ID"),
+        project_id=os.environ.get("WATSONX_PROJECT_ID"),
+        **overrides,
+    )
+
+
+async def _measure(label: str, n_clients: int, warmup: bool, **overrides) -> None:
+    start = time.perf_counter()
+    clients = [WatsonXChatCompletionClient(**_config(**overrides)) for _ in range(n_clients)]
+    constructed = time.perf_counter() - start
+    if warmup:
+        await asyncio.gather(*[client.warmup() for client in clients])
+    ready = time.perf_counter() - start
+    print(f"{label:<28} construct {constructed * 1000:9.1f} ms   ready {ready * 1000:9.1f} ms")
+    for client in clients:
+        await client.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=20)
+    args = parser.parse_args()
+
+    await _measure("eager, not shared", args.clients, warmup=False, share_connections=False)
+    await _measure("eager, shared", args.clients, warmup=False)
+    await _measure("lazy", args.clients, warmup=False, lazy_init=True)
+    await _measure("lazy + warmup", args.clients, warmup=True, lazy_init=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
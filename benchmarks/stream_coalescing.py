@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Intro
+#
+# Compares the number of events and the consumer CPU time per generated token of a streamed response,
+# without and with the different `create_stream` coalescing options.
+# The consumer does what a UI bridge typically does per event: wrap the text into a json event and hand it on.
+#
+# - usage: `python benchmarks/stream_coalescing.py --tokens 4000 --token-interval 0.0005`
+
+import argparse
+import asyncio
+import json
+import time
+
+from autogen_watsonx_client.streaming import ChunkCoalescer
+
+CONFIGS = {
+    "no coalescing": {},
+    "32 chars": dict(min_chars=32),
+    "20 ms": dict(max_delay=0.02),
+    "50 ms": dict(max_delay=0.05),
+    "word boundary": dict(boundary="word"),
+    "64 chars on words": dict(min_chars=64, boundary="word"),
+    "line boundary": dict(boundary="line"),
+}
+
+
+async def _deltas(n_tokens: int, token_interval: float):
+    words = "the quick brown fox jumps over the lazy dog\n".split(" ")
+    for i in range(n_tokens):
+        if token_interval and i % 10 == 0:
+            # sleep in batches, asyncio.sleep is too coarse for sub-millisecond intervals
+            await asyncio.sleep(token_interval * 10)
+        yield (" " if i else "") + words[i % len(words)]
+
+
+def _consume(text: str, sink: list) -> None:
+    sink.append(json.dumps({"type": "ModelClientStreamingChunkEvent", "content": text, "source": "assistant"}))
+
+
+async def _run(label: str, n_tokens: int, token_interval: float, **coalesce_args) -> None:
+    coalescer = ChunkCoalescer(**coalesce_args)
+    sink: list = []
+    consumer_cpu = 0.0
+    wall_start = time.perf_counter()
+    async for delta in _deltas(n_tokens, token_interval):
+        start = time.process_time()
+        text = coalescer.push(delta) if coalescer.enabled else delta
+        if text is not None:
+            _consume(text, sink)
+        consumer_cpu += time.process_time() - start
+    pending = coalescer.flush()
+    if pending:
+        _consume(pending, sink)
+    wall = time.perf_counter() - wall_start
+    print(
+        f"{label:<20} events {len(sink):7d}   tokens/event {n_tokens / len(sink):7.1f}   "
+        f"cpu/token {consumer_cpu / n_tokens * 1e6:6.2f} us   wall {wall:6.2f} s"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=4000)
+    parser.add_argument("--token-interval", type=float, default=0.0005, help="seconds between generated tokens")
+    args = parser.parse_args()
+    for label, coalesce_args in CONFIGS.items():
+        await _run(label, args.tokens, args.token_interval, **coalesce_args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
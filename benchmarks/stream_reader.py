@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# ## Intro
+#
+# Microbenchmark of the stream reading loop of `create_stream`:
+# - per chunk overhead of the previous `asyncio.ensure_future(anext(stream))` loop, the `StreamReader` and a plain `async for`
+# - total time of a paced stream read by a consumer that stalls now and then,
+#   where the pipelined reader keeps reading during the stalls
+#
+# - usage: `python benchmarks/stream_reader.py --chunks 200000`
+
+import argparse
+import asyncio
+import time
+
+from autogen_watsonx_client.streaming import StreamReader
+
+CHUNK = {"choices": [{"delta": {"content": "token"}, "finish_reason": None}]}
+
+
+async def _stream(n_chunks: int, interval: float = 0.0):
+    for i in range(n_chunks):
+        if interval and i % 10 == 0:
+            await asyncio.sleep(interval * 10)
+        yield CHUNK
+
+
+async def _legacy_loop(stream, on_chunk) -> None:
+    while True:
+        try:
+            chunk = await asyncio.ensure_future(anext(stream))
+        except StopAsyncIteration:
+            break
+        await on_chunk(chunk)
+
+
+async def _reader_loop(stream, on_chunk) -> None:
+    reader = StreamReader(stream)
+    try:
+        async for chunk in reader:
+            await on_chunk(chunk)
+    finally:
+        await reader.aclose()
+
+
+async def _plain_loop(stream, on_chunk) -> None:
+    async for chunk in stream:
+        await on_chunk(chunk)
+
+
+LOOPS = {
+    "ensure_future(anext)": _legacy_loop,
+    "StreamReader": _reader_loop,
+    "plain async for": _plain_loop,
+}
+
+
+async def _overhead(n_chunks: int) -> None:
+    async def on_chunk(chunk):
+        pass
+
+    print(f"per chunk overhead over {n_chunks} chunks")
+    for label, loop in LOOPS.items():
+        start = time.perf_counter()
+        await loop(_stream(n_chunks), on_chunk)
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<22} {elapsed / n_chunks * 1e6:6.2f} us/chunk")
+
+
+async def _slow_consumer(n_chunks: int, interval: float, stall: float, stall_every: int) -> None:
+    count = 0
+
+    async def on_chunk(chunk):
+        nonlocal count
+        count += 1
+        if count % stall_every == 0:
+            await asyncio.sleep(stall)
+
+    print(
+        f"{n_chunks} chunks every {interval * 1000:.1f} ms, consumer stalls {stall * 1000:.0f} ms every {stall_every} chunks"
+    )
+    for label, loop in LOOPS.items():
+        if label == "plain async for":
+            continue
+        count = 0
+        start = time.perf_counter()
+        await loop(_stream(n_chunks, interval), on_chunk)
+        print(f"  {label:<22} total {time.perf_counter() - start:6.2f} s")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=200000)
+    args = parser.parse_args()
+    await _overhead(args.chunks)
+    await _slow_consumer(n_chunks=1000, interval=0.001, stall=0.05, stall_every=50)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from mock_watsonx import MOCK_TOKEN, MockConfig, MockWatsonxProcess  # noqa: E402
+
+from autogen_watsonx_client.client import WatsonXChatCompletionClient  # noqa: E402
+
+
+def _mock_server(config: MockConfig):
+    if shutil.which("openssl") is None:
+        pytest.skip("the mock server needs the openssl command line tool")
+    with MockWatsonxProcess(config) as server:
+        yield server
+
+
+@pytest.fixture(scope="session")
+def stream_server():
+    # streams slow enough to be interrupted in the middle
+    yield from _mock_server(MockConfig(latency=0.0, tokens_per_second=20, completion_tokens=40))
+
+
+@pytest.fixture(scope="session")
+def dropping_server():
+    yield from _mock_server(MockConfig(latency=0.0, tokens_per_second=50, stream_drop_after=3))
+
+
+@pytest.fixture(scope="session")
+def failing_server():
+    yield from _mock_server(MockConfig(latency=0.0, error_rate=1.0, error_status=503))
+
+
+@pytest.fixture
+def connect():
+    """
+    a client of its own connections to a mock server
+    """
+
+    def connect(server: MockWatsonxProcess, **kwargs) -> WatsonXChatCompletionClient:
+        return WatsonXChatCompletionClient(
+            model_id="mock-model",
+            url=server.url,
+            verify=server.certificate,
+            token=MOCK_TOKEN,
+            project_id="tests",
+            share_connections=False,
+            **kwargs,
+        )
+
+    return connect
+
@@ -0,0 +1,18 @@
+import asyncio
+import time
+
+from autogen_watsonx_client.client import WatsonXChatCompletionClient
+
+
+def connection_pool(client: WatsonXChatCompletionClient):
+    # the httpcore pool behind the async http client of the sdk
+    return client._lease.model._client.async_httpx_client._transport._pool
+
+
+async def wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
@@ -0,0 +1,110 @@
+import asyncio
+
+from autogen_core import CancellationToken
+from autogen_core.models import CreateResult, RequestUsage
+
+from autogen_watsonx_client.batch import BatchIterator, run_batch
+
+
+def _result(content: str) -> CreateResult:
+    usage = RequestUsage(prompt_tokens=1, completion_tokens=1)
+    return CreateResult(finish_reason="stop", content=content, usage=usage, cached=False)
+
+
+def test_batch_token_holds_no_reference_per_item():
+    async def main():
+        token = CancellationToken()
+
+        async def create(messages):
+            return _result(messages[0])
+
+        conversations = ([str(i)] for i in range(200))
+        result = await run_batch(BatchIterator(create, conversations, max_concurrency=4, cancellation_token=token))
+        assert [r.content for r in result.results] == [str(i) for i in range(200)]
+        # one callback for the batch, none for the calls it made
+        assert len(token._callbacks) == 1
+
+    asyncio.run(main())
+
+
+def test_cancelling_batch_token_cancels_calls_in_flight():
+    async def main():
+        token = CancellationToken()
+        started = asyncio.Event()
+        cancelled = []
+
+        async def create(messages):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(messages)
+                raise
+            return _result("late")
+
+        iterator = BatchIterator(create, ([str(i)] for i in range(10)), max_concurrency=3, cancellation_token=token)
+        batch = asyncio.create_task(run_batch(iterator))
+        await started.wait()
+        token.cancel()
+        try:
+            await asyncio.wait_for(batch, 5)
+        except asyncio.CancelledError:
+            pass
+        else:
+            raise AssertionError("a cancelled batch raises CancelledError")
+        assert len(cancelled) == 3
+        assert iterator.stats.items == 0
+
+    asyncio.run(main())
+
+
+def _slow_batch(n: int, max_concurrency: int) -> BatchIterator:
+    async def create(messages):
+        if messages[0] != "0":
+            await asyncio.sleep(10)
+        return _result(messages[0])
+
+    return BatchIterator(create, ([str(i)] for i in range(n)), max_concurrency=max_concurrency)
+
+
+def _batch_tasks(iterator: BatchIterator) -> list:
+    return [task for task in (*iterator._workers, iterator._supervisor) if task is not None]
+
+
+def test_breaking_out_of_the_loop_cancels_the_calls_in_flight():
+    async def main():
+        iterator = _slow_batch(20, max_concurrency=4)
+        async for item in iterator:
+            assert item.result.content == "0"
+            break
+        # the dropped generator is closed by the event loop
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert all(task.done() for task in _batch_tasks(iterator))
+
+    asyncio.run(main())
+
+
+def test_leaving_the_async_with_block_cancels_the_calls_in_flight():
+    async def main():
+        async with _slow_batch(20, max_concurrency=4) as iterator:
+            await anext(aiter(iterator))
+        assert all(task.done() for task in _batch_tasks(iterator))
+
+    asyncio.run(main())
+
+
+def test_call_cancelled_from_inside_is_an_item_error():
+    async def main():
+        async def create(messages):
+            if messages[0] == "1":
+                # e.g. a request future cancelled by another token
+                raise asyncio.CancelledError()
+            return _result(messages[0])
+
+        result = await run_batch(BatchIterator(create, ([str(i)] for i in range(3)), max_concurrency=2))
+        assert [item.index for item in result.items] == [0, 1, 2]
+        assert isinstance(result.items[1].error, asyncio.CancelledError)
+        assert (result.stats.succeeded, result.stats.failed) == (2, 1)
+
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+import pytest
+from autogen_core.models import CreateResult, RequestUsage
+
+from autogen_watsonx_client.cache import InMemoryResponseCache, ResponseCache
+
+
+def test_incomplete_backend_fails_when_created():
+    class NoClear(ResponseCache):
+        def _get(self, key):
+            return None
+
+        def _set(self, key, value):
+            pass
+
+    with pytest.raises(TypeError):
+        NoClear()
+
+
+def test_cached_result_comes_back_marked_cached():
+    cache = InMemoryResponseCache(max_size=2)
+    usage = RequestUsage(prompt_tokens=3, completion_tokens=2)
+    cache.set("key", CreateResult(finish_reason="stop", content="answer", usage=usage, cached=False))
+    result = cache.get("key")
+    assert result.content == "answer" and result.cached
+    cache.clear()
+    assert cache.get("key") is None
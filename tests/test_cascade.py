@@ -0,0 +1,94 @@
+import asyncio
+from typing import Optional
+
+import pytest
+from autogen_core.models import UserMessage
+
+from autogen_watsonx_client.cascade import ModelCascade
+
+MESSAGES = [UserMessage(content="question", source="user")]
+ALL_TRIGGERS = ["error", "invalid_tool_call", "length", "invalid_json", "low_confidence"]
+
+
+def _response(
+    content: Optional[str] = '{"answer": 42}',
+    finish_reason: str = "stop",
+    tool_calls: Optional[list] = None,
+    logprobs: Optional[list[float]] = None,
+) -> dict:
+    message = {"role": "assistant", "content": content}
+    if tool_calls is not None:
+        message["tool_calls"] = tool_calls
+    choice = {"index": 0, "message": message, "finish_reason": finish_reason}
+    if logprobs is not None:
+        choice["logprobs"] = {"content": [{"token": "t", "logprob": logprob} for logprob in logprobs]}
+    return {"choices": [choice]}
+
+
+def _tool_call(name: str = "lookup", arguments: str = '{"word": "x"}') -> dict:
+    return {"id": "call-0", "type": "function", "function": {"name": name, "arguments": arguments}}
+
+
+def _reason(response: dict, escalate_on=ALL_TRIGGERS, min_logprob: float = -1.0):
+    cascade = ModelCascade(["small"], "large", escalate_on=escalate_on, min_logprob=min_logprob)
+    return cascade.escalation_reason(response, {"lookup"})
+
+
+def test_accepted_response():
+    assert _reason(_response(logprobs=[-0.1, -0.5])) is None
+    assert _reason(_response(content=None, tool_calls=[_tool_call()], finish_reason="tool_calls")) is None
+
+
+def test_length():
+    assert _reason(_response(content='{"answer":', finish_reason="length")) == "length"
+
+
+@pytest.mark.parametrize(
+    "tool_call", [_tool_call(name="unknown"), _tool_call(arguments='{"word": '), _tool_call(arguments="[1]")]
+)
+def test_invalid_tool_call(tool_call):
+    assert _reason(_response(content=None, tool_calls=[_tool_call(), tool_call])) == "invalid_tool_call"
+
+
+def test_invalid_json():
+    assert _reason(_response(content="the answer is 42")) == "invalid_json"
+
+
+def test_low_confidence():
+    assert _reason(_response(logprobs=[-0.5, -2.0]), min_logprob=-1.0) == "low_confidence"
+    assert _reason(_response(logprobs=[-0.5, -2.0]), min_logprob=-2.0) is None
+
+
+def test_triggers_that_are_not_enabled_do_not_fire():
+    assert _reason(_response(content="the answer is 42", finish_reason="length", logprobs=[-5.0]), ["error"]) is None
+
+
+def test_unknown_trigger_is_rejected():
+    with pytest.raises(ValueError):
+        ModelCascade(["small"], "large", escalate_on=["slow"])
+
+
+@pytest.mark.parametrize("escalate_on", [["error"], ["length"]])
+def test_error(failing_server, connect, escalate_on):
+    async def main():
+        client = connect(
+            failing_server, cascade_model_ids=["mock-small"], cascade_escalate_on=escalate_on, max_retries=0
+        )
+        try:
+            with pytest.raises(Exception):
+                await client.create(MESSAGES)
+            # one call per model asked
+            return client.retry_stats().calls, client.cascade_stats()
+        finally:
+            await client.close()
+
+    calls, stats = asyncio.run(main())
+    small, large = stats.tiers
+    if escalate_on == ["error"]:
+        # the failed tier escalates to the model of the client
+        assert calls == 2
+        assert (small.calls, small.escalations) == (1, {"error": 1})
+    else:
+        assert calls == 1
+        assert small.calls == 0
+    assert large.calls == 0
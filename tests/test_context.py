@@ -0,0 +1,135 @@
+import json
+
+import pytest
+from autogen_core import FunctionCall
+from autogen_core.models import (
+    AssistantMessage,
+    FunctionExecutionResult,
+    FunctionExecutionResultMessage,
+    SystemMessage,
+    UserMessage,
+)
+
+from autogen_watsonx_client.context import TOOL_RESULT_PLACEHOLDER, ContextPolicy
+from autogen_watsonx_client.conversion import _autogen_messages_to_watsonx_messages
+
+
+def _count_each(wx_messages: list) -> list[int]:
+    return [len(json.dumps(wx_message)) for wx_message in wx_messages]
+
+
+def _tool_round(n: int, calls: int = 2) -> list:
+    call_ids = [f"call-{n}-{i}" for i in range(calls)]
+    return [
+        UserMessage(content=f"question {n}", source="user"),
+        AssistantMessage(
+            content=[FunctionCall(id=call_id, name="lookup", arguments='{"word": "x"}') for call_id in call_ids],
+            source="assistant",
+        ),
+        FunctionExecutionResultMessage(
+            content=[
+                FunctionExecutionResult(call_id=call_id, content="result " * 100, name="lookup") for call_id in call_ids
+            ]
+        ),
+        AssistantMessage(content=f"answer {n}", source="assistant"),
+    ]
+
+
+def _history(rounds: int) -> list:
+    messages = [SystemMessage(content="you answer questions")]
+    for n in range(rounds):
+        messages.extend(_tool_round(n))
+    messages.append(UserMessage(content="last question", source="user"))
+    return _autogen_messages_to_watsonx_messages(messages)
+
+
+def _assert_tool_results_follow_their_calls(wx_messages: list) -> None:
+    pending = set()
+    for wx_message in wx_messages:
+        if wx_message["role"] == "tool":
+            assert wx_message["tool_call_id"] in pending, "a tool result without its call"
+            pending.discard(wx_message["tool_call_id"])
+        else:
+            pending = {tool_call["id"] for tool_call in wx_message.get("tool_calls") or ()}
+
+
+def _apply(policy: ContextPolicy, wx_messages: list):
+    trimmed, stats = policy.apply(wx_messages, _count_each)
+    _assert_tool_results_follow_their_calls(trimmed)
+    assert stats.messages_before == len(wx_messages) and stats.messages_after == len(trimmed)
+    if trimmed is not wx_messages:
+        assert stats.tokens_before == sum(_count_each(wx_messages))
+        assert stats.tokens_after == sum(_count_each(trimmed))
+        assert stats.tokens_saved > 0
+    return trimmed, stats
+
+
+@pytest.mark.parametrize("max_messages", range(1, 20))
+def test_max_messages_never_leaves_a_tool_result_without_its_call(max_messages):
+    wx_messages = _history(4)
+    trimmed, _ = _apply(ContextPolicy(max_messages=max_messages), wx_messages)
+    assert trimmed[0] is wx_messages[0] and trimmed[-1] is wx_messages[-1]
+    assert len(trimmed) - 1 <= max_messages
+
+
+@pytest.mark.parametrize("max_tokens", [1, 200, 500, 1000, 2000, 5000])
+def test_max_tokens_never_leaves_a_tool_result_without_its_call(max_tokens):
+    wx_messages = _history(4)
+    trimmed, stats = _apply(ContextPolicy(max_tokens=max_tokens), wx_messages)
+    assert trimmed[0]["role"] == "system" and trimmed[-1] is wx_messages[-1]
+    if len(trimmed) > 2:
+        assert stats.tokens_after <= max_tokens
+
+
+def test_keep_latest_keeps_system_messages_and_the_latest_units():
+    wx_messages = _history(3)
+    # the last round of 5 messages and the last question fit, the calls of earlier rounds are dropped whole
+    trimmed, _ = _apply(ContextPolicy(max_messages=6), wx_messages)
+    assert trimmed == [wx_messages[0]] + wx_messages[-6:]
+    # the latest message is kept even when it does not fit
+    trimmed, _ = _apply(ContextPolicy(max_tokens=1), wx_messages)
+    assert trimmed == [wx_messages[0], wx_messages[-1]]
+
+
+def test_unchanged_history_is_returned_as_is():
+    wx_messages = _history(2)
+    trimmed, stats = _apply(ContextPolicy(max_messages=100, collapse_tool_calls_after=100), wx_messages)
+    assert trimmed is wx_messages
+    assert (stats.tokens_before, stats.tokens_after, stats.tokens_saved) == (0, 0, 0)
+
+
+def test_old_tool_calls_are_collapsed_with_their_results():
+    wx_messages = _history(3)
+    trimmed, _ = _apply(ContextPolicy(collapse_tool_calls_after=6), wx_messages)
+    # the calls and results of the first two rounds are one assistant message each, the last round is unchanged
+    assert [m["role"] for m in trimmed] == (
+        ["system"] + ["user", "assistant", "assistant"] * 2 + ["user", "assistant", "tool", "tool", "assistant", "user"]
+    )
+    collapsed = trimmed[2]["content"]
+    assert "tool_calls" not in trimmed[2]
+    assert collapsed.count('called lookup({"word": "x"}) -> result') == 2
+    # results are shortened
+    assert len(collapsed) < 2 * 250
+    assert trimmed[-6:] == wx_messages[-6:]
+
+
+def test_old_tool_results_are_replaced_by_a_placeholder():
+    wx_messages = _history(2)
+    trimmed, _ = _apply(ContextPolicy(tool_result_max_age=6), wx_messages)
+    assert len(trimmed) == len(wx_messages)
+    assert [m["content"] for m in trimmed[3:5]] == [TOOL_RESULT_PLACEHOLDER] * 2
+    assert trimmed[2] is wx_messages[2]
+    assert trimmed[-6:] == wx_messages[-6:]
+
+
+def test_rules_are_combined():
+    wx_messages = _history(5)
+    policy = ContextPolicy(max_tokens=1500, max_messages=10, collapse_tool_calls_after=6)
+    trimmed, stats = _apply(policy, wx_messages)
+    assert len(trimmed) - 1 <= 10 and stats.tokens_after <= 1500
+    assert not any(m.get("tool_calls") for m in trimmed[:-6])
+
+
+def test_policy_needs_positive_limits():
+    with pytest.raises(ValueError):
+        ContextPolicy(max_messages=0)
@@ -0,0 +1,37 @@
+from autogen_core.tools import FunctionTool
+
+from autogen_watsonx_client.conversion import ToolRegistry
+
+
+def _schema() -> dict:
+    return {
+        "name": "lookup",
+        "description": "looks a word up",
+        "parameters": {"type": "object", "properties": {"word": {"type": "string"}}, "required": ["word"]},
+    }
+
+
+def test_schema_dict_changed_in_place_is_converted_again():
+    registry = ToolRegistry()
+    schema = _schema()
+    first = registry.convert([schema])
+    assert registry.convert([schema]) is first
+
+    schema["parameters"]["properties"]["language"] = {"type": "string"}
+    converted = registry.convert([schema]).tools[0]
+    assert set(converted["function"]["parameters"]["properties"]) == {"word", "language"}
+
+
+def test_tool_arguments_are_part_of_the_fingerprint():
+    def lookup(word: str) -> str:
+        return word
+
+    def lookup_in(word: str, language: str) -> str:
+        return word
+
+    registry = ToolRegistry()
+    tool = FunctionTool(lookup, description="looks a word up", name="lookup")
+    other = FunctionTool(lookup_in, description="looks a word up", name="lookup")
+    assert registry._fingerprint(tool) == registry._fingerprint(FunctionTool(lookup, "looks a word up", name="lookup"))
+    assert registry._fingerprint(tool) != registry._fingerprint(other)
+    assert registry.convert_tool(tool) is registry.convert_tool(tool)
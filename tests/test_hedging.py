@@ -0,0 +1,40 @@
+import asyncio
+
+from autogen_watsonx_client import hedging
+from autogen_watsonx_client.hedging import Hedger
+
+
+def test_delay_is_recomputed_every_few_samples_once_the_window_is_full(monkeypatch):
+    computations = []
+
+    def percentile(values, percentile):
+        computations.append(len(values))
+        return values[-1]
+
+    monkeypatch.setattr(hedging, "_percentile", percentile)
+    hedger = Hedger(window=100)
+    for i in range(300):
+        hedger._record_latency(i / 1000)
+    # every 10th sample from the 20th on, not every sample once the window of 100 is full
+    assert len(computations) == 300 // hedging._RECOMPUTE_EVERY - 1
+    assert computations[-1] == 100
+
+
+def test_slow_request_is_hedged_and_hedge_wins():
+    async def main():
+        hedger = Hedger(percentile=50, max_ratio=1.0)
+        for _ in range(hedging._MIN_SAMPLES):
+            hedger._record_latency(0.01)
+
+        async def slow():
+            await asyncio.sleep(5)
+            return "slow"
+
+        async def fast():
+            return "fast"
+
+        assert await hedger.call(slow, fast) == "fast"
+        stats = hedger.stats()
+        assert (stats.hedges_fired, stats.hedges_won) == (1, 1)
+
+    asyncio.run(main())
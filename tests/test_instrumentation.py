@@ -0,0 +1,94 @@
+import asyncio
+import random
+
+import pytest
+from autogen_core.models import UserMessage
+
+trace = pytest.importorskip("opentelemetry.trace")
+
+MESSAGES = [UserMessage(content="question", source="user")]
+
+
+class _Span(trace.NonRecordingSpan):
+    def __init__(self, name: str, parent, attributes):
+        super().__init__(trace.SpanContext(random.getrandbits(128), random.getrandbits(64), is_remote=False))
+        self.name = name
+        self.parent = parent
+        self.attributes = dict(attributes or {})
+        self.ended = False
+
+    def set_attributes(self, attributes) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, end_time=None) -> None:
+        self.ended = True
+
+
+class _Tracer:
+    def __init__(self):
+        self.spans: list[_Span] = []
+
+    def start_span(self, name, context=None, start_time=None, attributes=None, **kwargs) -> _Span:
+        span = _Span(name, trace.get_current_span(context), attributes)
+        self.spans.append(span)
+        return span
+
+
+def _traced_client(server, connect, monkeypatch):
+    client = connect(server, tracing=True)
+    tracer = client._instrumentation._tracer = _Tracer()
+    current = []
+
+    # where the sdk and httpx start their spans
+    achat, open_stream = client._achat, client._open_stream_on
+
+    async def traced_achat(*args, **kwargs):
+        current.append(tracer.start_span("sdk.chat"))
+        return await achat(*args, **kwargs)
+
+    async def traced_open_stream(*args, **kwargs):
+        current.append(tracer.start_span("sdk.chat_stream"))
+        return await open_stream(*args, **kwargs)
+
+    monkeypatch.setattr(client, "_achat", traced_achat)
+    monkeypatch.setattr(client, "_open_stream_on", traced_open_stream)
+    return client, tracer, current
+
+
+def _span(tracer: _Tracer, name: str) -> _Span:
+    return next(span for span in tracer.spans if span.name == name)
+
+
+def test_spans_started_during_a_call_nest_under_its_span(stream_server, connect, monkeypatch):
+    client, tracer, current = _traced_client(stream_server, connect, monkeypatch)
+
+    async def main():
+        try:
+            await client.create(MESSAGES)
+            # not current once the call is over
+            assert trace.get_current_span() is trace.INVALID_SPAN
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+    span = _span(tracer, "watsonx.create")
+    assert span.ended and span.attributes["gen_ai.request.model"] == "mock-model"
+    assert span.attributes["gen_ai.usage.output_tokens"] > 0
+    assert [child.parent for child in current] == [span]
+    assert _span(tracer, "watsonx.request").parent is span
+
+
+def test_stream_span_is_current_only_while_the_stream_runs(stream_server, connect, monkeypatch):
+    client, tracer, current = _traced_client(stream_server, connect, monkeypatch)
+
+    async def main():
+        try:
+            async for _ in client.create_stream(MESSAGES):
+                assert trace.get_current_span() is trace.INVALID_SPAN
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+    span = _span(tracer, "watsonx.create_stream")
+    assert span.ended and span.attributes["gen_ai.response.finish_reasons"]
+    assert [child.parent for child in current] == [span]
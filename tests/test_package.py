@@ -0,0 +1,17 @@
+import importlib
+import subprocess
+import sys
+
+import autogen_watsonx_client
+
+
+def test_all_lists_the_lazy_attributes():
+    assert set(autogen_watsonx_client.__all__) == {"WatsonxClientConfiguration", *autogen_watsonx_client._LAZY_ATTRIBUTES}
+    for name in autogen_watsonx_client.__all__:
+        assert getattr(autogen_watsonx_client, name) is not None
+
+
+def test_import_does_not_load_the_client():
+    code = "import sys, autogen_watsonx_client; print('autogen_watsonx_client.client' in sys.modules)"
+    assert subprocess.check_output([sys.executable, "-c", code], text=True).strip() == "False"
+    importlib.import_module("autogen_watsonx_client.client")
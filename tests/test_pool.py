@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+from autogen_core.models import UserMessage
+from mock_watsonx import MOCK_TOKEN
+
+from autogen_watsonx_client import pool
+from autogen_watsonx_client.client import WatsonXChatCompletionClient
+from autogen_watsonx_client.pool import ModelInferenceRegistry
+
+MESSAGES = [UserMessage(content="question", source="user")]
+
+
+def _shared_client(server, registry: ModelInferenceRegistry) -> WatsonXChatCompletionClient:
+    client = WatsonXChatCompletionClient(
+        model_id="mock-model",
+        url=server.url,
+        verify=server.certificate,
+        token=MOCK_TOKEN,
+        project_id="tests",
+        lazy_init=True,
+    )
+    # shared connections, apart from the other tests
+    client._registry = registry
+    return client
+
+
+async def _create_and_close(client: WatsonXChatCompletionClient):
+    try:
+        return await client.create(MESSAGES)
+    finally:
+        await client.close()
+
+
+def test_shared_clients_on_consecutive_event_loops(stream_server):
+    registry = ModelInferenceRegistry()
+
+    async def main():
+        # one client stays open, so its pools would be handed to the next loop if loops were not told apart
+        first = _shared_client(stream_server, registry)
+        await first.create(MESSAGES)
+        return first
+
+    first = asyncio.run(main())
+    second = _shared_client(stream_server, registry)
+    assert asyncio.run(_create_and_close(second)).content
+    assert first._lease.model is not second._lease.model
+
+
+def test_clients_connected_outside_a_loop_are_bound_to_the_loop_using_them(stream_server):
+    registry = ModelInferenceRegistry()
+    first = _shared_client(stream_server, registry)
+    second = _shared_client(stream_server, registry)
+    # as clients created without lazy_init outside of an event loop
+    first._connect(None)
+    second._connect(None)
+    assert first._lease.model is second._lease.model
+
+    assert asyncio.run(_create_and_close(first)).content
+    assert asyncio.run(_create_and_close(second)).content
+    assert not registry._models and not registry._api_clients
+
+
+def test_single_holder_keeps_its_objects_when_bound(stream_server):
+    registry = ModelInferenceRegistry()
+    client = _shared_client(stream_server, registry)
+    client._connect(None)
+    model = client._lease.model
+
+    async def main():
+        try:
+            await client.create(MESSAGES)
+            # moved over to the loop instead of connecting again
+            assert client._lease.model is model
+            assert client._lease.loop is asyncio.get_running_loop()
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+
+class _SlowApiClient:
+    def __init__(self, credentials, **kwargs):
+        time.sleep(0.3)
+
+
+class _SlowInference:
+    def __init__(self, **kwargs):
+        time.sleep(0.3)
+
+
+def _acquire_in_threads(registry: ModelInferenceRegistry, urls: list[str]) -> list:
+    leases = []
+    threads = [
+        threading.Thread(target=lambda url=url: leases.append(registry.acquire(model_id="m", params={}, url=url)))
+        for url in urls
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return leases
+
+
+def test_connections_are_built_in_parallel(monkeypatch):
+    monkeypatch.setattr(pool, "_load_sdk", lambda: (_SlowApiClient, lambda **kwargs: None, _SlowInference))
+    start = time.perf_counter()
+    leases = _acquire_in_threads(ModelInferenceRegistry(), [f"https://host-{i}" for i in range(4)])
+    # one after the other they would take 4 * 0.6 seconds
+    assert time.perf_counter() - start < 1.2
+    assert len({id(lease.model) for lease in leases}) == 4
+
+
+def test_one_build_per_key(monkeypatch):
+    builds = []
+
+    class Inference(_SlowInference):
+        def __init__(self, **kwargs):
+            builds.append(kwargs["model_id"])
+            super().__init__(**kwargs)
+
+    monkeypatch.setattr(pool, "_load_sdk", lambda: (_SlowApiClient, lambda **kwargs: None, Inference))
+    leases = _acquire_in_threads(ModelInferenceRegistry(), ["https://host"] * 4)
+    assert builds == ["m"]
+    assert len({id(lease.model) for lease in leases}) == 1
@@ -0,0 +1,158 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from autogen_watsonx_client import rate_limit
+from autogen_watsonx_client.rate_limit import AdmissionController, TokenBucket
+
+
+class _Time:
+    """
+    a clock that only moves when the code under test sleeps, or with `block` not at all.
+    the tests use rates and delays that are exact in floating point, so the clock lands on the refill exactly
+    """
+
+    def __init__(self, monkeypatch):
+        self.now = 1024.0
+        self.sleeps: list[float] = []
+        self.block = False
+        # replaced in the rate_limit module only, the event loop keeps its own clock
+        monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=lambda: self.now))
+        monkeypatch.setattr(rate_limit, "asyncio", SimpleNamespace(**{**vars(asyncio), "sleep": self.sleep}))
+
+    async def sleep(self, delay: float) -> None:
+        self.sleeps.append(delay)
+        if self.block:
+            await asyncio.Event().wait()
+        self.now += delay
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    return _Time(monkeypatch)
+
+
+def test_bucket_waits_for_the_refill(fake_time):
+    async def main():
+        bucket = TokenBucket(rate=4, capacity=4)
+        await bucket.acquire(4)
+        assert fake_time.sleeps == []
+        await bucket.acquire(2)
+        assert fake_time.sleeps == [0.5]
+        # refilled up to the capacity only
+        fake_time.now += 60
+        await bucket.acquire(4)
+        await bucket.acquire(1)
+        assert fake_time.sleeps == [0.5, 0.25]
+
+    asyncio.run(main())
+
+
+def test_bucket_lets_an_amount_over_the_capacity_through_once_full(fake_time):
+    async def main():
+        bucket = TokenBucket(rate=1, capacity=5)
+        await bucket.acquire(8)
+        assert fake_time.sleeps == []
+        # in debt by 3
+        await bucket.acquire(1)
+        assert fake_time.sleeps == [4]
+        bucket.adjust(100)
+        await bucket.acquire(5)
+        assert len(fake_time.sleeps) == 1
+
+    asyncio.run(main())
+
+
+def test_bucket_serves_callers_in_arrival_order(fake_time):
+    async def main():
+        bucket = TokenBucket(rate=1, capacity=1)
+        order = []
+
+        async def acquire(name):
+            await bucket.acquire(1)
+            order.append((name, fake_time.now))
+
+        await asyncio.gather(*(acquire(name) for name in "abc"))
+        assert order == [("a", 1024.0), ("b", 1025.0), ("c", 1026.0)]
+
+    asyncio.run(main())
+
+
+def test_requests_over_the_rate_wait_and_are_counted(fake_time):
+    async def main():
+        controller = AdmissionController(requests_per_second=2)
+
+        async def call():
+            async with controller.admit():
+                pass
+
+        await asyncio.gather(call(), call(), call())
+        stats = controller.stats()
+        # the third request waits half a second, none is rejected
+        assert (stats.admitted, stats.in_flight, stats.queue_depth) == (3, 0, 0)
+        assert stats.max_wait_time == stats.total_wait_time == pytest.approx(0.5)
+        assert stats.mean_wait_time == pytest.approx(0.5 / 3)
+
+    asyncio.run(main())
+
+
+def test_requests_over_the_concurrency_limit_queue(fake_time):
+    async def main():
+        controller = AdmissionController(max_concurrent_requests=1)
+        release = asyncio.Event()
+
+        async def call():
+            async with controller.admit():
+                await release.wait()
+
+        calls = [asyncio.create_task(call()) for _ in range(3)]
+        await asyncio.sleep(0)
+        stats = controller.stats()
+        assert (stats.in_flight, stats.queue_depth, stats.admitted) == (1, 2, 1)
+        release.set()
+        await asyncio.gather(*calls)
+        assert controller.stats().admitted == 3
+
+    asyncio.run(main())
+
+
+def test_actual_tokens_are_reconciled(fake_time):
+    async def main():
+        controller = AdmissionController(tokens_per_minute=60)
+        async with controller.admit(estimated_tokens=50) as admission:
+            admission.actual_tokens = 20
+        assert controller._token_bucket._level == pytest.approx(40)
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_gives_back_only_what_it_took(fake_time):
+    async def main():
+        controller = AdmissionController(tokens_per_minute=60)
+        bucket = controller._token_bucket
+        async with controller.admit(estimated_tokens=50):
+            fake_time.block = True
+            waiting = asyncio.create_task(controller.admit(estimated_tokens=50).__aenter__())
+            await asyncio.sleep(0)
+            assert controller.stats().queue_depth == 1
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+        assert controller.stats().queue_depth == 0
+        assert controller.stats().admitted == 1
+        assert bucket._level == pytest.approx(10)
+
+    asyncio.run(main())
+
+
+def test_controller_without_limits_admits_at_once(fake_time):
+    async def main():
+        controller = AdmissionController()
+        assert not controller.enabled
+        async with controller.admit(estimated_tokens=10**9):
+            assert controller.stats().in_flight == 1
+        assert fake_time.sleeps == []
+
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from autogen_core.models import UserMessage
+
+from autogen_watsonx_client.retry import DEFAULT_MAX_RETRIES, Retrier, RetryPolicy
+
+MESSAGES = [UserMessage(content="tell me something", source="user")]
+
+
+async def _create(client):
+    return await client.create(MESSAGES)
+
+
+async def _create_stream(client):
+    async for _ in client.create_stream(MESSAGES):
+        pass
+
+
+@pytest.mark.parametrize("call", [_create, _create_stream])
+@pytest.mark.parametrize("max_retries", [0, 2])
+def test_only_the_client_retries(failing_server, connect, call, max_retries):
+    # the sdk's own retries are off, so the server sees exactly the attempts of the client's policy
+    async def main():
+        client = connect(failing_server, max_retries=max_retries, retry_base_delay=0.01)
+        requests_before = failing_server.stats()["requests"]
+        with pytest.raises(Exception):
+            await call(client)
+        assert failing_server.stats()["requests"] - requests_before == max_retries + 1
+        stats = client.retry_stats()
+        assert stats.retries == max_retries
+        assert stats.retries_by_status == ({503: max_retries} if max_retries else {})
+        await client.close()
+
+    asyncio.run(main())
+
+
+def test_default_policy_retries_as_the_sdk_did(failing_server, connect):
+    async def main():
+        client = connect(failing_server, retry_base_delay=0.001)
+        requests_before = failing_server.stats()["requests"]
+        with pytest.raises(Exception):
+            await client.create(MESSAGES)
+        assert failing_server.stats()["requests"] - requests_before == DEFAULT_MAX_RETRIES + 1
+        await client.close()
+
+    asyncio.run(main())
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.response = SimpleNamespace(status_code=status_code, headers={})
+
+
+def test_blocking_calls_are_retried():
+    retrier = Retrier(RetryPolicy(max_retries=3, base_delay=0.001))
+    failures = [_StatusError(503), _StatusError(429)]
+
+    def attempt():
+        if failures:
+            raise failures.pop(0)
+        return "done"
+
+    assert retrier.call_blocking(attempt) == "done"
+    stats = retrier.stats()
+    assert (stats.calls, stats.retries, stats.retries_by_status) == (1, 2, {503: 1, 429: 1})
+
+    def bad_request():
+        raise _StatusError(400)
+
+    with pytest.raises(_StatusError):
+        retrier.call_blocking(bad_request)
+    assert retrier.stats().retries == 2
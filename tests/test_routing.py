@@ -0,0 +1,169 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from autogen_core.models import UserMessage
+from mock_watsonx import MOCK_TOKEN
+
+from autogen_watsonx_client import routing
+from autogen_watsonx_client.client import WatsonXChatCompletionClient
+from autogen_watsonx_client.routing import CircuitBreaker, Router
+
+MESSAGES = [UserMessage(content="question", source="user")]
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(routing, "time", SimpleNamespace(monotonic=clock, perf_counter=clock))
+    return clock
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    # a success in between starts the count again
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.available()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.available()
+    assert breaker.opened_at == 1000.0
+
+
+def test_half_open_breaker_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 9.5
+    assert breaker.state == "open"
+    clock.now += 0.5
+    assert breaker.state == "half_open" and breaker.available()
+    breaker.on_request()
+    assert not breaker.available()
+
+    # a failed trial opens the circuit for another reset timeout
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.opened_at == 1010.0
+    clock.now += 10
+    breaker.on_request()
+    # a cancelled trial says nothing, the next request is the trial
+    breaker.record_cancelled()
+    assert breaker.state == "half_open" and breaker.available()
+    breaker.on_request()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.opened_at is None
+
+
+def test_failed_trial_reopens_regardless_of_the_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 10
+    breaker.on_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def _router(**kwargs) -> Router:
+    endpoints = [dict(url=f"https://{name}", space_id=None, project_id="p") for name in ("a", "b", "c")]
+    return Router(endpoints, acquire=None, is_failure=lambda e: isinstance(e, ConnectionError), **kwargs)
+
+
+def _serve(router: Router, error=None) -> str:
+    route = router.route()
+    route.record(error)
+    route.release()
+    return route.endpoint.connection_args["url"]
+
+
+def _circuits(router: Router) -> list[str]:
+    return [stats.circuit for stats in router.stats()]
+
+
+def test_router_fails_over_from_an_endpoint_with_an_open_circuit(clock):
+    router = _router(failure_threshold=2, reset_timeout=30)
+    assert [_serve(router) for _ in range(3)] == ["https://a", "https://b", "https://c"]
+    # an error caused by the request itself does not count against the endpoint
+    assert _serve(router, ValueError()) == "https://a"
+    assert _serve(router, ConnectionError()) == "https://b"
+    assert _serve(router, ConnectionError()) == "https://c"
+    assert _serve(router, ConnectionError()) == "https://a"
+    assert _serve(router, ConnectionError()) == "https://b"
+    assert _circuits(router) == ["closed", "open", "closed"]
+
+    assert {_serve(router) for _ in range(4)} == {"https://a", "https://c"}
+    clock.now += 30
+    # one trial request back on the endpoint, which closes its circuit again
+    served = [_serve(router) for _ in range(3)]
+    assert served.count("https://b") == 1
+    assert _circuits(router) == ["closed", "closed", "closed"]
+    stats = router.stats()[1]
+    assert (stats.failures, stats.in_flight) == (2, 0)
+
+
+def test_router_only_sends_the_trial_while_it_is_in_flight(clock):
+    router = _router(failure_threshold=1, reset_timeout=30)
+    for _ in range(3):
+        _serve(router, ConnectionError())
+    clock.now += 30
+    trial = router.route()
+    # the other endpoints are half open too, each gets its own trial and then none is available
+    others = [router.route(), router.route()]
+    assert {route.endpoint.connection_args["url"] for route in [trial, *others]} == {
+        "https://a", "https://b", "https://c"
+    }
+    trial.record()
+    trial.release()
+    assert [_serve(router) for _ in range(2)] == [trial.endpoint.connection_args["url"]] * 2
+
+
+def test_router_with_all_circuits_open_uses_the_one_opened_first(clock):
+    router = _router(failure_threshold=1, reset_timeout=30)
+    for _ in range(3):
+        _serve(router, ConnectionError())
+        clock.now += 1
+    assert _circuits(router) == ["open", "open", "open"]
+    assert _serve(router) == "https://a"
+
+
+def test_cancelled_requests_do_not_open_the_circuit(clock):
+    router = _router(failure_threshold=1, reset_timeout=30)
+    for _ in range(3):
+        _serve(router, asyncio.CancelledError())
+    assert _circuits(router) == ["closed", "closed", "closed"]
+
+
+def test_client_fails_over_to_a_healthy_endpoint(failing_server, stream_server):
+    async def main():
+        client = WatsonXChatCompletionClient(
+            model_id="mock-model",
+            url=failing_server.url,
+            verify=False,
+            token=MOCK_TOKEN,
+            project_id="tests",
+            share_connections=False,
+            endpoints=[{"url": failing_server.url}, {"url": stream_server.url}],
+            circuit_failure_threshold=1,
+            retry_base_delay=0.01,
+        )
+        try:
+            for _ in range(3):
+                assert (await client.create(MESSAGES)).content
+            failing, healthy = client.routing_stats()
+            # one failure opens the circuit of the failing endpoint, the retry goes to the healthy one
+            assert (failing.requests, failing.failures, failing.circuit) == (1, 1, "open")
+            assert (healthy.requests, healthy.failures, healthy.circuit) == (3, 0, "closed")
+        finally:
+            await client.close()
+
+    asyncio.run(main())
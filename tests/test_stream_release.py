@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from autogen_core import CancellationToken
+from autogen_core.models import UserMessage
+
+from tests.helpers import connection_pool, wait_until
+
+MESSAGES = [UserMessage(content="tell me something", source="user")]
+
+
+def _released(client, server) -> bool:
+    # no request holds a pooled connection and the server is not sending a stream anymore
+    return not connection_pool(client)._requests and server.stats()["open_streams"] == 0
+
+
+def test_stream_released_on_cancel(stream_server, connect):
+    async def main():
+        client = connect(stream_server)
+        token = CancellationToken()
+        stream = client.create_stream(MESSAGES, cancellation_token=token)
+        await anext(stream)
+        await anext(stream)
+        assert connection_pool(client)._requests
+        token.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            async for _ in stream:
+                pass
+        assert await wait_until(lambda: _released(client, stream_server))
+        await client.close()
+
+    asyncio.run(main())
+
+
+def test_stream_released_on_aclose(stream_server, connect):
+    async def main():
+        client = connect(stream_server)
+        stream = client.create_stream(MESSAGES)
+        await anext(stream)
+        await anext(stream)
+        assert connection_pool(client)._requests
+        await stream.aclose()
+        assert await wait_until(lambda: _released(client, stream_server))
+        await client.close()
+
+    asyncio.run(main())
+
+
+def test_stream_released_on_error(dropping_server, connect):
+    async def main():
+        client = connect(dropping_server)
+        chunks = []
+        with pytest.raises(Exception):
+            async for chunk in client.create_stream(MESSAGES):
+                chunks.append(chunk)
+        # the connection dropped after the first chunks
+        assert chunks
+        assert await wait_until(lambda: _released(client, dropping_server))
+        await client.close()
+
+    asyncio.run(main())
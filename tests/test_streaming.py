@@ -0,0 +1,236 @@
+import asyncio
+import json
+
+import pytest
+
+from autogen_watsonx_client import streaming
+from autogen_watsonx_client.streaming import (
+    TIMED_OUT,
+    ChunkCoalescer,
+    StreamReader,
+    ToolCallAccumulator,
+    _JsonCompletionScanner,
+    _PrependedStream,
+)
+
+
+class _Stream:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self.closed = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def aclose(self):
+        self.closed += 1
+
+
+def test_prepended_stream_yields_first_chunk():
+    async def main():
+        releases = []
+        stream = _PrependedStream(1, _Stream([2, 3]), on_close=lambda: releases.append(1))
+        assert [chunk async for chunk in stream] == [1, 2, 3]
+        # released at the end of the stream
+        assert releases == [1]
+        await stream.aclose()
+        assert releases == [1]
+
+    asyncio.run(main())
+
+
+def test_prepended_stream_closed_before_iteration():
+    async def main():
+        releases = []
+        inner = _Stream([2, 3])
+        stream = _PrependedStream(1, inner, on_close=lambda: releases.append(1))
+        await stream.aclose()
+        await stream.aclose()
+        assert inner.closed == 1
+        assert releases == [1]
+
+    asyncio.run(main())
+
+
+def test_reader_cancelled_before_first_read_closes_stream():
+    async def main():
+        releases = []
+        inner = _Stream([2, 3])
+        reader = StreamReader(_PrependedStream(1, inner, on_close=lambda: releases.append(1)))
+        # cancelled before the reader task ran at all, e.g. by an early CancellationToken
+        reader.task.cancel()
+        await reader.aclose()
+        assert inner.closed == 1
+        assert releases == [1]
+
+    asyncio.run(main())
+
+
+class _SlowStream(_Stream):
+    def __init__(self, chunks, delay: float):
+        super().__init__(chunks)
+        self._delay = delay
+
+    async def __anext__(self):
+        await asyncio.sleep(self._delay)
+        return await super().__anext__()
+
+
+def test_reader_keeps_one_get_across_timeouts():
+    async def main():
+        reader = StreamReader(_SlowStream([1, 2], delay=0.2))
+        assert await reader.next(0.01) is TIMED_OUT
+        pending = reader._pending_get
+        assert await reader.next(0.01) is TIMED_OUT
+        assert reader._pending_get is pending
+        # the chunk the timed out get waited for is not lost
+        assert await reader.next(1) == 1
+        assert reader._pending_get is None
+        assert await reader.next() == 2
+        with pytest.raises(StopAsyncIteration):
+            await reader.next(1)
+
+    asyncio.run(main())
+
+
+def test_reader_closed_while_a_get_is_pending():
+    async def main():
+        inner = _SlowStream([1], delay=10)
+        reader = StreamReader(inner)
+        assert await reader.next(0.01) is TIMED_OUT
+        pending = reader._pending_get
+        await reader.aclose()
+        assert pending.cancelled() and inner.closed == 1
+
+    asyncio.run(main())
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_coalescer_flushes_after_max_delay(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(streaming.time, "monotonic", clock)
+    coalescer = ChunkCoalescer(min_chars=100, max_delay=0.5)
+    assert coalescer.time_until_flush() is None
+    assert coalescer.push("a") is None
+    clock.now += 0.2
+    assert coalescer.push("b") is None
+    # due by the age of the oldest delta
+    assert coalescer.time_until_flush() == pytest.approx(0.3)
+    assert coalescer.poll() is None
+    clock.now += 0.3
+    assert coalescer.time_until_flush() == 0.0
+    assert coalescer.poll() == "ab"
+    assert coalescer.time_until_flush() is None and coalescer.poll() is None
+
+    # a delta arriving once the delay is over flushes with it
+    coalescer.push("c")
+    clock.now += 1
+    assert coalescer.push("d") == "cd"
+
+
+def test_coalescer_poll_ignores_boundaries(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(streaming.time, "monotonic", clock)
+    coalescer = ChunkCoalescer(max_delay=0.5, boundary="word")
+    assert coalescer.push("hello wor") is None
+    clock.now += 0.5
+    assert coalescer.push("ld and") == "hello world "
+    # the rest is buffered anew
+    assert coalescer.time_until_flush() == 0.5
+    clock.now += 0.5
+    assert coalescer.poll() == "and"
+
+# structural characters inside strings, escaped quotes and backslashes, nested arrays
+_DOCUMENTS = [
+    '{"a": 1}',
+    '{"text": "a } and a { and ] [ inside"}',
+    '{"quote": "say \\"}\\" please", "b": [1, {"c": "]"}]}',
+    '{"path": "C:\\\\", "next": "}"}',
+    '[{"a": "\\\\\\""}, "x"]',
+]
+
+
+@pytest.mark.parametrize("document", _DOCUMENTS)
+def test_scanner_completes_with_the_last_character(document):
+    json.loads(document)
+    scanner = _JsonCompletionScanner()
+    for i, char in enumerate(document):
+        assert scanner.feed(char) == (i == len(document) - 1), document[:i + 1]
+
+
+@pytest.mark.parametrize("document", _DOCUMENTS)
+def test_scanner_is_independent_of_the_chunk_boundaries(document):
+    for split in range(1, len(document)):
+        for second in range(split, len(document)):
+            scanner = _JsonCompletionScanner()
+            fragments = [document[:split], document[split:second], document[second:]]
+            completed = [scanner.feed(fragment) for fragment in fragments]
+            # empty fragments keep the state
+            assert completed[-1] and not completed[0], fragments
+            assert completed[1] == (second == len(document)), fragments
+
+
+def test_scanner_ignores_text_before_the_document():
+    scanner = _JsonCompletionScanner()
+    assert not scanner.feed('"}" ')
+    assert scanner.feed('{"a": "}"}')
+
+
+def _delta(index: int, **kwargs) -> dict:
+    delta = {"index": index}
+    if "id" in kwargs:
+        delta["id"] = kwargs.pop("id")
+    if kwargs:
+        delta["function"] = kwargs
+    return delta
+
+
+def test_accumulator_reports_interleaved_calls_as_each_completes():
+    accumulator = ToolCallAccumulator()
+    deltas = [
+        _delta(0, id="call-0", name="lookup", arguments=""),
+        _delta(1, id="call-1", name="look"),
+        _delta(0, arguments='{"word": "a }'),
+        _delta(1, name="up", arguments='{"word"'),
+        _delta(0, arguments=' \\" b"'),
+        _delta(1, arguments=': "c"}'),
+        _delta(0, arguments="}"),
+        _delta(2, id="call-2", name="now"),
+    ]
+    events = [accumulator.add(delta) for delta in deltas]
+    ready = [(i, event.index, event.call) for i, event in enumerate(events) if event is not None]
+    assert [(i, index) for i, index, _ in ready] == [(5, 1), (6, 0)]
+    assert ready[0][2].name == "lookup" and json.loads(ready[0][2].arguments) == {"word": "c"}
+    assert ready[1][2].id == "call-0" and json.loads(ready[1][2].arguments) == {"word": 'a } " b'}
+
+    # a call without arguments is only reported at the end of the stream
+    assert [(event.index, event.call.name) for event in accumulator.pending_events()] == [(2, "now")]
+    assert accumulator.pending_events() == []
+    assert [call.id for call in accumulator.function_calls()] == ["call-0", "call-1", "call-2"]
+
+
+def test_accumulator_reports_a_call_once():
+    accumulator = ToolCallAccumulator()
+    assert accumulator.add(_delta(0, id="call-0", name="f", arguments="{}")) is not None
+    assert accumulator.add(_delta(0, arguments=" ")) is None
+    assert accumulator.pending_events() == []
+    assert accumulator.function_calls()[0].arguments == "{} "
+
+
+def test_accumulator_does_not_report_a_call_without_a_name():
+    accumulator = ToolCallAccumulator()
+    assert accumulator.add(_delta(0, id="call-0", arguments="{}")) is None
+    assert [event.call.arguments for event in accumulator.pending_events()] == ["{}"]
@@ -0,0 +1,20 @@
+import asyncio
+
+from autogen_core.models import SystemMessage, UserMessage
+
+
+def test_count_tokens_through_tokenization_endpoint(stream_server, connect):
+    client = connect(stream_server)
+    messages = [
+        SystemMessage(content="You are a helpful assistant."),
+        UserMessage(content="hello " * 40, source="user"),
+    ]
+    try:
+        requests = stream_server.stats()["requests"]
+        first = client.count_tokens(messages)
+        assert first > 0
+        # counts are cached per message, only the new message is sent
+        assert client.count_tokens(messages + [UserMessage(content="more " * 40, source="user")]) > first
+        assert stream_server.stats()["requests"] - requests == 2
+    finally:
+        asyncio.run(client.close())
@@ -0,0 +1,67 @@
+import asyncio
+
+from autogen_core.models import UserMessage
+
+from autogen_watsonx_client.usage import UsageTracker
+
+MESSAGES = [UserMessage(content="question", source="user")]
+
+
+def _tokens_by_model(tracker: UsageTracker) -> dict:
+    return {
+        stats.model_id: (stats.requests, stats.prompt_tokens + stats.completion_tokens) for stats in tracker.stats()
+    }
+
+
+def _used_by_model(tracker: UsageTracker) -> dict:
+    return {stats.model_id: stats.used for stats in tracker.budget_stats()}
+
+
+def _budgets() -> list:
+    return [{"tokens": 10 ** 6, "model_id": "mock-small"}, {"tokens": 10 ** 6, "model_id": "mock-model"}]
+
+
+def test_usage_is_charged_to_the_cascade_tier_that_answered(stream_server, connect):
+    tracker = UsageTracker(budgets=_budgets())
+    client = connect(stream_server, cascade_model_ids=["mock-small"], usage_tracker=tracker)
+
+    async def main():
+        try:
+            return await client.create(MESSAGES)
+        finally:
+            await client.close()
+
+    result = asyncio.run(main())
+    tokens = result.usage.prompt_tokens + result.usage.completion_tokens
+    assert _tokens_by_model(tracker) == {"mock-small": (1, tokens)}
+    assert _used_by_model(tracker) == {"mock-small": tokens, "mock-model": 0}
+    assert client.actual_usage() == result.usage
+
+
+def test_escalated_call_charges_every_model_asked(stream_server, connect):
+    tracker = UsageTracker(budgets=_budgets())
+    # the mock answers with text that is not json, so the tier always escalates
+    client = connect(
+        stream_server, cascade_model_ids=["mock-small"], cascade_escalate_on=["invalid_json"], usage_tracker=tracker
+    )
+
+    def total(usage):
+        return usage.prompt_tokens + usage.completion_tokens
+
+    async def main():
+        try:
+            result = await client.create(MESSAGES)
+            # the usage of a call includes the escalated tier
+            charged = _tokens_by_model(tracker)
+            assert set(charged) == {"mock-small", "mock-model"}
+            assert charged["mock-small"][1] + charged["mock-model"][1] == total(result.usage)
+            chunks = [chunk async for chunk in client.create_stream(MESSAGES)]
+            return total(result.usage) + total(chunks[-1].usage)
+        finally:
+            await client.close()
+
+    call_tokens = asyncio.run(main())
+    charged = _tokens_by_model(tracker)
+    assert charged["mock-small"][0] == charged["mock-model"][0] == 2
+    assert sum(tokens for _, tokens in charged.values()) == call_tokens == total(client.actual_usage())
+    assert _used_by_model(tracker) == {model_id: tokens for model_id, (_, tokens) in charged.items()}